@@ -0,0 +1,129 @@
+"""
+Zayıf konu analizinin (services.study_analytics) ölçek benchmark'ı.
+
+Veritabanı gerekmez; kullanıcı × soru cevapları rastgele üretilir. Kullanıcıların
+derslere göre farklı yetenekleri ve soruların farklı zorlukları vardır, böylece
+zayıflık skorları anlamlı bir dağılım gösterir.
+
+Ölçülenler: matrisin kurulması, diske yazma, memory-map ile yükleme, zorluk
+hesabı, tek kullanıcı raporu (p50/p95), toplu zayıflık hesabı, artımlı cevap
+ekleme ve birleştirme. Karşılaştırma için soru zorluğu bir de saf Python
+döngüsüyle (istek başına cevapları gezen eski yaklaşım) örneklem üzerinde hesaplanır.
+
+Kullanım:
+    python bench_analytics.py
+    python bench_analytics.py --users 20000 --questions 10000 --answers-per-user 40
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from services.study_analytics import StudyAnalytics
+
+
+def generate(users: int, questions: int, courses: int, answers_per_user: int, seed: int):
+    rng = np.random.default_rng(seed)
+    question_course = rng.integers(0, courses, questions).astype(np.int32)
+    question_exam = (np.arange(questions) // 20 + 1).astype(np.int64)
+    question_hardness = rng.normal(0, 1, questions)
+    ability = rng.normal(0, 1, (users, courses))
+
+    counts = rng.poisson(answers_per_user, users)
+    rows = np.repeat(np.arange(users, dtype=np.int64), counts)
+    cols = rng.integers(0, questions, len(rows))
+    logit = ability[rows, question_course[cols]] - question_hardness[cols]
+    correct = (rng.random(len(rows)) < 1 / (1 + np.exp(-logit))).astype(np.int32)
+    return question_course, question_exam, rows, cols, correct, ability
+
+
+def timed(label: str, fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    print(f"{label:<34} {(time.perf_counter() - started) * 1000:10.1f} ms")
+    return result
+
+
+def python_difficulty(cols: np.ndarray, correct: np.ndarray) -> dict:
+    tries: dict = defaultdict(int)
+    right: dict = defaultdict(int)
+    for question, ok in zip(cols.tolist(), correct.tolist()):
+        tries[question] += 1
+        right[question] += ok
+    return {question: 1 - right[question] / tries[question] for question in tries}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Zayıf konu analizinin ölçek benchmark'ı.")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--questions", type=int, default=50_000)
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--answers-per-user", type=int, default=80)
+    parser.add_argument("--new-answers", type=int, default=200_000)
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    question_course, question_exam, rows, cols, correct, ability = timed(
+        "veri üretimi", generate, args.users, args.questions, args.courses, args.answers_per_user, args.seed)
+    print(f"{args.users} kullanıcı × {args.questions} soru, {len(rows)} cevap, {args.courses} ders")
+
+    user_ids = np.arange(1, args.users + 1, dtype=np.int64)
+    question_ids = np.arange(1, args.questions + 1, dtype=np.int64)
+    courses = [f"Ders {i}" for i in range(args.courses)]
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        engine = StudyAnalytics(snapshot_dir, smoothing=5.0, compact_threshold=10**9, refresh_interval=60)
+        timed("CSR kurulumu", engine.build, user_ids, question_ids, question_exam, question_course, courses,
+              rows, cols, np.ones(len(rows), dtype=np.int32), correct)
+        timed("diske yazma (+ map)", engine.save)
+
+        worker = StudyAnalytics(snapshot_dir, smoothing=5.0, compact_threshold=10**9, refresh_interval=60)
+        timed("memory-map ile yükleme", worker.load)
+        timed("zorluk hesabı", worker._rates, worker._state)
+
+        rng = np.random.default_rng(args.seed + 1)
+        sample = rng.choice(user_ids, args.samples, replace=False)
+        latencies = []
+        for user_id in sample:
+            started = time.perf_counter()
+            worker.user_report(int(user_id), limit=10)
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        print(f"{'kullanıcı raporu p50 / p95':<34} {statistics.median(latencies) * 1000:10.2f} ms"
+              f" / {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms")
+
+        batch = rng.choice(user_ids, min(10_000, args.users), replace=False)
+        weakness = timed(f"toplu zayıflık ({len(batch)} kullanıcı)", lambda: worker.weaknesses(batch)[0])
+        # Zayıflık, üretimdeki gerçek yeteneğin tersiyle ilişkili olmalı
+        attempted = worker.weaknesses(batch)[1] > 0
+        truth = -ability[batch - 1]
+        print(f"{'zayıflık ~ gerçek yetersizlik (r)':<34} {np.corrcoef(weakness[attempted], truth[attempted])[0, 1]:10.3f}")
+
+        new_rows = rng.integers(0, args.users + 1000, args.new_answers)
+        new_cols = rng.integers(0, args.questions, args.new_answers)
+        new_correct = (rng.random(args.new_answers) < 0.5).astype(np.int32)
+        timed(f"artımlı ekleme ({args.new_answers} cevap)", worker.apply_answers,
+              new_rows + 1, new_cols + 1, new_correct)
+        timed("zorluk hesabı (delta ile)", worker._rates, worker._state)
+        latencies = []
+        for user_id in sample[:200]:
+            started = time.perf_counter()
+            worker.user_report(int(user_id), limit=10)
+            latencies.append(time.perf_counter() - started)
+        print(f"{'kullanıcı raporu p50 (delta ile)':<34} {statistics.median(latencies) * 1000:10.2f} ms")
+        timed("birleştirme (compact)", worker.compact)
+
+    python_sample = min(len(rows), 2_000_000)
+    timed(f"saf Python zorluk ({python_sample} cevap)", python_difficulty,
+          cols[:python_sample], correct[:python_sample])
+    timed(f"NumPy zorluk ({python_sample} cevap)",
+          lambda: 1 - np.bincount(cols[:python_sample], weights=correct[:python_sample])
+          / np.maximum(np.bincount(cols[:python_sample]), 1))
+
+
+if __name__ == "__main__":
+    main()
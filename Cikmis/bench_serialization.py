@@ -0,0 +1,75 @@
+"""
+Sınav yanıtlarının serileştirme maliyetini karşılaştıran mikro benchmark.
+
+Eski yol: ORM nesnesi -> Pydantic from_attributes doğrulaması -> jsonable_encoder -> json.dumps
+Yeni yol: ORM nesnesi -> dict (services.fast_json) -> orjson
+
+Veritabanı gerekmez; 1000 soruluk bir sınav bellekte oluşturulur.
+
+Kullanım:
+    python bench_serialization.py
+    python bench_serialization.py --questions 5000 --repeat 20
+"""
+import argparse
+import gzip
+import json
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+
+import models
+import schemas
+from services import fast_json
+
+
+def build_exam(question_count: int) -> models.Exam:
+    exam = models.Exam(
+        id=1, title="Vize", description="Örnek sınav", course_name="İşletim Sistemleri",
+        year=2024, semester="Güz", university_id=1, department_id=1, class_level_id=1, user_id=1,
+    )
+    exam.questions = [
+        models.Question(
+            id=i, exam_id=1,
+            question_text=f"{i}. soru: Aşağıdakilerden hangisi bir işletim sistemi görevidir? " * 2,
+            answer="C",
+            options=[f"Seçenek {letter} için açıklama metni" for letter in "ABCDE"],
+        )
+        for i in range(1, question_count + 1)
+    ]
+    return exam
+
+
+def old_path(exam: models.Exam) -> bytes:
+    validated = schemas.Exam.model_validate(exam)
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False).encode("utf-8")
+
+
+def new_path(exam: models.Exam) -> bytes:
+    return fast_json.dumps(fast_json.exam_dict(exam))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serileştirme yollarını karşılaştırır.")
+    parser.add_argument("--questions", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    exam = build_exam(args.questions)
+    if json.loads(old_path(exam)) != json.loads(new_path(exam)):
+        raise SystemExit("Eski ve yeni yolun çıktıları farklı!")
+
+    results = {}
+    for name, fn in (("eski (pydantic + json)", old_path), ("yeni (dict + orjson)", new_path)):
+        best = min(timeit.repeat(lambda: fn(exam), number=1, repeat=args.repeat))
+        results[name] = best
+        print(f"{name:<24} {best * 1000:8.2f} ms")
+    old, new = results.values()
+    print(f"hızlanma: {old / new:.1f}x")
+
+    body = new_path(exam)
+    best = min(timeit.repeat(lambda: gzip.compress(body, compresslevel=6, mtime=0), number=1, repeat=args.repeat))
+    print(f"gövde {len(body) / 1024:.0f} KiB, gzip {len(gzip.compress(body, 6)) / 1024:.0f} KiB ({best * 1000:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,5 +8,131 @@ class Settings(BaseSettings):
     api_key: str
     ai_model: str
 
+    # Sync engine havuzu (SQLAlchemy varsayılanları). SQLite'ta kullanılmaz.
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+
+    # Async veritabanı katmanı. Boşsa database_url'den türetilir (asyncpg / aiosqlite).
+    # Havuz sadece sorgu süresince bağlantı tutar; yavaş istemci sayısıyla büyümez.
+    async_database_url: str | None = None
+    db_async_pool_size: int = 20
+    db_async_max_overflow: int = 20
+
+    # Şifre hash'leme: bcrypt maliyet faktörü ve süreç havuzu sınırları
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_queue: int = 64
+
+    # Yakın kopya soru tespiti: "off", "flag" (yanıtta işaretle), "link" (kalıcı bağla) ya da "reject" (ekleme)
+    dedup_mode: str = "flag"
+    dedup_threshold: float = 0.7
+    dedup_num_perm: int = 64
+    dedup_bands: int = 16
+    # İmza tablosunun her worker'da baştan yüklenme aralığı (eşzamanlı/geriye dönük eklemeler ve silmeler için)
+    dedup_full_reload_seconds: float = 300
+
+    # Kimlik doğrulama önbelleği (JWT içerikleri ve kullanıcılar)
+    auth_cache_ttl_seconds: int = 60
+    auth_cache_max_entries: int = 10000
+
+    # AI yanıt önbelleği (bellek içi LRU + veritabanı katmanı)
+    ai_cache_enabled: bool = True
+    ai_cache_max_entries: int = 2048
+    ai_cache_ttl_seconds: int = 3600
+    ai_cache_persistent: bool = True
+    ai_cache_persistent_ttl_seconds: int = 30 * 24 * 3600
+
+    # AI backend: "gemini" ya da yük testleri için deterministik "stub"
+    ai_backend: str = "gemini"
+    ai_stub_latency_ms: float = 800.0
+    ai_stub_latency_sigma: float = 0.5
+    ai_stub_error_rate: float = 0.0
+    ai_stub_seed: int | None = None
+    ai_stub_responses_file: str | None = None
+
+    # Gemini çağrıları için eşzamanlılık sınırı ve zaman aşımı
+    ai_max_concurrency: int = 8
+    ai_timeout_seconds: float = 30.0
+    # X-Request-Deadline-Ms bundan küçükse bu değere yükseltilir
+    ai_min_deadline_ms: int = 250
+    ai_batch_size: int = 5
+
+    # Upstream dayanıklılığı: gecikme penceresi, hedge ve devre kesici
+    ai_latency_window: int = 500
+    ai_hedge_enabled: bool = False
+    ai_hedge_percentile: float = 95.0
+    ai_hedge_min_samples: int = 20
+    ai_hedge_min_delay_seconds: float = 0.5
+    ai_breaker_window: int = 50
+    ai_breaker_error_threshold: float = 0.5
+    ai_breaker_min_requests: int = 10
+    ai_breaker_open_seconds: float = 30.0
+    # Tüm süreçlerde dakika başına toplam upstream çağrısı (HTTP, havuz, iş kuyruğu ve hedge
+    # denemeleri dahil); 0 sınırsız. Arka plan bütçeleri bunun alt bütçeleridir, HTTP istekleri
+    # bütçe doluysa beklemeden 429 alır.
+    ai_rate_per_minute: int = 300
+
+    # Benzer soru ön üretim havuzu
+    ai_pool_enabled: bool = True
+    ai_pool_depth: int = 3
+    ai_pool_worker_concurrency: int = 2
+    # Tüm süreçler için ortak; ai_rate_per_minute'ın alt bütçesidir
+    ai_pool_rate_per_minute: int = 20
+    ai_pool_top_exams: int = 20
+    ai_pool_scan_interval_seconds: int = 300
+
+    # Sınav ve soru yanıtlarının süreç içi önbelleği (ETag ile)
+    exam_cache_max_entries: int = 1024
+    # Sürüm bilgisinin DB'ye sorulmadan kullanılacağı süre; diğer worker'ların
+    # yazdığı değişiklikler en geç bu kadar gecikmeyle görülür
+    exam_cache_version_ttl_seconds: float = 5.0
+
+    # Akademik birim ağacı; değişiklik yapan worker hemen, diğerleri en geç bu sürede yeniler
+    academic_tree_ttl_seconds: float = 300.0
+
+    # Okuma endpoint'lerinde bu boyutun üzerindeki JSON yanıtlar gzip/brotli ile sıkıştırılır
+    response_compress_min_bytes: int = 1024
+    response_gzip_level: int = 6
+    response_brotli_quality: int = 5
+
+    # CSV/JSONL soru içe aktarma: parça başına satır sayısı ve raporda saklanan en fazla hata
+    question_import_chunk_size: int = 1000
+    question_import_max_errors: int = 1000
+
+    # AI iş kuyruğu (worker.py). Toplu işler worker başına en fazla ai_jobs_bulk_slots
+    # yuvayı kullanır; kalan yuvalar etkileşimli işlere ayrılır.
+    ai_jobs_worker_concurrency: int = 4
+    ai_jobs_bulk_slots: int = 2
+    ai_jobs_poll_interval_seconds: float = 1.0
+    ai_jobs_lease_seconds: float = 60.0
+    ai_jobs_max_attempts: int = 3
+    ai_jobs_retry_base_seconds: float = 10.0
+    # Tüm worker'ların toplamda dakikada yapabileceği model çağrısı; ai_rate_per_minute'ın alt bütçesidir
+    ai_jobs_rate_per_minute: int = 60
+
+    # Cevap kâğıtları bellekte toplanıp bu aralıkla ya da bu kadar kâğıt birikince tek
+    # transaction'da yazılır; bekleyen kâğıt sayısı sınırı aşarsa istek yazmayı kendisi yapar
+    attempts_flush_interval_seconds: float = 1.0
+    attempts_flush_batch_size: int = 500
+    attempts_max_pending: int = 5000
+
+    # Zayıf konu analizi: kullanıcı × soru matrisi arka planda bu aralıkla güncellenir;
+    # birikmiş yeni cevap sayısı eşiği aşınca matris birleştirilip diske yazılır
+    analytics_enabled: bool = True
+    analytics_snapshot_dir: str = "analytics_snapshot"
+    analytics_refresh_interval_seconds: float = 30.0
+    analytics_compact_threshold: int = 200_000
+    # Az denenmiş soru/derslerin oranını genele çeken sanal deneme sayısı
+    analytics_smoothing: float = 5.0
+    # Artımlı okumada atlanmış olabilecek satırlar için matris bu aralıkla baştan kurulur
+    analytics_rebuild_interval_seconds: float = 6 * 3600
+
+    # /metrics (Prometheus metin formatı). Kapalıyken ölçüm kodu hiç kurulmaz.
+    metrics_enabled: bool = False
+
+    # Profil modu: istek başına SQL sayısı/süresi başlıklarda, N+1 şüphesi ve bütçe aşımı logda
+    query_profiling_enabled: bool = False
+    query_repeat_threshold: int = 3
+
     model_config = SettingsConfigDict(env_file=".env")
 settings = Settings()
\ No newline at end of file
@@ -1,8 +1,17 @@
+import base64
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, delete, func, insert, literal, or_, select
 from sqlalchemy.orm import Session, selectinload
 
 import models
 import schemas
 import security
+from config import settings
+from services import auth_cache, dedup, search_index
+from services.academic_tree import academic_tree
+from services.exam_cache import exam_cache
 from schemas import UserCreate, QuestionCreate
 
 
@@ -13,8 +22,12 @@ from schemas import UserCreate, QuestionCreate
 def get_user_by_email(db: Session, email: str) -> models.User | None:
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user: UserCreate) -> models.User:
-    hashed_password = security.get_password_hash(user.password)
+def get_user_by_username(db: Session, username: str) -> models.User | None:
+    return db.query(models.User).filter(models.User.username == username).first()
+
+def create_user(db: Session, user: UserCreate, hashed_password: str | None = None) -> models.User:
+    if hashed_password is None:
+        hashed_password = security.get_password_hash(user.password)
     db_user = models.User(
         email=user.email,
         username=user.username,
@@ -27,10 +40,35 @@ def create_user(db: Session, user: UserCreate) -> models.User:
 
 def authenticate_user(db: Session, email: str, password: str) -> models.User | bool:
     user = get_user_by_email(db, email)
-    if not user or not security.verify_password(password, user.hashed_password):
+    if not user:
+        return False
+    is_valid, new_hash = security.verify_and_update_password(password, user.hashed_password)
+    if not is_valid:
+        return False
+    if new_hash:
+        update_password_hash(db, user, new_hash)
+    return user
+
+async def authenticate_user_async(db: Session, email: str, password: str) -> models.User | bool:
+    """
+    authenticate_user'ın async sürümü: veritabanı işlemleri threadpool'da,
+    bcrypt doğrulaması ise ayrı süreç havuzunda çalışır.
+    """
+    user = await run_in_threadpool(get_user_by_email, db, email)
+    if not user:
         return False
+    is_valid, new_hash = await security.verify_and_update_password_async(password, user.hashed_password)
+    if not is_valid:
+        return False
+    if new_hash:
+        # bcrypt maliyet faktörü değiştiyse şifre hash'i şeffaf şekilde yenilenir
+        await run_in_threadpool(update_password_hash, db, user, new_hash)
     return user
 
+def update_password_hash(db: Session, user: models.User, hashed_password: str) -> None:
+    user.hashed_password = hashed_password
+    db.commit()
+
 def update_user(db: Session, user_id: int, user_update: UserCreate) -> models.User:
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if not db_user:
@@ -40,6 +78,7 @@ def update_user(db: Session, user_id: int, user_update: UserCreate) -> models.Us
         db_user.hashed_password = security.get_password_hash(user_update.password)
     db.commit()
     db.refresh(db_user)
+    auth_cache.invalidate_user(user_id)
     return db_user
 
 def delete_user(db: Session, user_id: int) -> None:
@@ -48,6 +87,7 @@ def delete_user(db: Session, user_id: int) -> None:
         return None
     db.delete(db_user)
     db.commit()
+    auth_cache.invalidate_user(user_id)
     return None
 
 def get_all_exams(db: Session, skip: int = 0, limit: int = 100) -> list[models.Exam]:
@@ -56,6 +96,20 @@ def get_all_exams(db: Session, skip: int = 0, limit: int = 100) -> list[models.E
 def get_exam_by_id(db: Session, exam_id: int) -> models.Exam | None:
     return db.query(models.Exam).filter(models.Exam.id == exam_id).first()
 
+def get_exam_with_questions(db: Session, exam_id: int) -> models.Exam | None:
+    return (
+        db.query(models.Exam)
+        .options(selectinload(models.Exam.questions))
+        .filter(models.Exam.id == exam_id)
+        .first()
+    )
+
+def _bump_exam_version(db: Session, exam_id: int) -> None:
+    # Çağıranın transaction'ında çalışır; commit'ten sonra exam_cache.invalidate çağrılmalı
+    db.query(models.Exam).filter(models.Exam.id == exam_id).update(
+        {models.Exam.version: models.Exam.version + 1}, synchronize_session=False
+    )
+
 def create_exam(db: Session, exam: schemas.ExamCreate, user_id: int) -> models.Exam:
     # Sınav nesnesini oluştur
     db_exam = models.Exam(
@@ -69,60 +123,222 @@ def create_exam(db: Session, exam: schemas.ExamCreate, user_id: int) -> models.E
         class_level_id=exam.class_level_id,
         user_id=user_id
     )
+    _apply_class_level(db, db_exam)
     db.add(db_exam)
-    db.commit() # Sınavı kaydet ki ID'si oluşsun
-    db.refresh(db_exam)
+    db.flush() # Sınavın ID'si oluşsun; sınav ve sorular tek transaction'da kaydedilir
 
     # Soruları oluştur ve sınava bağla
-    for q_in in exam.questions:
-        db_question = models.Question(
-            **q_in.model_dump(),
-            exam_id=db_exam.id
-        )
-        db.add(db_question)
-    
+    added = _add_questions(db, db_exam.id, exam.questions)
+
+    search_index.index_exam(db, db_exam.id)
+    question_ids = [db_question.id for db_question, _ in added]
     db.commit() # Soruları kaydet
     db.refresh(db_exam) # Sınavı sorularla birlikte yenile
+    _reload_questions(db, question_ids)
+    _index_signatures(added)
     return db_exam
 
 
-def get_exams_filtered(
-        db: Session,
+def _apply_class_level(db: Session, db_exam: models.Exam) -> None:
+    """
+    Sınıf seviyesi verildiyse üniversite, bölüm ve seviye alanlarını ondan türetir;
+    böylece filtreler tutarlı kalır.
+    """
+    if db_exam.class_level_id is None:
+        return
+    db_class = get_class_by_id(db, db_exam.class_level_id)
+    if db_class is None:
+        return
+    db_exam.class_level = db_class.level
+    db_exam.department_id = db_class.department_id
+    db_department = get_department_by_id(db, db_class.department_id)
+    if db_department is not None:
+        db_exam.university_id = db_department.university_id
+
+
+def _exam_filter_criteria(
         university_id: int | None = None,
         department_id: int | None = None,
         class_level: int | None = None,
         year: int | None = None,
         semester: str | None = None,
         course_name: str | None = None,
-) -> list[models.Exam]:
-    query = db.query(models.Exam)
-
-    if university_id or department_id:
-        query = query.join(models.ClassLevel, models.Exam.class_level_id == models.ClassLevel.id)
-        query = query.join(models.Department, models.ClassLevel.department_id == models.Department.id)
+) -> list:
+    # Hiyerarşi alanları exams tablosunda tutulur (bkz. _apply_class_level); join gerekmez
+    criteria = []
 
     if university_id:
-        query = query.filter(models.Department.university_id == university_id)
+        criteria.append(models.Exam.university_id == university_id)
 
     if department_id:
-        query = query.filter(models.ClassLevel.department_id == department_id)
+        criteria.append(models.Exam.department_id == department_id)
 
     if class_level:
-        if not (university_id or department_id):
-            query = query.join(models.ClassLevel, models.Exam.class_level_id == models.ClassLevel.id)
-        query = query.filter(models.ClassLevel.level == class_level)
+        criteria.append(models.Exam.class_level == class_level)
 
     if year:
-        query = query.filter(models.Exam.year == year)
+        criteria.append(models.Exam.year == year)
     if semester:
-        query = query.filter(models.Exam.semester == semester)
+        criteria.append(models.Exam.semester == semester)
 
     if course_name:
-        query = query.filter(models.Exam.course_name.ilike(f"%{course_name}%"))
+        criteria.append(models.Exam.course_name.ilike(f"%{course_name}%"))
+
+    return criteria
+
+
+def _filtered_exams_query(db: Session, columns: tuple = (models.Exam,), **filters):
+    return db.query(*columns).filter(*_exam_filter_criteria(**filters))
 
+
+def get_exams_filtered(
+        db: Session,
+        university_id: int | None = None,
+        department_id: int | None = None,
+        class_level: int | None = None,
+        year: int | None = None,
+        semester: str | None = None,
+        course_name: str | None = None,
+) -> list[models.Exam]:
+    query = _filtered_exams_query(
+        db, university_id=university_id, department_id=department_id, class_level=class_level,
+        year=year, semester=semester, course_name=course_name
+    )
     return query.options(selectinload(models.Exam.questions)).all()
 
 
+def stream_exam_export_rows(db: Session, after_id: int | None = None, batch_size: int = 1000, **filters):
+    """
+    get_exams_filtered ile aynı filtrelerle sınav + soru satırlarını sunucu tarafı
+    imleçle okur (yield_per); her sınavın soruları ardışık gelir. Sonuç kümesi hiçbir
+    zaman tamamen belleğe alınmaz. after_id verilirse o sınavdan sonrası döner.
+    """
+    stmt = (
+        select(
+            models.Exam.id,
+            models.Exam.title,
+            models.Exam.description,
+            models.Exam.course_name,
+            models.Exam.year,
+            models.Exam.semester,
+            models.Exam.university_id,
+            models.Exam.department_id,
+            models.Exam.class_level_id,
+            models.Exam.user_id,
+            models.Question.id.label("question_id"),
+            models.Question.question_text,
+            models.Question.answer,
+            models.Question.options,
+        )
+        .outerjoin(models.Question, models.Question.exam_id == models.Exam.id)
+        .where(*_exam_filter_criteria(**filters))
+        .order_by(models.Exam.id, models.Question.id)
+    )
+    if after_id is not None:
+        stmt = stmt.where(models.Exam.id > after_id)
+    return db.execute(stmt.execution_options(yield_per=batch_size))
+
+
+def _exam_summary_columns() -> tuple:
+    question_count = (
+        select(func.count(models.Question.id))
+        .where(models.Question.exam_id == models.Exam.id)
+        .correlate(models.Exam)
+        .scalar_subquery()
+        .label("question_count")
+    )
+    return (
+        models.Exam.id,
+        models.Exam.title,
+        models.Exam.description,
+        models.Exam.course_name,
+        models.Exam.year,
+        models.Exam.semester,
+        models.Exam.university_id,
+        models.Exam.department_id,
+        models.Exam.class_level_id,
+        models.Exam.user_id,
+        question_count,
+    )
+
+
+def encode_exam_cursor(year: int, exam_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{year}:{exam_id}".encode()).decode().rstrip("=")
+
+def decode_exam_cursor(cursor: str) -> tuple[int, int]:
+    """
+    Geçersiz bir cursor için ValueError fırlatır.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        year, exam_id = raw.split(":")
+        return int(year), int(exam_id)
+    except Exception as e:
+        raise ValueError("Geçersiz cursor") from e
+
+
+def exam_summaries_select(cursor: tuple[int, int] | None = None, **filters):
+    """
+    Sınav özetleri için (year, id) sıralı select; sync ve async crud tarafından paylaşılır.
+    """
+    stmt = select(*_exam_summary_columns()).where(*_exam_filter_criteria(**filters))
+    if cursor is not None:
+        cursor_year, cursor_id = cursor
+        stmt = stmt.where(or_(
+            models.Exam.year < cursor_year,
+            and_(models.Exam.year == cursor_year, models.Exam.id < cursor_id)
+        ))
+    return stmt.order_by(models.Exam.year.desc(), models.Exam.id.desc())
+
+
+def paginate_exam_rows(rows: list, limit: int) -> tuple[list, str | None]:
+    # Sorgu limit + 1 satır okur; fazladan satır varsa sonraki sayfa vardır
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_exam_cursor(rows[-1].year, rows[-1].id)
+    return rows, next_cursor
+
+
+def get_exam_summaries_page(
+        db: Session,
+        university_id: int | None = None,
+        department_id: int | None = None,
+        class_level: int | None = None,
+        year: int | None = None,
+        semester: str | None = None,
+        course_name: str | None = None,
+        limit: int = 50,
+        cursor: tuple[int, int] | None = None,
+) -> tuple[list, str | None]:
+    """
+    Sınavları (year, id) üzerinde keyset sayfalama ile, en yeniden eskiye listeler.
+    Sadece sınav sütunları ve SQL'de hesaplanan soru sayısı seçilir; soru satırları yüklenmez.
+    """
+    stmt = exam_summaries_select(
+        cursor=cursor, university_id=university_id, department_id=department_id, class_level=class_level,
+        year=year, semester=semester, course_name=course_name
+    )
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    return paginate_exam_rows(rows, limit)
+
+
+def search_exams(db: Session, query: str, limit: int = 20, offset: int = 0) -> list[dict]:
+    """
+    Tam metin arama: başlık, ders adı, açıklama ve soru metinleri üzerinde alaka sırasına göre.
+    """
+    hits = search_index.search(db, query, limit=limit, offset=offset)
+    if not hits:
+        return []
+    rows = db.query(*_exam_summary_columns()).filter(models.Exam.id.in_([exam_id for exam_id, _ in hits])).all()
+    rows_by_id = {row.id: row for row in rows}
+    return [
+        {**rows_by_id[exam_id]._asdict(), "score": score}
+        for exam_id, score in hits
+        if exam_id in rows_by_id
+    ]
+
+
 # Üniversite CRUD
 def get_universities(db: Session) -> list[models.University]:
     return db.query(models.University).options(selectinload(models.University.departments)).all()
@@ -134,6 +350,7 @@ def create_university(db: Session, name: str) -> models.University:
     db_university = models.University(name=name)
     db.add(db_university)
     db.commit()
+    academic_tree.invalidate()
     db.refresh(db_university)
     return db_university
 
@@ -143,6 +360,7 @@ def delete_university(db: Session, university_id: int) -> None:
         return None
     db.delete(db_university)
     db.commit()
+    academic_tree.invalidate()
 
 # Bölüm CRUD
 def get_departments_by_university(db: Session, university_id: int) -> list[models.Department]:
@@ -155,6 +373,7 @@ def create_department(db: Session, name: str, university_id: int) -> models.Depa
     db_department = models.Department(name=name, university_id=university_id)
     db.add(db_department)
     db.commit()
+    academic_tree.invalidate()
     db.refresh(db_department)
     return db_department
 
@@ -164,6 +383,7 @@ def delete_department(db: Session, department_id: int) -> None:
         return None
     db.delete(db_department)
     db.commit()
+    academic_tree.invalidate()
 
 # Sınıf seviyesi CRUD
 def get_classes_by_department(db: Session, department_id: int) -> list[models.ClassLevel]:
@@ -176,6 +396,7 @@ def create_class_level(db: Session, level: int, department_id: int) -> models.Cl
     db_class = models.ClassLevel(level=level, department_id=department_id)
     db.add(db_class)
     db.commit()
+    academic_tree.invalidate()
     db.refresh(db_class)
     return db_class
 
@@ -185,6 +406,7 @@ def delete_class_level(db: Session, class_id: int) -> None:
         return None
     db.delete(db_class)
     db.commit()
+    academic_tree.invalidate()
 
 # Soru CRUD
 def get_questions_by_exam(db: Session, exam_id: int) -> list[models.Question]:
@@ -198,7 +420,10 @@ def create_question(db: Session, exam_id: int, question_text: str, answer: str,
         options=options
     )
     db.add(db_question)
+    search_index.index_exam(db, exam_id)
+    _bump_exam_version(db, exam_id)
     db.commit()
+    exam_cache.invalidate(exam_id)
     db.refresh(db_question)
     return db_question
 
@@ -206,26 +431,210 @@ def delete_question(db: Session, question_id: int) -> None:
     db_question = db.query(models.Question).filter(models.Question.id == question_id).first()
     if not db_question:
         return None
+    exam_id = db_question.exam_id
+    db.query(models.QuestionSignature).filter(models.QuestionSignature.question_id == question_id).delete(synchronize_session=False)
+    db.query(models.QuestionSignature).filter(models.QuestionSignature.duplicate_of == question_id).update(
+        {models.QuestionSignature.duplicate_of: None}, synchronize_session=False
+    )
+    db.query(models.SimilarQuestionPoolItem).filter(models.SimilarQuestionPoolItem.question_id == question_id).delete(synchronize_session=False)
     db.delete(db_question)
+    search_index.index_exam(db, exam_id)
+    _bump_exam_version(db, exam_id)
     db.commit()
+    exam_cache.invalidate(exam_id)
+    dedup.detector.remove(question_id)
 
 
 def create_questions_bulk(db: Session, exam_id: int, questions_data: list[schemas.QuestionCreate]) -> list[
-    models.Question]:
-    db_questions = []
-    for q_data in questions_data:
+    tuple[models.Question, int | None]]:
+    """
+    Eklenen soruları, yakın kopyası olduğu sorunun kimliğiyle (yoksa None) birlikte döndürür.
+    """
+    added = _add_questions(db, exam_id, questions_data)
+    db_questions = [db_question for db_question, _ in added]
+
+    search_index.index_exam(db, exam_id)
+    if db_questions:
+        _bump_exam_version(db, exam_id)
+    question_ids = [q.id for q in db_questions]
+    db.commit()
+    exam_cache.invalidate(exam_id)
+    _reload_questions(db, question_ids)
+    _index_signatures(added)
+
+    return [(db_question, result.duplicate_of if result is not None else None) for db_question, result in added]
+
+
+def _reload_questions(db: Session, question_ids: list[int]) -> None:
+    # Commit sonrası süresi dolan soruları tek sorguda yeniler; tek tek refresh N+1 üretir
+    if question_ids:
+        db.query(models.Question).filter(models.Question.id.in_(question_ids)).all()
+
+
+def _add_questions(db: Session, exam_id: int, questions_data: list[schemas.QuestionCreate]) -> list[
+    tuple[models.Question, dedup.ScreenResult | None]]:
+    """
+    Soruları yakın kopya kontrolünden geçirerek oturuma ekler; commit çağırana aittir.
+    dedup_mode'a göre kopyalar yanıtta işaretlenir (flag), imza tablosunda asıl soruya
+    bağlanır (link) ya da hiç eklenmez (reject).
+    """
+    mode = settings.dedup_mode
+    if mode == "off":
+        screened = [None] * len(questions_data)
+    else:
+        screened = dedup.detector.screen(db, [q_data.question_text for q_data in questions_data])
+
+    added = []
+    by_position = {}
+    for position, (q_data, result) in enumerate(zip(questions_data, screened)):
+        if mode == "reject" and result is not None and result.duplicate_of is not None:
+            continue
         db_question = models.Question(
             exam_id=exam_id,
             question_text=q_data.question_text,
             answer=q_data.answer,
             options=q_data.options
         )
-        db_questions.append(db_question)
-
-    db.add_all(db_questions)
+        added.append((db_question, result))
+        by_position[position] = db_question
+
+    db.add_all([db_question for db_question, _ in added])
+    db.flush()
+
+    for db_question, result in added:
+        if result is None:
+            continue
+        if result.duplicate_of is not None and result.duplicate_of < 0:
+            # Aynı yüklemedeki daha önceki bir soruya benziyor
+            original = by_position.get(-result.duplicate_of - 1)
+            result.duplicate_of = original.id if original is not None else None
+        dedup.detector.store(db, db_question.id, result.signature, result.duplicate_of if mode == "link" else None)
+    return added
+
+
+def insert_questions_chunk(db: Session, exam_id: int, questions_data: list[schemas.QuestionUpload]) -> tuple[
+    list[tuple[int, dedup.ScreenResult | None]], int]:
+    """
+    Soruları ORM nesnesi oluşturmadan tek bir çok satırlı INSERT ... RETURNING ile ekler
+    (büyük içe aktarmalar için). Yakın kopya kontrolü _add_questions ile aynıdır.
+    Eklenen (soru kimliği, tarama sonucu) listesini ve reddedilen kopya sayısını döndürür;
+    commit ve ardından exam_cache.invalidate çağırana aittir.
+    """
+    mode = settings.dedup_mode
+    if mode == "off":
+        screened = [None] * len(questions_data)
+    else:
+        screened = dedup.detector.screen(db, [q_data.question_text for q_data in questions_data])
+
+    kept = [
+        (position, q_data, result)
+        for position, (q_data, result) in enumerate(zip(questions_data, screened))
+        if not (mode == "reject" and result is not None and result.duplicate_of is not None)
+    ]
+    if not kept:
+        return [], len(questions_data)
+
+    question_ids = db.scalars(
+        insert(models.Question).returning(models.Question.id, sort_by_parameter_order=True),
+        [
+            {"exam_id": exam_id, "question_text": q_data.question_text, "answer": q_data.answer, "options": q_data.options}
+            for _, q_data, _ in kept
+        ],
+    ).all()
+
+    id_by_position = {position: question_id for (position, _, _), question_id in zip(kept, question_ids)}
+    added = []
+    signatures = []
+    for (_, _, result), question_id in zip(kept, question_ids):
+        added.append((question_id, result))
+        if result is None:
+            continue
+        if result.duplicate_of is not None and result.duplicate_of < 0:
+            # Aynı parçadaki daha önceki bir soruya benziyor
+            result.duplicate_of = id_by_position.get(-result.duplicate_of - 1)
+        signatures.append({
+            "question_id": question_id,
+            "signature": result.signature.tobytes(),
+            "duplicate_of": result.duplicate_of if mode == "link" else None,
+        })
+    if signatures:
+        db.execute(insert(models.QuestionSignature), signatures)
+    _bump_exam_version(db, exam_id)
+    return added, len(questions_data) - len(kept)
+
+
+def _index_signatures(added: list[tuple[models.Question, dedup.ScreenResult | None]]) -> None:
+    for db_question, result in added:
+        if result is not None:
+            dedup.detector.add(db_question.id, result.signature)
+
+
+# Benzer soru havuzu
+def increment_exam_views(db: Session, view_counts: dict[int, int]) -> None:
+    for exam_id, count in view_counts.items():
+        updated = db.query(models.ExamView).filter(models.ExamView.exam_id == exam_id).update(
+            {models.ExamView.view_count: models.ExamView.view_count + count},
+            synchronize_session=False
+        )
+        if not updated:
+            db.add(models.ExamView(exam_id=exam_id, view_count=count))
     db.commit()
 
-    for q in db_questions:
-        db.refresh(q)
+def get_most_viewed_exam_ids(db: Session, limit: int) -> list[int]:
+    rows = db.query(models.ExamView.exam_id).order_by(models.ExamView.view_count.desc()).limit(limit).all()
+    return [row.exam_id for row in rows]
 
-    return db_questions
\ No newline at end of file
+def get_question_ids_below_pool_depth(db: Session, exam_id: int, depth: int) -> list[int]:
+    pool_counts = (
+        db.query(models.SimilarQuestionPoolItem.question_id, func.count().label("item_count"))
+        .group_by(models.SimilarQuestionPoolItem.question_id)
+        .subquery()
+    )
+    rows = (
+        db.query(models.Question.id)
+        .outerjoin(pool_counts, pool_counts.c.question_id == models.Question.id)
+        .filter(models.Question.exam_id == exam_id)
+        .filter(func.coalesce(pool_counts.c.item_count, 0) < depth)
+        .all()
+    )
+    return [row.id for row in rows]
+
+def count_similar_questions(db: Session, question_id: int) -> int:
+    return db.query(models.SimilarQuestionPoolItem).filter(models.SimilarQuestionPoolItem.question_id == question_id).count()
+
+def add_similar_question(db: Session, question_id: int, payload: str, depth: int) -> bool:
+    """
+    Havuzda depth'ten az öğe varsa öğeyi ekler; sayım ve ekleme tek koşullu INSERT ... SELECT'tir.
+    Postgres'te eşzamanlı eklemeler birbirinin commit edilmemiş satırlarını görmediği için
+    önce soru satırı kilitlenir. SQLite yazmaları zaten sıraya koyar. Eklendiyse True döner.
+    """
+    item = models.SimilarQuestionPoolItem
+    db.query(models.Question.id).filter(models.Question.id == question_id).with_for_update().first()
+    pool_size = select(func.count()).select_from(item).where(item.question_id == question_id).scalar_subquery()
+    inserted = db.execute(
+        insert(item).from_select(
+            ["question_id", "payload", "created_at"],
+            select(literal(question_id), literal(payload), literal(time.time())).where(pool_size < depth),
+        )
+    ).rowcount
+    db.commit()
+    return inserted == 1
+
+def pop_similar_question(db: Session, question_id: int) -> str | None:
+    """
+    Sorunun havuzdaki en eski öğesini tek bir DELETE ... RETURNING ile alır. Postgres'te
+    kilitli satır atlanır (SKIP LOCKED); SQLite'ta bu ifade yok sayılır ama yazmalar sıraya
+    girdiği için iki worker aynı öğeyi alamaz.
+    """
+    item = models.SimilarQuestionPoolItem
+    oldest = (
+        select(item.id)
+        .where(item.question_id == question_id)
+        .order_by(item.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    payload = db.execute(delete(item).where(item.id == oldest).returning(item.payload)).scalar()
+    db.commit()
+    return payload
@@ -0,0 +1,66 @@
+"""
+crud.py'deki okuma fonksiyonlarının AsyncSession ile çalışan karşılıkları.
+Sorgu kurma mantığı crud.py ile paylaşılır; yazma işlemleri şimdilik sync crud'da kalır.
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+import crud
+import models
+
+
+# Sınav okuma
+async def get_exam_by_id(db: AsyncSession, exam_id: int) -> models.Exam | None:
+    return await db.get(models.Exam, exam_id)
+
+async def get_exam_with_questions(db: AsyncSession, exam_id: int) -> models.Exam | None:
+    stmt = (
+        select(models.Exam)
+        .options(selectinload(models.Exam.questions))
+        .where(models.Exam.id == exam_id)
+    )
+    return (await db.execute(stmt)).scalar_one_or_none()
+
+async def get_exam_version(db: AsyncSession, exam_id: int) -> int | None:
+    return await db.scalar(select(models.Exam.version).where(models.Exam.id == exam_id))
+
+
+async def get_exam_summaries_page(
+        db: AsyncSession,
+        university_id: int | None = None,
+        department_id: int | None = None,
+        class_level: int | None = None,
+        year: int | None = None,
+        semester: str | None = None,
+        course_name: str | None = None,
+        limit: int = 50,
+        cursor: tuple[int, int] | None = None,
+) -> tuple[list, str | None]:
+    stmt = crud.exam_summaries_select(
+        cursor=cursor, university_id=university_id, department_id=department_id, class_level=class_level,
+        year=year, semester=semester, course_name=course_name
+    )
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    return crud.paginate_exam_rows(rows, limit)
+
+
+async def search_exams(db: AsyncSession, query: str, limit: int = 20, offset: int = 0) -> list[dict]:
+    # Diyalekte özel arama SQL'i tek yerde kalsın diye sync fonksiyon async bağlantı üzerinde çalıştırılır
+    return await db.run_sync(crud.search_exams, query, limit, offset)
+
+
+# Akademik birimler
+async def get_universities(db: AsyncSession) -> list[models.University]:
+    return list(await db.scalars(select(models.University)))
+
+async def get_departments_by_university(db: AsyncSession, university_id: int) -> list[models.Department]:
+    return list(await db.scalars(select(models.Department).where(models.Department.university_id == university_id)))
+
+async def get_classes_by_department(db: AsyncSession, department_id: int) -> list[models.ClassLevel]:
+    return list(await db.scalars(select(models.ClassLevel).where(models.ClassLevel.department_id == department_id)))
+
+
+# Soru okuma
+async def get_questions_by_exam(db: AsyncSession, exam_id: int) -> list[models.Question]:
+    return list(await db.scalars(select(models.Question).where(models.Question.exam_id == exam_id)))
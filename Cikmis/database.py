@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -6,10 +8,20 @@ import config
 
 DATABASE_URL = config.settings.database_url
 
+def _pool_options(url: str, pool_size: int, max_overflow: int) -> dict:
+    # SQLite sürücüsünün kendi havuz seçimi korunur
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {"pool_size": pool_size, "max_overflow": max_overflow}
+
+
+SYNC_POOL_OPTIONS = _pool_options(DATABASE_URL, config.settings.db_pool_size, config.settings.db_max_overflow)
+
 engine = create_engine(
     DATABASE_URL,
     pool_recycle=300,  # 300 saniye (5 dakika) boşta kalan bağlantıları otomatik olarak yenile
-    pool_pre_ping=True # Havuzdan bir bağlantı almadan önce "canlı mı?" diye test et
+    pool_pre_ping=True, # Havuzdan bir bağlantı almadan önce "canlı mı?" diye test et
+    **SYNC_POOL_OPTIONS
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -21,3 +33,55 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def to_async_url(url: str) -> str:
+    """
+    Sync bağlantı adresini async sürücüye çevirir:
+    postgresql:// -> postgresql+asyncpg://, sqlite:// -> sqlite+aiosqlite://
+    """
+    parsed = make_url(url.replace("postgres://", "postgresql://", 1))
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        query = dict(parsed.query)
+        # asyncpg sslmode yerine ssl parametresini kullanır
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        parsed = parsed.set(drivername="postgresql+asyncpg", query=query)
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = config.settings.async_database_url or to_async_url(DATABASE_URL)
+
+# Okuma ağırlıklı endpoint'ler için async katman. Sync engine yazma yolları ve
+# henüz taşınmamış endpoint'ler için kullanılmaya devam eder.
+ASYNC_POOL_OPTIONS = _pool_options(
+    ASYNC_DATABASE_URL, config.settings.db_async_pool_size, config.settings.db_async_max_overflow
+)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_recycle=300,
+    pool_pre_ping=True,
+    **ASYNC_POOL_OPTIONS
+)
+
+if config.settings.metrics_enabled:
+    from services import metrics
+
+    metrics.instrument_engine(engine, "sync", **SYNC_POOL_OPTIONS)
+    metrics.instrument_engine(async_engine.sync_engine, "async", **ASYNC_POOL_OPTIONS)
+
+if config.settings.query_profiling_enabled:
+    from services import query_profiler
+
+    query_profiler.instrument_engine(engine)
+    query_profiler.instrument_engine(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
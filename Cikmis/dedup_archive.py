@@ -0,0 +1,76 @@
+"""
+Mevcut soru arşivindeki yakın kopyaları toplu olarak tespit eder.
+
+Henüz imzası olmayan sorular id sırasıyla gruplar halinde işlenir; her soru kendisinden
+önce gelen sorularla karşılaştırılır, yani eski soru asıl kabul edilir. İşlem kaldığı
+yerden devam edebilir: imzası yazılmış sorular tekrar işlenmez.
+
+Kullanım:
+    python dedup_archive.py                      # sadece raporla, hiçbir şey yazma
+    python dedup_archive.py --action link        # kopyaları asıl soruya bağla
+    python dedup_archive.py --action delete      # kopyaları sil
+"""
+import argparse
+
+import crud
+import models
+from database import SessionLocal, engine
+from services import dedup
+
+
+def dedup_archive(batch_size: int, action: str) -> None:
+    detector = dedup.detector
+    processed = 0
+    duplicates = 0
+    with SessionLocal() as db:
+        detector.refresh(db)
+        last_id = 0
+        while True:
+            rows = (
+                db.query(models.Question.id, models.Question.question_text)
+                .outerjoin(models.QuestionSignature, models.QuestionSignature.question_id == models.Question.id)
+                .filter(models.QuestionSignature.question_id.is_(None))
+                .filter(models.Question.id > last_id)
+                .order_by(models.Question.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            to_delete = []
+            for row in rows:
+                signature = detector.signature(row.question_text)
+                match = detector.index.query(signature, detector.threshold)
+                duplicate_of = match[0] if match else None
+                if duplicate_of is not None:
+                    duplicates += 1
+                    print(f"Soru {row.id} ~ soru {duplicate_of} (benzerlik {match[1]:.2f})")
+                    if action == "delete":
+                        to_delete.append(row.id)
+                        continue
+                if action != "report":
+                    detector.store(db, row.id, signature, duplicate_of if action == "link" else None)
+                detector.add(row.id, signature)
+            db.commit()
+
+            for question_id in to_delete:
+                crud.delete_question(db, question_id)
+
+            processed += len(rows)
+            last_id = rows[-1].id
+            print(f"{processed} soru işlendi, {duplicates} yakın kopya bulundu.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Soru arşivindeki yakın kopyaları bulur.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--action", choices=["report", "link", "delete"], default="report")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    dedup_archive(args.batch_size, args.action)
+
+
+if __name__ == "__main__":
+    main()
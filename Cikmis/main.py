@@ -1,15 +1,49 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 
 from fastapi.middleware.cors import CORSMiddleware
 
 import config
 import models
-from database import engine
-from routers import auth, exams, academics
-import google.generativeai as genai
+import security
+from database import async_engine, engine
+from migrations import run_migrations
+from routers import auth, exams, academics, jobs, attempts
+from services.ai_cache import cache as ai_cache
+from services import metrics, query_profiler
+from services.attempts import buffer as attempt_buffer
+from services.study_analytics import analytics
+from services.question_pool import question_pool
 
 models.Base.metadata.create_all(bind=engine)
-app = FastAPI(title="Çıkmış Sınavlar API")
+run_migrations(engine)
+
+try:
+    # Bu backend'in ai_model'i değiştiyse eski modelin önbelleğe alınmış yanıtlarını temizle
+    ai_cache.invalidate_other_models()
+except Exception as e:
+    print(f"AI önbelleği temizlenemedi. Hata: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.settings.ai_pool_enabled:
+        await question_pool.start()
+    await attempt_buffer.start()
+    if config.settings.analytics_enabled:
+        await analytics.start()
+    try:
+        yield
+    finally:
+        await question_pool.stop()
+        await analytics.stop()
+        # Bekleyen cevap kâğıtları veritabanı kapanmadan yazılır
+        await attempt_buffer.stop()
+        security.shutdown_hash_pool()
+        await async_engine.dispose()
+
+app = FastAPI(title="Çıkmış Sınavlar API", lifespan=lifespan)
 
 origins = [
     "http://localhost",
@@ -26,14 +60,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if config.settings.query_profiling_enabled:
+    app.add_middleware(query_profiler.QueryProfilerMiddleware)
+
+if metrics.enabled:
+    # En dışta olsun diye diğer middleware'lerden sonra eklenir
+    app.add_middleware(metrics.MetricsMiddleware)
+
 app.include_router(auth.router)
 app.include_router(exams.router)
 app.include_router(academics.router)
+app.include_router(jobs.router)
+app.include_router(attempts.router)
 
-try:
-    genai.configure(api_key=config.settings.api_key)
-except Exception as e:
-    print(f"Gemini API yapılandırılamadı. Lütfen .env dosyasındaki API_KEY'i kontrol edin. Hata: {e}")
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,295 @@
+"""
+Basit şema geçişleri. create_all yalnızca eksik tabloları oluşturur; mevcut tablolara
+kolon/index ekleme ve veri taşıma işleri burada, sırayla ve bir kez çalışır.
+Uygulanan geçişler schema_migrations tablosuna yazılır.
+
+Kullanım:
+    python migrations.py                 # bekleyen geçişleri uygula
+    python migrations.py --check-plans   # sınav filtre sorgularının beklenen index'leri kullandığını doğrula
+"""
+import argparse
+import itertools
+import re
+import sys
+import time
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+import models
+from services import search_index
+
+# Büyük tablolarda uzun kilitlerden kaçınmak için geri doldurma id aralıklarıyla yapılır
+_BACKFILL_BATCH = 10000
+
+# Postgres'te aynı anda başlayan worker'lar geçişleri sırayla çalıştırsın diye
+_ADVISORY_LOCK_ID = 712804
+
+
+def _add_column_if_missing(conn: Connection, table: str, column: str, ddl_type: str) -> None:
+    columns = {col["name"] for col in inspect(conn).get_columns(table)}
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def _create_indexes(conn: Connection, table) -> None:
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def _exam_hierarchy_filters(conn: Connection) -> None:
+    """
+    Sınav filtrelerini join'siz hale getirir: exams.class_level eklenir, university_id/
+    department_id/class_level class_level_id'den doldurulur, bileşik index'ler oluşturulur.
+    Filtrelerde kullanılmayan soru metni ve cevap index'leri kaldırılır.
+    Geri doldurmanın her parçası ayrı commit edilir; yarıda kalırsa geçiş baştan,
+    zararsız biçimde yeniden çalışır.
+    """
+    _add_column_if_missing(conn, "exams", "class_level", "INTEGER")
+    conn.commit()
+
+    max_id = conn.execute(text("SELECT MAX(id) FROM exams")).scalar() or 0
+    for low in range(0, max_id, _BACKFILL_BATCH):
+        conn.execute(text(
+            """
+            UPDATE exams SET
+                class_level = (SELECT class_levels.level FROM class_levels
+                               WHERE class_levels.id = exams.class_level_id),
+                department_id = (SELECT class_levels.department_id FROM class_levels
+                                 WHERE class_levels.id = exams.class_level_id),
+                university_id = (SELECT departments.university_id FROM class_levels
+                                 JOIN departments ON departments.id = class_levels.department_id
+                                 WHERE class_levels.id = exams.class_level_id)
+            WHERE class_level_id IS NOT NULL AND id > :low AND id <= :high
+            """
+        ), {"low": low, "high": low + _BACKFILL_BATCH})
+        conn.commit()
+
+    _create_indexes(conn, models.Exam.__table__)
+    _create_indexes(conn, models.Question.__table__)
+    conn.execute(text("DROP INDEX IF EXISTS ix_questions_question_text"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_questions_answer"))
+
+
+def _exam_version(conn: Connection) -> None:
+    _add_column_if_missing(conn, "exams", "version", "INTEGER NOT NULL DEFAULT 1")
+
+
+def _ai_rate_window_scopes(conn: Connection) -> None:
+    """
+    ai_rate_windows'a bütçe adı (scope) eklenir ve birincil anahtara katılır. Tablo yalnızca
+    dakikalık sayaçlar tuttuğu için satırlar taşınmaz; tablo yeniden oluşturulur.
+    """
+    table = models.AIRateWindow.__table__
+    if inspect(conn).has_table(table.name):
+        columns = {col["name"] for col in inspect(conn).get_columns(table.name)}
+        if "scope" in columns:
+            return
+        table.drop(conn)
+    table.create(conn)
+
+
+def _exam_search_index(conn: Connection) -> None:
+    """
+    Tam metin arama tablosu oluşturulur ve mevcut arşiv bir kez dizinlenir; sonraki
+    yazımlar belgeleri kendi transaction'larında günceller.
+    """
+    search_index.ensure_search_index(conn)
+
+
+MIGRATIONS = [
+    ("0001_exam_hierarchy_filters", _exam_hierarchy_filters),
+    ("0002_exam_version", _exam_version),
+    ("0003_ai_rate_window_scopes", _ai_rate_window_scopes),
+    ("0004_exam_search_index", _exam_search_index),
+]
+
+
+def run_migrations(engine: Engine) -> list[str]:
+    """
+    Bekleyen geçişleri sırayla uygular; her geçiş kendi transaction'ında çalışır ve
+    schema_migrations kaydı bu transaction'la birlikte commit edilir. Büyük geri doldurmalar
+    ara commit'ler (conn.commit()) yapabilir; bu yüzden geçişler tekrar çalıştırılabilir
+    (idempotent) yazılmalıdır. Uygulanan geçişlerin adlarını döndürür.
+    """
+    models.SchemaMigration.__table__.create(engine, checkfirst=True)
+    applied = []
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": _ADVISORY_LOCK_ID})
+            conn.commit()
+        try:
+            done = {row.name for row in conn.execute(text("SELECT name FROM schema_migrations"))}
+            conn.commit()
+            for name, migration in MIGRATIONS:
+                if name in done:
+                    continue
+                try:
+                    migration(conn)
+                    conn.execute(
+                        text("INSERT INTO schema_migrations (name, applied_at) VALUES (:name, :applied_at)"),
+                        {"name": name, "applied_at": time.time()},
+                    )
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+                applied.append(name)
+                print(f"Şema geçişi uygulandı: {name}")
+        finally:
+            if conn.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _ADVISORY_LOCK_ID})
+                conn.commit()
+    return applied
+
+
+# Sınav listesi filtreleri (crud._exam_filter_criteria / get_exams_filtered) ve plan
+# kontrolünde kullanılan örnek değerler
+_FILTER_SAMPLES = {
+    "university_id": 1,
+    "department_id": 1,
+    "class_level": 2,
+    "year": 2023,
+    "semester": "Güz",
+    "course_name": "Fizik",
+}
+
+# course_name ILIKE '%...%' ile aranır; tek başına index kullanamaz (metin araması
+# /exams/search üzerindendir). Başka bir filtreyle birlikteyken ek koşul olarak uygulanır.
+_RESIDUAL_FILTERS = ("course_name",)
+
+
+def filter_combinations() -> list[dict]:
+    """
+    En az bir index'li filtre içeren tüm filtre kombinasyonları.
+    """
+    names = list(_FILTER_SAMPLES)
+    return [
+        {name: _FILTER_SAMPLES[name] for name in combo}
+        for size in range(1, len(names) + 1)
+        for combo in itertools.combinations(names, size)
+        if set(combo) - set(_RESIDUAL_FILTERS)
+    ]
+
+
+def expected_indexes(filters: dict) -> tuple[str, ...]:
+    """
+    exams üzerinde bu filtreleri karşılayabilecek index'ler: ilk sütunu eşitlikle
+    filtrelenen index'ler.
+    """
+    equality = set(filters) - set(_RESIDUAL_FILTERS)
+    return tuple(sorted(
+        index.name for index in models.Exam.__table__.indexes
+        if next(iter(index.columns)).name in equality
+    ))
+
+
+# Soru sayısı alt sorgusu her filtrede bu index'le karşılanmalı
+_QUESTIONS_INDEX = "ix_questions_exam_id"
+
+_PLAN_TABLES = ("exams", "questions")
+
+_SQLITE_SEARCH = re.compile(r"^SEARCH (?:TABLE )?(\w+) USING (?:COVERING )?INDEX (\w+) \((.+)\)")
+
+
+def _plan_postgres(db: Session, sql: str) -> tuple[dict[str, str], list[str]]:
+    plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    used, scans = {}, []
+    stack = [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in _PLAN_TABLES:
+            scans.append(f"Seq Scan on {node['Relation Name']}")
+        if node.get("Index Name") and node.get("Index Cond"):
+            used[node["Index Name"]] = node["Index Cond"]
+        stack.extend(node.get("Plans", []))
+    return used, scans
+
+
+def _plan_sqlite(db: Session, sql: str) -> tuple[dict[str, str], list[str]]:
+    used, scans = {}, []
+    for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")):
+        detail = row[-1]
+        match = _SQLITE_SEARCH.match(detail)
+        if match:
+            used[match.group(2)] = match.group(3)
+        # "SCAN exams USING INDEX ..." da tüm tabloyu dolaşır; filtreli sorguda yalnızca SEARCH kabul edilir
+        words = detail.replace("TABLE ", "").split()
+        if len(words) >= 2 and words[0] == "SCAN" and words[1] in _PLAN_TABLES:
+            scans.append(detail)
+    return used, scans
+
+
+def _plan_explainer(engine: Engine):
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        return _plan_postgres
+    if dialect == "sqlite":
+        return _plan_sqlite
+    return None
+
+
+def check_filter_plan(db: Session, filters: dict) -> list[str]:
+    """
+    Tek bir filtre kombinasyonu için sınav listesi sorgusunun planını alır ve beklenen
+    index'lerden birinin index koşuluyla (Index Cond / SEARCH ... (col=?)) kullanıldığını
+    doğrular. Sorunların açıklamalarını döndürür.
+    """
+    import crud
+
+    engine = db.get_bind()
+    stmt = crud.exam_summaries_select(**filters).limit(50)
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    used, scans = _plan_explainer(engine)(db, sql)
+    problems = [f"{filters}: tam tablo taraması ({scan})" for scan in scans]
+    expected = expected_indexes(filters)
+    if not any(name in used for name in expected):
+        problems.append(f"{filters}: beklenen index ({' / '.join(expected)}) kullanılmıyor, "
+                        f"kullanılanlar: {used or 'yok'}")
+    if _QUESTIONS_INDEX not in used:
+        problems.append(f"{filters}: soru sayısı {_QUESTIONS_INDEX} ile hesaplanmıyor")
+    return problems
+
+
+def check_exam_filter_plans(engine: Engine) -> list[str]:
+    """
+    Tüm filtre kombinasyonlarını check_filter_plan ile kontrol eder. Planlayıcı
+    ayarlarına dokunulmaz; Postgres'te sonuç anlamlı olsun diye kontrol gerçek boyutta ve
+    istatistikleri güncel (ANALYZE) bir veritabanında çalıştırılmalıdır. Aynı kontrol
+    SQLite üzerinde tests/test_exam_filter_plans.py ile her test çalıştırmasında yapılır.
+    """
+    if _plan_explainer(engine) is None:
+        print(f"Sorgu planı kontrolü bu veritabanında desteklenmiyor: {engine.dialect.name}")
+        return []
+
+    problems = []
+    with Session(engine) as db:
+        for filters in filter_combinations():
+            problems += check_filter_plan(db, filters)
+            db.rollback()
+    return problems
+
+
+def main() -> None:
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Şema geçişlerini uygular.")
+    parser.add_argument("--check-plans", action="store_true",
+                        help="Sınav filtre sorgularında tam tablo taraması olmadığını doğrular")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    if args.check_plans:
+        problems = check_exam_filter_plans(engine)
+        for problem in problems:
+            print(f"Plan sorunu: {problem}")
+        if problems:
+            sys.exit(1)
+        print("Tüm filtre kombinasyonları beklenen index'leri kullanıyor.")
+
+
+if __name__ == "__main__":
+    main()
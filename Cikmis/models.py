@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, JSON
+from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, JSON, Text, Float, LargeBinary, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from database import Base
@@ -26,16 +26,28 @@ class Exam(Base):
     university_id = Column(Integer, ForeignKey("universities.id"), nullable=True)
     department_id = Column(Integer, ForeignKey("departments.id"), nullable=True)
     class_level_id = Column(Integer, ForeignKey("class_levels.id"), nullable=True)
+    # class_level_id'den türetilen sınıf seviyesi (ClassLevel.level); filtrelerde join gerekmesin diye
+    class_level = Column(Integer, nullable=True)
+    # Her soru ekleme/silmede artırılır; önbellek anahtarı ve ETag bu değerden üretilir
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     owner = relationship("User", back_populates="exams")
     questions = relationship("Question", back_populates="exam", cascade="all, delete-orphan")
 
+    # Arama filtrelerinin kombinasyonlarına göre; sondaki (year, id) keyset sayfalama sırasını karşılar
+    __table_args__ = (
+        Index("ix_exams_university_year", "university_id", "year", "id"),
+        Index("ix_exams_department_level_year", "department_id", "class_level", "year", "id"),
+        Index("ix_exams_level_year", "class_level", "year", "id"),
+        Index("ix_exams_year_semester", "year", "semester", "id"),
+    )
+
 class Question(Base):
     __tablename__ = "questions"
     id = Column(Integer, primary_key=True, index=True)
-    exam_id = Column(Integer, ForeignKey("exams.id"))
-    question_text = Column(String, index=True)
-    answer = Column(String, index=True)
+    exam_id = Column(Integer, ForeignKey("exams.id"), index=True)
+    question_text = Column(String)
+    answer = Column(String)
     options = Column(JSON)
     exam = relationship("Exam", back_populates="questions")
 
@@ -64,4 +76,182 @@ class ClassLevel(Base):
     level = Column(Integer, nullable=False)
     department_id = Column(Integer, ForeignKey("departments.id"))
 
-    department = relationship("Department", back_populates="class_levels")
\ No newline at end of file
+    department = relationship("Department", back_populates="class_levels")
+
+
+# AI yanıtlarının kalıcı önbellek katmanı (tüm worker'lar tarafından paylaşılır)
+class AICacheEntry(Base):
+    __tablename__ = "ai_cache_entries"
+    key = Column(String(64), primary_key=True)
+    kind = Column(String, nullable=False)
+    ai_model = Column(String, nullable=False, index=True)
+    payload = Column(Text, nullable=False)
+    created_at = Column(Float, nullable=False)
+
+
+# Önceden üretilmiş "benzer soru" havuzu
+class SimilarQuestionPoolItem(Base):
+    __tablename__ = "similar_question_pool"
+    id = Column(Integer, primary_key=True, index=True)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False, index=True)
+    payload = Column(Text, nullable=False)
+    created_at = Column(Float, nullable=False)
+
+
+# Havuz doldurma önceliği için sınav görüntülenme sayıları
+class ExamView(Base):
+    __tablename__ = "exam_views"
+    exam_id = Column(Integer, ForeignKey("exams.id", ondelete="CASCADE"), primary_key=True)
+    view_count = Column(Integer, nullable=False, default=0, index=True)
+
+
+# Yakın kopya tespiti için soru başına MinHash imzası
+class QuestionSignature(Base):
+    __tablename__ = "question_signatures"
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)
+    duplicate_of = Column(Integer, ForeignKey("questions.id", ondelete="SET NULL"), nullable=True, index=True)
+
+
+# Akışla soru içe aktarma; upload_id başına bir kayıt, tekrar gönderimler buradan sürdürülür
+class QuestionImport(Base):
+    __tablename__ = "question_imports"
+    upload_id = Column(String, primary_key=True)
+    exam_id = Column(Integer, ForeignKey("exams.id", ondelete="CASCADE"), nullable=False, index=True)
+    format = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="running")
+    # Girdiden tüketilen satır sayısı (hatalılar dahil); commit edilen son parçaya kadar
+    rows_done = Column(Integer, nullable=False, default=0)
+    inserted = Column(Integer, nullable=False, default=0)
+    duplicates = Column(Integer, nullable=False, default=0)
+    rejected = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON, nullable=False, default=list)
+    created_at = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)
+
+
+# Arka planda worker.py tarafından işlenen AI işleri (bkz. services/ai_jobs.py)
+class AIJob(Base):
+    __tablename__ = "ai_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    # Küçük değer önce çalışır: 0 etkileşimli, 10 toplu
+    priority = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False, default="queued")
+    payload = Column(JSON, nullable=False)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    progress_done = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Integer, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    # Yeniden denemeler için geri çekilme; bu zamandan önce alınmaz
+    run_after = Column(Float, nullable=False)
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(Float, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    created_at = Column(Float, nullable=False)
+    started_at = Column(Float, nullable=True)
+    finished_at = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index("ix_ai_jobs_claim", "status", "priority", "run_after", "id"),
+    )
+
+
+# Worker'lar arası ortak AI çağrı bütçeleri: bütçe (scope) ve dakika başına çağrı sayacı
+class AIRateWindow(Base):
+    __tablename__ = "ai_rate_windows"
+    scope = Column(String, primary_key=True)
+    window_start = Column(Integer, primary_key=True)
+    calls = Column(Integer, nullable=False, default=0)
+
+
+# Çözülen sınavlar (cevap kâğıdı başına bir kayıt). İstemci kâğıda kendi kimliğini
+# verebilir; bu kimlik kullanıcı bazında tekildir, aynı kâğıdın tekrar gönderilmesi ikinci
+# bir kayıt oluşturmaz. Toplu yazılır (bkz. services/attempts.py).
+class ExamAttempt(Base):
+    __tablename__ = "exam_attempts"
+    id = Column(String, primary_key=True)
+    client_attempt_id = Column(String, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    exam_id = Column(Integer, ForeignKey("exams.id", ondelete="CASCADE"), nullable=False, index=True)
+    correct = Column(Integer, nullable=False)
+    answered = Column(Integer, nullable=False)
+    total = Column(Integer, nullable=False)
+    duration_seconds = Column(Float, nullable=True)
+    submitted_at = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_exam_attempts_user_submitted", "user_id", "submitted_at"),
+        UniqueConstraint("user_id", "client_attempt_id", name="uq_exam_attempts_user_client_id"),
+    )
+
+
+# Cevaplanan her soru için bir satır; id artan sırada okunarak analizler artımlı güncellenir
+class AttemptAnswer(Base):
+    __tablename__ = "attempt_answers"
+    id = Column(Integer, primary_key=True)
+    attempt_id = Column(String, ForeignKey("exam_attempts.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False, index=True)
+    given_answer = Column(String, nullable=True)
+    is_correct = Column(Boolean, nullable=False)
+    answered_at = Column(Float, nullable=False)
+
+
+# Performans raporları için artımlı güncellenen özet tablolar; ham cevaplar taranmaz
+class UserExamStats(Base):
+    __tablename__ = "user_exam_stats"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    exam_id = Column(Integer, ForeignKey("exams.id", ondelete="CASCADE"), primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    answered = Column(Integer, nullable=False, default=0)
+    questions = Column(Integer, nullable=False, default=0)
+    best_correct = Column(Integer, nullable=False, default=0)
+    last_correct = Column(Integer, nullable=False, default=0)
+    last_attempt_at = Column(Float, nullable=False)
+
+
+class UserCourseStats(Base):
+    __tablename__ = "user_course_stats"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    course_name = Column(String, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    answered = Column(Integer, nullable=False, default=0)
+    questions = Column(Integer, nullable=False, default=0)
+    last_attempt_at = Column(Float, nullable=False)
+
+
+class ExamStats(Base):
+    __tablename__ = "exam_stats"
+    exam_id = Column(Integer, ForeignKey("exams.id", ondelete="CASCADE"), primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    answered = Column(Integer, nullable=False, default=0)
+    questions = Column(Integer, nullable=False, default=0)
+
+
+class QuestionStats(Base):
+    __tablename__ = "question_stats"
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
+    answered = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+
+
+# Veritabanının kalıcı kimliği (tek satır); diskteki türetilmiş veriler (ör. analiz
+# görüntüsü) başka bir veritabanından gelmişse bununla ayırt edilir
+class DatabaseIdentity(Base):
+    __tablename__ = "database_identity"
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=False)
+
+
+# Uygulanmış şema geçişleri (bkz. migrations.py)
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+    name = Column(String, primary_key=True)
+    applied_at = Column(Float, nullable=False)
@@ -1,11 +1,16 @@
 # routers/academics.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 
-import crud, schemas
-from database import get_db
+import crud, crud_async, schemas
+from database import get_async_db, get_db
+from routers.auth import get_current_active_user
+from services import fast_json
+from services.academic_tree import academic_tree
+from services.query_profiler import QueryBudget
 
 router = APIRouter(
     prefix="/academics",
@@ -14,36 +19,64 @@ router = APIRouter(
 
 # --- University Endpoints ---
 
-@router.post("/universities/", response_model=schemas.University)
+@router.post("/universities/", response_model=schemas.University, dependencies=[Depends(QueryBudget(2))])
 def create_university(university: schemas.UniversityCreate, db: Session = Depends(get_db)):
     return crud.create_university(db=db, name=university.name)
 
-@router.get("/universities/", response_model=List[schemas.University])
-def read_universities(db: Session = Depends(get_db)):
-    return crud.get_universities(db)
+@router.get("/universities/", response_model=List[schemas.University], dependencies=[Depends(QueryBudget(1))])
+async def read_universities(request: Request, db: AsyncSession = Depends(get_async_db)):
+    universities = await crud_async.get_universities(db)
+    return fast_json.json_response(request, [fast_json.university_dict(u) for u in universities])
 
 # --- Department Endpoints ---
 
-@router.post("/departments/", response_model=schemas.Department)
+@router.post("/departments/", response_model=schemas.Department, dependencies=[Depends(QueryBudget(2))])
 def create_department(department: schemas.DepartmentCreate, db: Session = Depends(get_db)):
     return crud.create_department(db=db, name=department.name, university_id=department.university_id)
 
-@router.get("/universities/{university_id}/departments/", response_model=List[schemas.Department])
-def read_departments_for_university(university_id: int, db: Session = Depends(get_db)):
-    departments = crud.get_departments_by_university(db, university_id=university_id)
+@router.get("/universities/{university_id}/departments/", response_model=List[schemas.Department], dependencies=[Depends(QueryBudget(1))])
+async def read_departments_for_university(university_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    departments = await crud_async.get_departments_by_university(db, university_id=university_id)
     if not departments:
         raise HTTPException(status_code=404, detail="University not found or has no departments")
-    return departments
+    return fast_json.json_response(request, [fast_json.department_dict(d) for d in departments])
 
 # --- Class Level Endpoints ---
 
-@router.post("/class-levels/", response_model=schemas.ClassLevel)
+@router.post("/class-levels/", response_model=schemas.ClassLevel, dependencies=[Depends(QueryBudget(2))])
 def create_class_level(class_level: schemas.ClassLevelCreate, db: Session = Depends(get_db)):
     return crud.create_class_level(db=db, level=class_level.level, department_id=class_level.department_id)
 
-@router.get("/departments/{department_id}/classes/", response_model=List[schemas.ClassLevel])
-def read_classes_for_department(department_id: int, db: Session = Depends(get_db)):
-    classes = crud.get_classes_by_department(db, department_id=department_id)
+@router.get("/departments/{department_id}/classes/", response_model=List[schemas.ClassLevel], dependencies=[Depends(QueryBudget(1))])
+async def read_classes_for_department(department_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    classes = await crud_async.get_classes_by_department(db, department_id=department_id)
     if not classes:
          raise HTTPException(status_code=404, detail="Department not found or has no class levels")
-    return classes
\ No newline at end of file
+    return fast_json.json_response(request, [fast_json.class_level_dict(c) for c in classes])
+
+# --- Academic Tree Endpoints ---
+# Üniversite -> Bölüm -> Sınıf ağacı tek yanıtta; bellekte serileştirilmiş halde tutulur
+# ve ETag ile döner. Yukarıdaki ayrı ayrı liste endpoint'lerinin yerine kullanılabilir.
+
+@router.get("/tree", response_model=List[schemas.UniversityTree], dependencies=[Depends(QueryBudget(3))])
+async def read_academic_tree(request: Request, db: AsyncSession = Depends(get_async_db)):
+    node = (await academic_tree.get_async(db)).tree
+    return fast_json.json_response(request, body=node.body, etag=node.etag)
+
+@router.get("/tree/universities/{university_id}", response_model=schemas.UniversityTree, dependencies=[Depends(QueryBudget(3))])
+async def read_university_tree(university_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    node = (await academic_tree.get_async(db)).universities.get(university_id)
+    if node is None:
+        raise HTTPException(status_code=404, detail="University not found")
+    return fast_json.json_response(request, body=node.body, etag=node.etag)
+
+@router.get("/tree/departments/{department_id}", response_model=schemas.DepartmentTree, dependencies=[Depends(QueryBudget(3))])
+async def read_department_tree(department_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    node = (await academic_tree.get_async(db)).departments.get(department_id)
+    if node is None:
+        raise HTTPException(status_code=404, detail="Department not found")
+    return fast_json.json_response(request, body=node.body, etag=node.etag)
+
+@router.get("/tree/stats")
+async def read_academic_tree_stats(current_user: schemas.User = Depends(get_current_active_user)):
+    return academic_tree.stats()
@@ -0,0 +1,91 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from starlette import status
+
+import schemas
+from database import get_db
+from routers.auth import get_current_active_user
+from services import attempts
+from services.study_analytics import analytics
+from services.query_profiler import QueryBudget
+
+router = APIRouter(
+    prefix="/attempts",
+    tags=["Attempts"]
+)
+
+# 📌 Cevap kâğıdı gönder (sunucuda puanlanır, kayıt toplu yazılır)
+@router.post(
+    "/exams/{exam_id}",
+    response_model=schemas.AttemptResult,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(QueryBudget(3))],
+)
+def submit_attempt(
+    exam_id: int,
+    submission: schemas.AttemptSubmit,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    """
+    Sonuç hemen döner; kâğıt en geç attempts_flush_interval_seconds içinde yazılır ve
+    raporlara yansır. attempt_id gönderilirse aynı kâğıdın tekrar gönderimi bir kez sayılır.
+    """
+    return attempts.submit(db, exam_id, current_user.id, submission)
+
+# 📌 Kullanıcının ders bazında başarısı
+@router.get("/me/courses", response_model=List[schemas.UserCourseStats], dependencies=[Depends(QueryBudget(1))])
+def read_my_course_stats(
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    return attempts.user_course_stats(db, current_user.id)
+
+# 📌 Kullanıcının sınav bazında başarısı
+@router.get("/me/exams", response_model=List[schemas.UserExamStats], dependencies=[Depends(QueryBudget(1))])
+def read_my_exam_stats(
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    return attempts.user_exam_stats(db, current_user.id)
+
+# 📌 Sınavın genel ve soru bazında başarısı
+@router.get("/exams/{exam_id}/stats", response_model=schemas.ExamStats, dependencies=[Depends(QueryBudget(3))])
+def read_exam_stats(
+    exam_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    return attempts.exam_stats(db, exam_id)
+
+# 📌 Kullanıcının zayıf olduğu dersler ve çalışması önerilen sorular
+@router.get("/me/weaknesses", response_model=schemas.StudyReport)
+def read_my_weaknesses(
+    limit: int = Query(10, ge=0, le=100),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    """
+    Analiz matrisi arka planda güncellenir; yeni cevaplar en geç
+    analytics_refresh_interval_seconds içinde yansır.
+    """
+    return analytics.user_report(current_user.id, limit)
+
+# 📌 Derslerin zorluk sıralaması (kolaydan zora)
+@router.get("/difficulty/courses", response_model=List[schemas.CourseDifficulty])
+def read_course_difficulty(current_user: schemas.User = Depends(get_current_active_user)):
+    return analytics.course_difficulty()
+
+# 📌 Sınavdaki soruların zorluğu
+@router.get("/exams/{exam_id}/difficulty", response_model=List[schemas.QuestionDifficulty])
+def read_exam_difficulty(
+    exam_id: int,
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    return analytics.exam_difficulty(exam_id)
+
+# 📌 Yazım kuyruğunun ve analiz matrisinin durumu
+@router.get("/buffer")
+def read_buffer_stats(current_user: schemas.User = Depends(get_current_active_user)):
+    return {**attempts.buffer.stats(), "analytics": analytics.stats()}
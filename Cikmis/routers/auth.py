@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
@@ -16,6 +17,8 @@ import security
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import get_db
+from services import auth_cache, query_profiler
+from services.query_profiler import QueryBudget
 from models import User
 from schemas import UserCreate, Token
 
@@ -39,27 +42,21 @@ def get_password_hash(password):
 def get_auth_info():
     return {"message": "Auth endpoint"}
 
-@router.post("/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.username == user.username).first()
+@router.post("/register", dependencies=[Depends(QueryBudget(3))])
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    existing_user = await run_in_threadpool(crud.get_user_by_username, db, user.username)
     if existing_user:
         raise HTTPException(status_code=400, detail="Bu kullanıcı adı zaten kayıtlı.")
 
-    hashed_pw = security.get_password_hash(user.password)
-    new_user = User(
-        username=user.username, 
-        email=user.email,
-        hashed_password=hashed_pw
-    )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    # bcrypt ayrı süreç havuzunda çalışır; havuz kuyruğu doluysa 503 döner
+    hashed_pw = await security.get_password_hash_async(user.password)
+    await run_in_threadpool(crud.create_user, db, user, hashed_pw)
     return {"message": "Kayıt başarılı."}
 
 
-@router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.authenticate_user(
+@router.post("/login", response_model=schemas.Token, dependencies=[Depends(QueryBudget(2))])
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await crud.authenticate_user_async(
         db,
         email=form_data.username,
         password=form_data.password
@@ -85,23 +82,40 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         detail="Kimlik bilgileri doğrulanamadı",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        # Token'ı gizli anahtar (secret_key) ile çözümleriz.
-        payload = jwt.decode(token, config.settings.secret_key, algorithms=[config.settings.algorithm])
-        # Token içindeki 'sub' alanından kullanıcı email'ini alırız.
-        email: str = payload.get("sub")
-        if email is None:
+    # Daha önce doğrulanmış token'lar için imza kontrolü tekrarlanmaz.
+    payload = auth_cache.get_claims(token)
+    if payload is None:
+        try:
+            # Token'ı gizli anahtar (secret_key) ile çözümleriz.
+            payload = jwt.decode(token, config.settings.secret_key, algorithms=[config.settings.algorithm])
+        except JWTError:
             raise credentials_exception
-    except JWTError:
+        auth_cache.set_claims(token, payload)
+
+    # Token içindeki 'sub' alanından kullanıcı email'ini alırız.
+    email: str = payload.get("sub")
+    if email is None:
         raise credentials_exception
-    
-    # Email ile kullanıcıyı veritabanından buluruz.
-    user = crud.get_user_by_email(db, email=email)
-    if user is None:
+
+    user = auth_cache.get_principal(email)
+    if user is not None:
+        return user
+
+    # Önbellekte yoksa email ile kullanıcıyı veritabanından buluruz. Bu sorgu önbelleğin
+    # durumuna bağlı olduğundan route'ların sorgu bütçesine sayılmaz.
+    with query_profiler.unbudgeted():
+        db_user = crud.get_user_by_email(db, email=email)
+    if db_user is None:
         raise credentials_exception
+    user = schemas.User.model_validate(db_user)
+    auth_cache.set_principal(email, user)
     return user
 
-def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+def get_current_active_user(current_user: schemas.User = Depends(get_current_user)):
 
     # Örnek: if not current_user.is_active: raise HTTPException(...)
-    return current_user
\ No newline at end of file
+    return current_user
+
+@router.get("/cache/stats")
+def get_auth_cache_stats(current_user: schemas.User = Depends(get_current_active_user)):
+    return auth_cache.stats()
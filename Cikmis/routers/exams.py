@@ -1,20 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Awaitable, Callable, List, Optional
 from starlette import status
 
 import crud
+import crud_async
 import schemas
-from database import get_db
+from config import settings
+from database import get_async_db, get_db
 from routers.auth import get_current_active_user  # Kendi auth yapına göre düzenle
 
-from services import ai_service
+from services import ai_service, etag, exam_export, fast_json, question_import, resilience
+from services.ai_cache import cache as ai_cache
+from services.exam_cache import exam_cache
+from services.question_pool import question_pool
+from services.query_profiler import QueryBudget
 
 router = APIRouter(
     prefix="/exams",
     tags=["Exams"]
 )
 
+async def ai_deadline(x_request_deadline_ms: Optional[int] = Header(None)):
+    """
+    İstemci X-Request-Deadline-Ms başlığıyla bir süre bütçesi gönderirse,
+    bu istek için yapılan tüm AI çağrıları bu süreyi aşmaz. Çok küçük değerler
+    ai_min_deadline_ms'e yükseltilir.
+    """
+    if x_request_deadline_ms is not None:
+        resilience.set_deadline(max(x_request_deadline_ms, settings.ai_min_deadline_ms) / 1000)
+
+async def _versioned_response(
+    request: Request,
+    exam_id: int,
+    kind: str,
+    db: AsyncSession,
+    build: Callable[[], Awaitable[Optional[bytes]]],
+    not_found: str
+) -> Response:
+    """
+    Sınav sürümüne bağlı JSON yanıtı ETag ile döndürür. İstemcinin ETag'i güncelse
+    304 döner; sürüm bellekte biliniyorsa bu durumda DB'ye hiç gidilmez.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    version = exam_cache.known_version(exam_id)
+    if version is not None:
+        current_etag = exam_cache.etag(exam_id, version, kind)
+        if etag.matches(if_none_match, current_etag):
+            return fast_json.json_response(request, body=b"", etag=current_etag)
+
+    version = await exam_cache.version_async(db, exam_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    current_etag = exam_cache.etag(exam_id, version, kind)
+    if etag.matches(if_none_match, current_etag):
+        return fast_json.json_response(request, body=b"", etag=current_etag)
+
+    body = await exam_cache.get_or_build_async(exam_id, version, kind, build)
+    if body is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    return fast_json.json_response(request, body=body, etag=current_etag)
+
 # 📌 Yeni sınav oluşturma
 @router.post("/", response_model=schemas.Exam, status_code=status.HTTP_201_CREATED)
 def create_exam(
@@ -30,65 +80,190 @@ def create_exam(
     """
     return crud.create_exam(db=db, exam=exam, user_id=current_user.id)
 
-# 📌 Sınavları filtreleyerek listele
-@router.get("/", response_model=List[schemas.Exam])
-def search_exams(
+# 📌 Sınavları filtreleyerek listele (sayfalı özet)
+@router.get("/", response_model=schemas.ExamPage, dependencies=[Depends(QueryBudget(1))])
+async def search_exams(
+    request: Request,
     university_id: Optional[int] = None,
     department_id: Optional[int] = None,
     class_level: Optional[int] = None,
     course_name: Optional[str] = None,
     year: Optional[int] = None,
     semester: Optional[str] = None,
-    db: Session = Depends(get_db)
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Belirtilen kriterlere göre sınavları filtreleyerek listeler.
     Tüm parametreler opsiyoneldir.
+    Sonuçlar soru listesi olmadan özet olarak döner; sonraki sayfa için
+    yanıttaki next_cursor değeri cursor parametresiyle gönderilir.
+    Soruların tamamı /exams/{exam_id}/questions üzerinden alınır.
     """
-    exams = crud.get_exams_filtered(
+    try:
+        decoded_cursor = crud.decode_exam_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    items, next_cursor = await crud_async.get_exam_summaries_page(
         db=db,
         university_id=university_id,
         department_id=department_id,
         class_level=class_level,
         course_name=course_name,
         year=year,
-        semester=semester
+        semester=semester,
+        limit=limit,
+        cursor=decoded_cursor
     )
-    if not exams:
+    if not items and cursor is None:
         raise HTTPException(status_code=404, detail="No exams found for the selected filters.")
-    return exams
+    return fast_json.json_response(request, {
+        "items": [fast_json.row_dict(row) for row in items],
+        "next_cursor": next_cursor
+    })
+
+# 📌 Filtrelenmiş sınav arşivini akışla dışa aktar (JSONL / CSV)
+@router.get("/export")
+def export_exams(
+    university_id: Optional[int] = None,
+    department_id: Optional[int] = None,
+    class_level: Optional[int] = None,
+    course_name: Optional[str] = None,
+    year: Optional[int] = None,
+    semester: Optional[str] = None,
+    format: str = Query("jsonl", pattern="^(jsonl|csv)$"),
+    after_id: Optional[int] = Query(None, ge=0),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    """
+    Filtrelere uyan tüm sınavları sorularıyla birlikte sınav kimliği sırasıyla akıtır;
+    sonuç ne kadar büyük olursa olsun bellekte tutulmaz.
+    - jsonl: sınav başına bir satır. csv: soru başına bir satır (exam_id ilk sütundur).
+    - Yarıda kalan aktarım, tamamı alınmış son sınavın kimliği after_id olarak
+      gönderilerek sürdürülür (CSV'de son sınavın satırları eksik olabilir).
+    """
+    return StreamingResponse(
+        exam_export.export_exams(
+            format, after_id=after_id, university_id=university_id, department_id=department_id,
+            class_level=class_level, year=year, semester=semester, course_name=course_name
+        ),
+        media_type=exam_export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="exams.{format}"'}
+    )
+
+# 📌 Tam metin arama (sınav başlığı, ders adı, açıklama ve soru metinleri)
+@router.get("/search", response_model=List[schemas.ExamSearchHit], dependencies=[Depends(QueryBudget(2))])
+async def full_text_search(
+    request: Request,
+    q: str = Query(..., min_length=2),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Türkçe karakter ve büyük/küçük harf duyarsız arama yapar ("isletim" -> "İşletim").
+    Sonuçlar alaka skoruna göre sıralanır.
+    """
+    try:
+        hits = await crud_async.search_exams(db, q, limit=limit, offset=offset)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return fast_json.json_response(request, hits)
 
 # 📌 Sınav detaylarını getir
-@router.get("/{exam_id}", response_model=schemas.Exam)
-def read_exam(exam_id: int, db: Session = Depends(get_db)):
-    db_exam = crud.get_exam_by_id(db, exam_id=exam_id)
-    if db_exam is None:
-        raise HTTPException(status_code=404, detail="Exam not found")
-    return db_exam
+@router.get("/{exam_id}", response_model=schemas.Exam, dependencies=[Depends(QueryBudget(3))])
+async def read_exam(exam_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def _build():
+        db_exam = await crud_async.get_exam_with_questions(db, exam_id=exam_id)
+        if db_exam is None:
+            return None
+        return fast_json.dumps(fast_json.exam_dict(db_exam))
+
+    return await _versioned_response(request, exam_id, "exam", db, _build, "Exam not found")
 
 # 📌 Bir sınavın sorularını getir
-@router.get("/{exam_id}/questions", response_model=List[schemas.Question])
-def get_questions_by_exam(exam_id: int, db: Session = Depends(get_db)):
-    questions = crud.get_questions_by_exam(db, exam_id)
-    if not questions:
-        raise HTTPException(status_code=404, detail="No questions found for this exam.")
-    return questions
+@router.get("/{exam_id}/questions", response_model=List[schemas.Question], dependencies=[Depends(QueryBudget(2))])
+async def get_questions_by_exam(exam_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def _build():
+        questions = await crud_async.get_questions_by_exam(db, exam_id)
+        if not questions:
+            return None
+        return fast_json.dumps([fast_json.question_dict(q) for q in questions])
+
+    response = await _versioned_response(
+        request, exam_id, "questions", db, _build, "No questions found for this exam."
+    )
+    question_pool.record_view(exam_id)
+    return response
 
 # 📌 Benzer soru oluştur (AI)
-@router.post("/generate-similar-question", response_model=schemas.GeminiQuestionResponse)
-def generate_similar_question(request: schemas.GenerateQuestionRequest):
-    return ai_service.generate_question_with_ai(request.original_question)
+@router.post("/generate-similar-question", response_model=schemas.GeminiQuestionResponse, dependencies=[Depends(ai_deadline)])
+async def generate_similar_question(request: schemas.GenerateQuestionRequest):
+    # Önceden üretilmiş havuzda soru varsa modeli beklemeden onu döndür
+    if request.question_id is not None:
+        pooled = await question_pool.pop(request.question_id)
+        if pooled is not None:
+            return pooled
+    return await ai_service.generate_question_with_ai(request.original_question)
 
 # 📌 Soruyu açıkla (AI)
-@router.post("/explain-question", response_model=schemas.QuestionExplanationResponse)
-def explain_question(request: schemas.ExplainQuestionRequest):
-    return ai_service.explain_question_with_ai(request)
+@router.post("/explain-question", response_model=schemas.QuestionExplanationResponse, dependencies=[Depends(ai_deadline)])
+async def explain_question(request: schemas.ExplainQuestionRequest):
+    return await ai_service.explain_question_with_ai(request)
+
+# 📌 Soruyu açıkla (AI, Server-Sent Events akışı)
+@router.post("/explain-question/stream", dependencies=[Depends(ai_deadline)])
+async def explain_question_stream(request: schemas.ExplainQuestionRequest):
+    async def _sse():
+        try:
+            async for chunk in ai_service.explain_question_stream(request):
+                yield f"data: {json.dumps({'delta': chunk}, ensure_ascii=False)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except HTTPException as e:
+            yield f"event: error\ndata: {json.dumps({'detail': e.detail}, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        _sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# 📌 Bir sınavın tüm soruları için benzer soru üret (AI, NDJSON akışı)
+@router.post("/{exam_id}/generate-similar", dependencies=[Depends(ai_deadline)])
+async def generate_similar_for_exam(exam_id: int, db: AsyncSession = Depends(get_async_db)):
+    questions = await crud_async.get_questions_by_exam(db, exam_id)
+    if not questions:
+        raise HTTPException(status_code=404, detail="No questions found for this exam.")
+
+    async def _ndjson():
+        async for item in ai_service.generate_similar_questions_stream(questions):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+
+# 📌 AI önbellek istatistikleri
+@router.get("/ai/stats")
+def get_ai_stats(current_user: schemas.User = Depends(get_current_active_user)):
+    return {
+        "cache": ai_cache.stats(),
+        "singleflight": ai_service.flight.stats(),
+        "pool": question_pool.stats(),
+        "upstream": ai_service.upstream_stats(),
+    }
+
+# 📌 Sınav yanıt önbelleği istatistikleri
+@router.get("/cache/stats")
+def get_exam_cache_stats(current_user: schemas.User = Depends(get_current_active_user)):
+    return exam_cache.stats()
 
 # 📌 Sınava toplu soru yükle
 @router.post("/{exam_id}/upload-questions", status_code=status.HTTP_201_CREATED, response_model=List[schemas.Question])
 def upload_questions_to_exam(
     exam_id: int,
     questions_data: List[schemas.QuestionUpload],
+    response: Response,
     db: Session = Depends(get_db)
 ):
     questions_to_create = []
@@ -101,4 +276,27 @@ def upload_questions_to_exam(
             )
         )
     created_questions = crud.create_questions_bulk(db, exam_id, questions_to_create)
-    return created_questions
\ No newline at end of file
+    # dedup_mode=reject iken yakın kopya olduğu için eklenmeyen soru sayısı
+    response.headers["X-Duplicates-Rejected"] = str(len(questions_to_create) - len(created_questions))
+    return [fast_json.question_dict(question, duplicate_of) for question, duplicate_of in created_questions]
+
+# 📌 CSV/JSONL dosyasından akışla toplu soru içe aktar
+@router.post("/{exam_id}/import", response_model=schemas.QuestionImportReport)
+def import_questions_to_exam(
+    exam_id: int,
+    file: UploadFile = File(...),
+    x_upload_id: str = Header(..., min_length=1, max_length=128),
+    format: Optional[str] = Query(None, pattern="^(csv|jsonl)$"),
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    """
+    On binlerce soruyu tek istekte içe aktarır. Dosya satır satır işlenir; hatalı
+    satırlar raporda listelenir, geri kalanı eklenir.
+    - CSV: question_text, answer ve isteğe bağlı options sütunları (JSON dizisi ya da "|" ile ayrılmış).
+    - JSONL: her satırda {"question_text": ..., "answer": ..., "options": [...]}.
+    - X-Upload-Id başlığı zorunludur; aynı kimlikle tekrar gönderilen dosya kaldığı
+      yerden devam eder, tamamlanmışsa yeniden eklenmeden aynı rapor döner.
+    """
+    fmt = question_import.detect_format(file.filename, file.content_type, format)
+    return question_import.import_questions(db, exam_id, x_upload_id, file.file, fmt)
@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette import status
+
+import schemas
+from config import settings
+from database import SessionLocal, get_db
+from routers.auth import get_current_active_user
+from services import ai_jobs
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["AI Jobs"]
+)
+
+# 📌 Arka planda çalışacak AI işi oluştur (worker.py tarafından işlenir)
+@router.post("/", response_model=schemas.AIJob, status_code=status.HTTP_202_ACCEPTED)
+def submit_job(
+    request: schemas.AIJobCreate,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    """
+    İş türleri ve payload'ları:
+    - explain_question: ExplainQuestionRequest (etkileşimli)
+    - generate_question: {"original_question": ...} (etkileşimli)
+    - explain_exam, generate_similar_exam: {"exam_id": ...} (toplu)
+    - regenerate_department: {"department_id": ...} (toplu)
+
+    Durum GET /jobs/{id} ile sorgulanır ya da GET /jobs/{id}/events ile izlenir;
+    sonuç tamamlanınca GET /jobs/{id}/result ile alınır.
+    """
+    return ai_jobs.job_dict(ai_jobs.submit(db, current_user.id, request))
+
+# 📌 İş durumu
+@router.get("/{job_id}", response_model=schemas.AIJob)
+def read_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    return ai_jobs.job_dict(ai_jobs.get_job(db, job_id, current_user.id))
+
+# 📌 İş sonucu
+@router.get("/{job_id}/result")
+def read_job_result(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    job = ai_jobs.get_job(db, job_id, current_user.id)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"İş henüz tamamlanmadı (durum: {job.status}).")
+    return job.result
+
+# 📌 İşi iptal et
+@router.post("/{job_id}/cancel", response_model=schemas.AIJob)
+def cancel_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    return ai_jobs.job_dict(ai_jobs.cancel(db, job_id, current_user.id))
+
+# 📌 İş durumunu izle (Server-Sent Events)
+@router.get("/{job_id}/events")
+def job_events(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_active_user)
+):
+    """
+    Durum ya da ilerleme değiştikçe "status" olayı gönderir; iş bitince "done" olayıyla kapanır.
+    """
+    ai_jobs.get_job(db, job_id, current_user.id)
+
+    def _snapshot() -> dict:
+        with SessionLocal() as session:
+            return ai_jobs.job_dict(ai_jobs.get_job(session, job_id, current_user.id))
+
+    async def _sse():
+        last = None
+        while True:
+            try:
+                snapshot = await run_in_threadpool(_snapshot)
+            except HTTPException as e:
+                yield f"event: error\ndata: {json.dumps({'detail': e.detail}, ensure_ascii=False)}\n\n"
+                return
+            if snapshot != last:
+                yield f"event: status\ndata: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+                last = snapshot
+            if snapshot["status"] in ai_jobs.TERMINAL_STATUSES:
+                yield "event: done\ndata: {}\n\n"
+                return
+            await asyncio.sleep(settings.ai_jobs_poll_interval_seconds)
+
+    return StreamingResponse(
+        _sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
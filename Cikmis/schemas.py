@@ -1,6 +1,6 @@
 # schemas.py
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional
 
 # --- Question Schemas ---
@@ -15,6 +15,7 @@ class QuestionCreate(QuestionBase):
 class Question(QuestionBase):
     id: int
     exam_id: int
+    duplicate_of: Optional[int] = None
     class Config:
         from_attributes = True
 
@@ -39,6 +40,20 @@ class Exam(ExamBase):
     class Config:
         from_attributes = True
 
+class ExamSummary(ExamBase):
+    id: int
+    user_id: int
+    question_count: int = 0
+    class Config:
+        from_attributes = True
+
+class ExamSearchHit(ExamSummary):
+    score: float
+
+class ExamPage(BaseModel):
+    items: List[ExamSummary]
+    next_cursor: Optional[str] = None
+
 # --- User Schemas ---
 class UserBase(BaseModel):
     username: str
@@ -100,6 +115,13 @@ class ClassLevel(ClassLevelBase):
     class Config:
         from_attributes = True
 
+# Akademik birim ağacı (GET /academics/tree)
+class DepartmentTree(Department):
+    class_levels: List[ClassLevel] = []
+
+class UniversityTree(University):
+    departments: List[DepartmentTree] = []
+
 # Diğer şemalarınız (Gemini vs.) burada kalabilir.
 class GeminiOption(BaseModel):
     options: str
@@ -112,6 +134,7 @@ class GeminiQuestionResponse(BaseModel):
 
 class GenerateQuestionRequest(BaseModel):
     original_question: str
+    question_id: Optional[int] = None
 
 class ExplainQuestionRequest(BaseModel):
     question: str
@@ -129,4 +152,130 @@ class QuestionUpload(BaseModel):
 
 class QuestionsUploadRequest(BaseModel):
     exam_id: int
-    questions: List[QuestionUpload]
\ No newline at end of file
+    questions: List[QuestionUpload]
+
+class AIJobCreate(BaseModel):
+    kind: str
+    payload: dict
+    # "interactive" ya da "bulk"; verilmezse işin türüne göre seçilir
+    priority: Optional[str] = None
+
+class AIJob(BaseModel):
+    id: int
+    kind: str
+    priority: str
+    status: str
+    progress_done: int
+    progress_total: Optional[int] = None
+    attempts: int
+    max_attempts: int
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+class ExamJobPayload(BaseModel):
+    exam_id: int
+
+class DepartmentJobPayload(BaseModel):
+    department_id: int
+
+class AnswerSubmit(BaseModel):
+    question_id: int
+    answer: Optional[str] = None
+
+class AttemptSubmit(BaseModel):
+    # İstemci verirse aynı kâğıdın tekrar gönderimi ikinci kez sayılmaz
+    attempt_id: Optional[str] = Field(None, min_length=1, max_length=64)
+    answers: List[AnswerSubmit]
+    duration_seconds: Optional[float] = Field(None, ge=0)
+
+class AnswerResult(BaseModel):
+    question_id: int
+    correct: bool
+    correct_answer: str
+
+class AttemptResult(BaseModel):
+    attempt_id: str
+    exam_id: int
+    correct: int
+    answered: int
+    total: int
+    results: List[AnswerResult]
+
+class PerformanceStats(BaseModel):
+    attempts: int
+    correct: int
+    answered: int
+    questions: int
+    success_rate: Optional[float] = None
+
+class UserCourseStats(PerformanceStats):
+    course_name: str
+    last_attempt_at: float
+
+class UserExamStats(PerformanceStats):
+    exam_id: int
+    best_correct: int
+    last_correct: int
+    last_attempt_at: float
+
+class QuestionStats(BaseModel):
+    question_id: int
+    answered: int
+    correct: int
+    success_rate: Optional[float] = None
+
+class ExamStats(PerformanceStats):
+    exam_id: int
+    question_stats: List[QuestionStats]
+
+class CourseWeakness(BaseModel):
+    course_name: Optional[str] = None
+    # Zorluğa göre beklenenden ne kadar az doğru (deneme başına); pozitif = zayıf
+    weakness: float
+    attempted: int
+    correct: int
+    expected_correct: float
+
+class StudyRecommendation(BaseModel):
+    question_id: int
+    exam_id: int
+    course_name: Optional[str] = None
+    difficulty: float
+    # Daha önce yanlış cevaplanmış soru
+    retry: bool
+
+class StudyReport(BaseModel):
+    user_id: int
+    courses: List[CourseWeakness]
+    recommendations: List[StudyRecommendation]
+
+class CourseDifficulty(BaseModel):
+    course_name: Optional[str] = None
+    difficulty: float
+    attempted: int
+    correct: int
+
+class QuestionDifficulty(BaseModel):
+    question_id: int
+    difficulty: float
+    attempted: int
+    correct: int
+
+class QuestionImportError(BaseModel):
+    row: int
+    error: str
+
+class QuestionImportReport(BaseModel):
+    upload_id: str
+    exam_id: int
+    status: str
+    rows: int
+    inserted: int
+    duplicates: int
+    rejected_duplicates: int
+    failed: int
+    errors: List[QuestionImportError]
+    errors_truncated: bool
+    replayed: bool
\ No newline at end of file
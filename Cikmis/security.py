@@ -1,17 +1,83 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 
 from config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min/max ayarları sayesinde maliyet faktörü değiştiğinde eski hash'ler needs_update ile işaretlenir
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Şifreyi doğrular; hash eski bir maliyet faktörüyle üretilmişse yeni hash'i de döndürür.
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+
+# bcrypt CPU yoğun olduğu için async endpoint'ler hash işlemlerini ayrı süreçlerde yapar;
+# böylece giriş yoğunluğu GIL'i tutup diğer istekleri yavaşlatmaz.
+_hash_pool: ProcessPoolExecutor | None = None
+_hash_pool_lock = threading.Lock()
+_pending_hashes = 0
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=settings.password_hash_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _hash_pool
+
+async def _run_in_hash_pool(fn, *args):
+    global _pending_hashes
+    with _hash_pool_lock:
+        if _pending_hashes >= settings.password_hash_max_queue:
+            raise HTTPException(
+                status_code=503,
+                detail="Sunucu şu anda çok yoğun, lütfen biraz sonra tekrar deneyin.",
+                headers={"Retry-After": "1"}
+            )
+        _pending_hashes += 1
+    try:
+        return await asyncio.wrap_future(_get_hash_pool().submit(fn, *args))
+    finally:
+        with _hash_pool_lock:
+            _pending_hashes -= 1
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_hash_pool(get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return await _run_in_hash_pool(verify_and_update_password, plain_password, hashed_password)
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=False, cancel_futures=True)
+            _hash_pool = None
+
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+import models
+from config import settings
+from services import fast_json
+
+
+@dataclass(frozen=True)
+class SerializedNode:
+    body: bytes
+    etag: str
+
+
+def _serialize(value: Any) -> SerializedNode:
+    body = fast_json.dumps(value)
+    # İçerikten türetildiği için aynı ağacı kuran tüm worker'lar aynı ETag'i üretir
+    return SerializedNode(body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"')
+
+
+@dataclass(frozen=True)
+class HierarchySnapshot:
+    tree: SerializedNode
+    universities: Mapping[int, SerializedNode]
+    departments: Mapping[int, SerializedNode]
+    built_at: float
+
+
+class AcademicHierarchyCache:
+    """
+    Üniversite -> Bölüm -> Sınıf ağacını tek sorguyla kurar ve tüm alt ağaçlarıyla
+    birlikte serileştirilmiş olarak saklar. Hiyerarşiyi değiştiren crud fonksiyonları
+    invalidate çağırır; ağaç bir sonraki istekte yeniden kurulur. Diğer worker'lardaki
+    değişiklikler için academic_tree_ttl_seconds üst sınırdır.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: HierarchySnapshot | None = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        # Soğuk önbellekte eşzamanlı istekler ağacı tek bir kez kursun diye
+        self._build_lock = threading.Lock()
+        # Async endpoint'ler event loop'u bloklamamak için ayrı bir asyncio kilidi kullanır
+        self._async_build_lock: asyncio.Lock | None = None
+        self.builds = 0
+
+    def _fresh(self) -> HierarchySnapshot | None:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.built_at < self.ttl_seconds:
+            return snapshot
+        return None
+
+    def get(self, db: Session) -> HierarchySnapshot:
+        snapshot = self._fresh()
+        if snapshot is not None:
+            return snapshot
+        with self._build_lock:
+            snapshot = self._fresh()
+            if snapshot is not None:
+                return snapshot
+            with self._lock:
+                generation = self._generation
+            snapshot = self._build(db)
+            self._store(snapshot, generation)
+            return snapshot
+
+    async def get_async(self, db: AsyncSession) -> HierarchySnapshot:
+        snapshot = self._fresh()
+        if snapshot is not None:
+            return snapshot
+        if self._async_build_lock is None:
+            self._async_build_lock = asyncio.Lock()
+        async with self._async_build_lock:
+            snapshot = self._fresh()
+            if snapshot is not None:
+                return snapshot
+            with self._lock:
+                generation = self._generation
+            snapshot = await db.run_sync(self._build)
+            self._store(snapshot, generation)
+            return snapshot
+
+    def _store(self, snapshot: HierarchySnapshot, generation: int) -> None:
+        with self._lock:
+            self.builds += 1
+            # Kurulum sırasında hiyerarşi değiştiyse bu (eski) ağaç saklanmaz
+            if generation == self._generation:
+                self._snapshot = snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "builds": self.builds,
+            "cached": snapshot is not None,
+            "universities": len(snapshot.universities) if snapshot else 0,
+            "departments": len(snapshot.departments) if snapshot else 0,
+        }
+
+    def _build(self, db: Session) -> HierarchySnapshot:
+        # Düğümler schemas.UniversityTree / DepartmentTree / ClassLevel ile aynı alanlara sahiptir
+        universities = (
+            db.query(models.University)
+            .options(selectinload(models.University.departments).selectinload(models.Department.class_levels))
+            .order_by(models.University.name)
+            .all()
+        )
+        tree = []
+        university_nodes = {}
+        department_nodes = {}
+        for university in universities:
+            departments = []
+            for department in sorted(university.departments, key=lambda d: d.name):
+                node = {
+                    "name": department.name,
+                    "university_id": department.university_id,
+                    "id": department.id,
+                    "class_levels": [
+                        fast_json.class_level_dict(class_level)
+                        for class_level in sorted(department.class_levels, key=lambda c: c.level)
+                    ],
+                }
+                department_nodes[department.id] = _serialize(node)
+                departments.append(node)
+            node = {"name": university.name, "id": university.id, "departments": departments}
+            university_nodes[university.id] = _serialize(node)
+            tree.append(node)
+        return HierarchySnapshot(
+            tree=_serialize(tree),
+            universities=MappingProxyType(university_nodes),
+            departments=MappingProxyType(department_nodes),
+            built_at=time.monotonic(),
+        )
+
+
+academic_tree = AcademicHierarchyCache(ttl_seconds=settings.academic_tree_ttl_seconds)
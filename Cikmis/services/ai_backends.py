@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import json
+import random
+from typing import AsyncIterator
+
+from config import settings
+from services import metrics
+
+# Servis fonksiyonlarının backend'e ilettiği istek türleri
+KIND_QUESTION = "question"
+KIND_QUESTION_BATCH = "question_batch"
+KIND_EXPLANATION = "explanation"
+
+
+class AIBackendError(Exception):
+    pass
+
+
+class AIBackend:
+    """
+    AI servisinin model çağrılarını yaptığı arayüz.
+    generate tam yanıt metnini, stream ise metin parçalarını döndürür.
+    """
+    name = "base"
+
+    async def generate(self, prompt: str, kind: str, items: int = 1) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, kind: str) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+
+class GeminiBackend(AIBackend):
+    name = "gemini"
+
+    def __init__(self, model_name: str, api_key: str):
+        import google.generativeai as genai
+
+        try:
+            genai.configure(api_key=api_key)
+        except Exception as e:
+            print(f"Gemini API yapılandırılamadı. Lütfen .env dosyasındaki API_KEY'i kontrol edin. Hata: {e}")
+        self.model = genai.GenerativeModel(model_name)
+
+    def _record_usage(self, kind: str, response) -> None:
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            metrics.record_ai_tokens(
+                self.name, kind,
+                getattr(usage, "prompt_token_count", 0) or 0,
+                getattr(usage, "candidates_token_count", 0) or 0,
+            )
+
+    async def generate(self, prompt: str, kind: str, items: int = 1) -> str:
+        response = await self.model.generate_content_async(prompt)
+        self._record_usage(kind, response)
+        return response.text
+
+    async def stream(self, prompt: str, kind: str) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(prompt, stream=True)
+        last_chunk = None
+        async for chunk in response:
+            last_chunk = chunk
+            yield chunk.text
+        # Akışta kullanım bilgisi son parçada toplam olarak gelir
+        if last_chunk is not None:
+            self._record_usage(kind, last_chunk)
+
+
+class StubBackend(AIBackend):
+    """
+    Ağ erişimi ve API anahtarı olmadan yük testi için deterministik yerel backend.
+    Gecikme log-normal dağılımdan çekilir (medyan ve sigma ayarlanabilir), istekler
+    ayarlanan oranda hata verir. Çıktılar prompt'un özetinden türetilen şablonlardır;
+    ai_stub_responses_file ile tür başına şablon verilebilir.
+    """
+    name = "stub"
+
+    _default_templates = {
+        KIND_QUESTION: json.dumps({
+            "question": "Örnek soru {digest}: Aşağıdakilerden hangisi doğrudur?",
+            "options": [
+                {"options": "A", "text": "Seçenek A ({digest})"},
+                {"options": "B", "text": "Seçenek B ({digest})"},
+                {"options": "C", "text": "Seçenek C ({digest})"},
+                {"options": "D", "text": "Seçenek D ({digest})"},
+            ],
+            "correct_ans": "{answer}",
+        }, ensure_ascii=False),
+        KIND_EXPLANATION: (
+            "**Doğru cevap {answer}.** Bu açıklama yerel test backend'i tarafından üretildi ({digest}). "
+            "Doğru şık, sorunun temel kavramını doğrudan karşıladığı için doğrudur; diğer şıklar ise "
+            "konunun yaygın yanlış yorumlarına dayanan çeldiricilerdir."
+        ),
+    }
+
+    def __init__(self, latency_ms: float, latency_sigma: float, error_rate: float, seed: int | None,
+                 responses_file: str | None = None, stream_chunk_words: int = 4):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.stream_chunk_words = max(1, stream_chunk_words)
+        self._random = random.Random(seed)
+        self.templates = dict(self._default_templates)
+        if responses_file:
+            with open(responses_file, encoding="utf-8") as f:
+                self.templates.update(json.load(f))
+
+    def _latency_seconds(self) -> float:
+        if self.latency_ms <= 0:
+            return 0.0
+        return self._random.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000
+
+    def _maybe_fail(self) -> None:
+        if self._random.random() < self.error_rate:
+            raise AIBackendError("Stub backend: yapay hata")
+
+    def _render(self, prompt: str, kind: str, index: int = 0) -> str:
+        digest = hashlib.sha256(f"{index}:{prompt}".encode("utf-8")).hexdigest()
+        answer = "ABCD"[int(digest[:2], 16) % 4]
+        return self.templates[kind].replace("{digest}", digest[:8]).replace("{answer}", answer)
+
+    def _record_usage(self, kind: str, prompt: str, text: str) -> None:
+        # Gerçek tokenizer yok; kelime sayısı yaklaşık değer olarak kullanılır
+        metrics.record_ai_tokens(self.name, kind, len(prompt.split()), len(text.split()))
+
+    async def generate(self, prompt: str, kind: str, items: int = 1) -> str:
+        await asyncio.sleep(self._latency_seconds())
+        self._maybe_fail()
+        if kind == KIND_QUESTION_BATCH:
+            text = "[" + ",".join(self._render(prompt, KIND_QUESTION, index) for index in range(items)) + "]"
+        else:
+            text = self._render(prompt, kind)
+        self._record_usage(kind, prompt, text)
+        return text
+
+    async def stream(self, prompt: str, kind: str) -> AsyncIterator[str]:
+        words = self._render(prompt, kind).split(" ")
+        chunk_count = max(1, -(-len(words) // self.stream_chunk_words))
+        first_chunk_delay = self._latency_seconds()
+        await asyncio.sleep(first_chunk_delay / 2)
+        self._maybe_fail()
+        for start in range(0, len(words), self.stream_chunk_words):
+            await asyncio.sleep(first_chunk_delay / 2 / chunk_count)
+            chunk = " ".join(words[start:start + self.stream_chunk_words])
+            yield chunk if start == 0 else " " + chunk
+        self._record_usage(kind, prompt, " ".join(words))
+
+
+def create_backend() -> AIBackend:
+    if settings.ai_backend == StubBackend.name:
+        return StubBackend(
+            latency_ms=settings.ai_stub_latency_ms,
+            latency_sigma=settings.ai_stub_latency_sigma,
+            error_rate=settings.ai_stub_error_rate,
+            seed=settings.ai_stub_seed,
+            responses_file=settings.ai_stub_responses_file,
+        )
+    if settings.ai_backend == GeminiBackend.name:
+        return GeminiBackend(settings.ai_model, settings.api_key)
+    raise ValueError(f"Bilinmeyen AI backend: {settings.ai_backend}")
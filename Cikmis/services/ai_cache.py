@@ -0,0 +1,193 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import models
+import schemas
+from config import settings
+from database import SessionLocal
+
+
+def _normalize_text(text: str | None) -> str:
+    return " ".join((text or "").split())
+
+
+def make_generate_key(original_question: str) -> str:
+    """
+    Benzer soru isteği için model adını da içeren içerik tabanlı anahtar üretir.
+    """
+    return _hash_key("generate", _normalize_text(original_question))
+
+
+def make_explain_key(request: schemas.ExplainQuestionRequest) -> str:
+    """
+    Açıklama isteği için normalize edilmiş alanlardan anahtar üretir.
+    """
+    normalized = {
+        "question": _normalize_text(request.question),
+        "options": [[_normalize_text(o.options), _normalize_text(o.text)] for o in request.options],
+        "correct_answer": _normalize_text(request.correct_answer),
+        "user_answer": _normalize_text(request.user_answer),
+    }
+    return _hash_key("explain", json.dumps(normalized, ensure_ascii=False, sort_keys=True))
+
+
+def model_tag() -> str:
+    """
+    Önbellek kayıtlarının ait olduğu model. Stub backend yanıtları gerçek model
+    yanıtlarıyla karışmasın diye backend adı da eklenir.
+    """
+    if settings.ai_backend == "gemini":
+        return settings.ai_model
+    return f"{settings.ai_backend}:{settings.ai_model}"
+
+
+def _hash_key(kind: str, content: str) -> str:
+    raw = f"{kind}\x00{model_tag()}\x00{content}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AIResponseCache:
+    """
+    İki katmanlı AI yanıt önbelleği.
+    1. katman: süreç içi, boyutu sınırlı ve TTL'li LRU.
+    2. katman: tüm gunicorn worker'larının paylaştığı veritabanı tablosu.
+    Değerler JSON metni olarak saklanır; böylece her okuma yeni bir kopya üretir.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, persistent: bool, persistent_ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self.persistent_ttl_seconds = persistent_ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> str | None:
+        payload = self.get_memory(key)
+        if payload is not None:
+            return payload
+        return self.get_persistent(key)
+
+    def get_memory(self, key: str) -> str | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, payload = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return payload
+                del self._entries[key]
+        return None
+
+    def get_persistent(self, key: str) -> str | None:
+        payload = None
+        if not self.persistent:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            with SessionLocal() as db:
+                row = db.get(models.AICacheEntry, key)
+                if row is not None and time.time() - row.created_at <= self.persistent_ttl_seconds:
+                    payload = row.payload
+        except Exception as e:
+            print(f"AI önbellek okuma hatası: {e}")
+
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return None
+            self.persistent_hits += 1
+        self._set_memory(key, payload)
+        return payload
+
+    def get_stale(self, key: str) -> str | None:
+        """
+        TTL'e bakmadan kalıcı katmandaki kaydı döndürür. Upstream kullanılamazken
+        (devre açıkken) eski de olsa bir yanıt vermek için kullanılır.
+        """
+        if not self.persistent:
+            return None
+        try:
+            with SessionLocal() as db:
+                row = db.get(models.AICacheEntry, key)
+                return row.payload if row is not None else None
+        except Exception as e:
+            print(f"AI önbellek okuma hatası: {e}")
+            return None
+
+    def set(self, key: str, kind: str, payload: str) -> None:
+        self._set_memory(key, payload)
+        if not self.persistent:
+            return
+        try:
+            with SessionLocal() as db:
+                db.merge(models.AICacheEntry(
+                    key=key,
+                    kind=kind,
+                    ai_model=model_tag(),
+                    payload=payload,
+                    created_at=time.time()
+                ))
+                db.commit()
+        except Exception as e:
+            print(f"AI önbellek yazma hatası: {e}")
+
+    def _set_memory(self, key: str, payload: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate_other_models(self) -> int:
+        """
+        Aynı backend'in ai_model'i değiştiğinde eski modele ait kalıcı kayıtları siler.
+        Başka backend'lerin kayıtlarına dokunulmaz; örneğin AI_BACKEND=stub ile açılan
+        bir süreç Gemini yanıtlarını silmez. Bellek katmanındaki anahtarlar zaten model
+        adını içerdiği için sadece temizlenir.
+        """
+        self.clear_memory()
+        if not self.persistent:
+            return 0
+        column = models.AICacheEntry.ai_model
+        if settings.ai_backend == "gemini":
+            same_backend = ~column.contains(":")
+        else:
+            same_backend = column.startswith(f"{settings.ai_backend}:", autoescape=True)
+        with SessionLocal() as db:
+            deleted = db.query(models.AICacheEntry).filter(same_backend, column != model_tag()).delete(synchronize_session=False)
+            db.commit()
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.persistent_hits
+            total = hits + self.misses
+            return {
+                "memory_entries": len(self._entries),
+                "memory_hits": self.memory_hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+            }
+
+
+cache = AIResponseCache(
+    max_entries=settings.ai_cache_max_entries,
+    ttl_seconds=settings.ai_cache_ttl_seconds,
+    persistent=settings.ai_cache_persistent,
+    persistent_ttl_seconds=settings.ai_cache_persistent_ttl_seconds,
+)
@@ -0,0 +1,473 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+import crud
+import models
+import schemas
+from config import settings
+from database import SessionLocal
+from services import ai_service
+from services.question_pool import is_valid_question
+from services.rate_limit import RateBudget
+
+# Veritabanı tabanlı AI iş kuyruğu. API işi ai_jobs tablosuna yazar, worker.py ile
+# başlatılan worker süreçleri işleri öncelik sırasıyla alır. Alma işlemi koşullu bir
+# UPDATE ile yapılır (birden fazla worker aynı işi alamaz); çalışan işin kira süresi
+# heartbeat ile uzatılır, kirası dolan iş (worker çöktüyse) başka bir worker'a geçer.
+# Başarısız denemeler üstel geri çekilmeyle yeniden kuyruğa alınır.
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+PRIORITY_CLASSES = {"interactive": PRIORITY_INTERACTIVE, "bulk": PRIORITY_BULK}
+
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class JobError(Exception):
+    """
+    Yeniden denemenin anlamı olmayan hatalar (ör. sınav bulunamadı); iş hemen başarısız olur.
+    """
+
+
+@dataclass
+class ClaimedJob:
+    id: int
+    kind: str
+    priority: int
+    payload: dict
+    attempts: int
+    max_attempts: int
+
+
+Progress = Callable[[int, int], Awaitable[None]]
+
+
+@dataclass
+class JobKind:
+    payload_schema: type[BaseModel]
+    priority: int
+    run: Callable[[ClaimedJob, BaseModel, Progress], Awaitable[object]]
+
+
+# --- İş türleri ---
+
+async def _explain_question(job: ClaimedJob, payload: schemas.ExplainQuestionRequest, progress: Progress):
+    return (await ai_service.explain_question_with_ai(payload)).model_dump()
+
+
+async def _generate_question(job: ClaimedJob, payload: schemas.GenerateQuestionRequest, progress: Progress):
+    return (await ai_service.generate_question_with_ai(payload.original_question)).model_dump()
+
+
+def _load_exam_questions(exam_id: int) -> list[models.Question]:
+    with SessionLocal() as db:
+        questions = crud.get_questions_by_exam(db, exam_id)
+        if not questions:
+            raise JobError("Sınav bulunamadı ya da sınavda soru yok.")
+        return questions
+
+
+def _explain_request(question: models.Question) -> schemas.ExplainQuestionRequest:
+    return schemas.ExplainQuestionRequest(
+        question=question.question_text,
+        options=[
+            schemas.GeminiOption(options=chr(65 + index), text=option)
+            for index, option in enumerate(question.options or [])
+        ],
+        correct_answer=question.answer,
+    )
+
+
+async def _explain_exam(job: ClaimedJob, payload: schemas.ExamJobPayload, progress: Progress):
+    """
+    Sınavın tüm sorularını açıklar. Açıklamalar AI önbelleğine yazıldığından yeniden
+    denenen bir iş tamamlanmış soruları tekrar üretmez.
+    """
+    questions = await run_in_threadpool(_load_exam_questions, payload.exam_id)
+    results = []
+
+    async def _explain(question: models.Question) -> dict:
+        try:
+            explanation = await ai_service.explain_question_with_ai(_explain_request(question))
+        except HTTPException as e:
+            if e.status_code == 503:
+                # Devre açık; işin tamamı geri çekilmeyle yeniden denensin
+                raise
+            return {"question_id": question.id, "error": e.detail}
+        return {"question_id": question.id, "explanation": explanation.explanation}
+
+    batch_size = max(1, settings.ai_batch_size)
+    for start in range(0, len(questions), batch_size):
+        results += await asyncio.gather(*[_explain(q) for q in questions[start:start + batch_size]])
+        await progress(len(results), len(questions))
+    return results
+
+
+async def _generate_similar_exam(job: ClaimedJob, payload: schemas.ExamJobPayload, progress: Progress):
+    questions = await run_in_threadpool(_load_exam_questions, payload.exam_id)
+    results = []
+    async for item in ai_service.generate_similar_questions_stream(questions):
+        results.append(item)
+        await progress(len(results), len(questions))
+    return results
+
+
+def _load_department_questions(department_id: int) -> list[tuple[int, str, int]]:
+    """
+    Bölümdeki her soru için (soru kimliği, istem metni, havuzda eksik öğe sayısı).
+    Eksik sayısı yeniden denenen işlerin havuzu derinliğin üzerine taşırmasını önler.
+    """
+    with SessionLocal() as db:
+        if crud.get_department_by_id(db, department_id) is None:
+            raise JobError("Bölüm bulunamadı.")
+        pool_counts = dict(
+            db.query(models.SimilarQuestionPoolItem.question_id, func.count(models.SimilarQuestionPoolItem.id))
+            .join(models.Question, models.Question.id == models.SimilarQuestionPoolItem.question_id)
+            .join(models.Exam, models.Exam.id == models.Question.exam_id)
+            .filter(models.Exam.department_id == department_id)
+            .group_by(models.SimilarQuestionPoolItem.question_id)
+            .all()
+        )
+        questions = (
+            db.query(models.Question)
+            .join(models.Exam, models.Exam.id == models.Question.exam_id)
+            .filter(models.Exam.department_id == department_id)
+            .order_by(models.Question.id)
+            .all()
+        )
+        return [
+            (q.id, ai_service.format_question_for_prompt(q), max(0, settings.ai_pool_depth - pool_counts.get(q.id, 0)))
+            for q in questions
+        ]
+
+
+async def _regenerate_department(job: ClaimedJob, payload: schemas.DepartmentJobPayload, progress: Progress):
+    """
+    Bölümdeki tüm sorular için benzer soru havuzunu (bkz. question_pool) derinliğe kadar doldurur.
+    """
+    questions = await run_in_threadpool(_load_department_questions, payload.department_id)
+    summary = {"questions": len(questions), "generated": 0, "rejected": 0, "failed": 0}
+    for done, (question_id, original_question, missing) in enumerate(questions, start=1):
+        for _ in range(missing):
+            try:
+                item = await ai_service.generate_question_uncached(original_question)
+            except HTTPException as e:
+                if e.status_code == 503:
+                    raise
+                summary["failed"] += 1
+                continue
+            if not is_valid_question(item):
+                summary["rejected"] += 1
+                continue
+            if not await run_in_threadpool(_store_pool_item, question_id, item.model_dump_json()):
+                # Havuzu bu arada başka bir süreç doldurdu
+                break
+            summary["generated"] += 1
+        await progress(done, len(questions))
+    return summary
+
+
+def _store_pool_item(question_id: int, payload: str) -> bool:
+    with SessionLocal() as db:
+        return crud.add_similar_question(db, question_id, payload, settings.ai_pool_depth)
+
+
+JOB_KINDS: dict[str, JobKind] = {
+    "explain_question": JobKind(schemas.ExplainQuestionRequest, PRIORITY_INTERACTIVE, _explain_question),
+    "generate_question": JobKind(schemas.GenerateQuestionRequest, PRIORITY_INTERACTIVE, _generate_question),
+    "explain_exam": JobKind(schemas.ExamJobPayload, PRIORITY_BULK, _explain_exam),
+    "generate_similar_exam": JobKind(schemas.ExamJobPayload, PRIORITY_BULK, _generate_similar_exam),
+    "regenerate_department": JobKind(schemas.DepartmentJobPayload, PRIORITY_BULK, _regenerate_department),
+}
+
+
+# --- API tarafı ---
+
+def job_dict(job: models.AIJob) -> dict:
+    priority = next((name for name, value in PRIORITY_CLASSES.items() if value == job.priority), str(job.priority))
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "priority": priority,
+        "status": job.status,
+        "progress_done": job.progress_done,
+        "progress_total": job.progress_total,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def submit(db: Session, user_id: int | None, request: schemas.AIJobCreate) -> models.AIJob:
+    kind = JOB_KINDS.get(request.kind)
+    if kind is None:
+        raise HTTPException(status_code=400, detail=f"Bilinmeyen iş türü. Geçerli türler: {', '.join(JOB_KINDS)}")
+    if request.priority is not None and request.priority not in PRIORITY_CLASSES:
+        raise HTTPException(status_code=400, detail="priority 'interactive' ya da 'bulk' olmalıdır.")
+    try:
+        payload = kind.payload_schema.model_validate(request.payload)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+    now = time.time()
+    job = models.AIJob(
+        kind=request.kind,
+        priority=PRIORITY_CLASSES[request.priority] if request.priority else kind.priority,
+        status="queued",
+        payload=payload.model_dump(),
+        max_attempts=settings.ai_jobs_max_attempts,
+        run_after=now,
+        user_id=user_id,
+        created_at=now,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_job(db: Session, job_id: int, user_id: int) -> models.AIJob:
+    job = db.get(models.AIJob, job_id)
+    if job is None or job.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+def cancel(db: Session, job_id: int, user_id: int) -> models.AIJob:
+    """
+    Kuyruktaki iş hemen iptal edilir; çalışan işi yürüten worker bir sonraki
+    heartbeat'te iptali görür ve işi durdurur.
+    """
+    job = get_job(db, job_id, user_id)
+    if job.status not in TERMINAL_STATUSES:
+        job.status = "cancelled"
+        job.finished_at = time.time()
+        job.lease_owner = None
+        db.commit()
+        db.refresh(job)
+    return job
+
+
+# --- Worker tarafı ---
+
+def _claimable(now: float):
+    return and_(
+        or_(
+            and_(models.AIJob.status == "queued", models.AIJob.run_after <= now),
+            # Kirası dolmuş çalışan iş: worker'ı çökmüş ya da takılmış
+            and_(models.AIJob.status == "running", models.AIJob.lease_expires_at < now),
+        ),
+        models.AIJob.attempts < models.AIJob.max_attempts,
+    )
+
+
+def claim(worker_id: str, allow_bulk: bool, lease_seconds: float) -> ClaimedJob | None:
+    """
+    Sıradaki işi (önce düşük priority, sonra eski iş) bu worker'a kiralar. Aday satır
+    koşullu UPDATE ile alınır; aynı işi başka bir worker önce aldıysa sıradakine geçilir.
+    """
+    now = time.time()
+    with SessionLocal() as db:
+        # Son denemesinde kirası dolan işler yeniden alınmaz, başarısız sayılır
+        db.execute(
+            update(models.AIJob)
+            .where(
+                models.AIJob.status == "running",
+                models.AIJob.lease_expires_at < now,
+                models.AIJob.attempts >= models.AIJob.max_attempts,
+            )
+            .values(status="failed", error="Worker yanıt vermedi; deneme hakkı bitti.", finished_at=now, lease_owner=None)
+        )
+        candidates = select(models.AIJob.id).where(_claimable(now))
+        if not allow_bulk:
+            candidates = candidates.where(models.AIJob.priority < PRIORITY_BULK)
+        for job_id in db.scalars(candidates.order_by(models.AIJob.priority, models.AIJob.id).limit(5)).all():
+            claimed = db.execute(
+                update(models.AIJob)
+                .where(models.AIJob.id == job_id, _claimable(now))
+                .values(
+                    status="running",
+                    lease_owner=worker_id,
+                    lease_expires_at=now + lease_seconds,
+                    attempts=models.AIJob.attempts + 1,
+                    started_at=func.coalesce(models.AIJob.started_at, now),
+                    error=None,
+                )
+            )
+            if claimed.rowcount == 1:
+                db.commit()
+                job = db.get(models.AIJob, job_id)
+                return ClaimedJob(job.id, job.kind, job.priority, job.payload, job.attempts, job.max_attempts)
+        db.commit()
+        return None
+
+
+def _update_owned(job_id: int, worker_id: str, **values) -> bool:
+    """
+    İş hâlâ bu worker'a kiralıysa günceller; iptal edildiyse ya da kira başka bir
+    worker'a geçtiyse False döner.
+    """
+    with SessionLocal() as db:
+        updated = db.execute(
+            update(models.AIJob)
+            .where(models.AIJob.id == job_id, models.AIJob.lease_owner == worker_id, models.AIJob.status == "running")
+            .values(**values)
+        ).rowcount == 1
+        db.commit()
+        return updated
+
+
+class JobWorker:
+    """
+    ai_jobs kuyruğunu işleyen worker. Aynı anda en fazla concurrency iş çalıştırır;
+    bunların en fazla bulk_slots tanesi toplu iş olabilir.
+    """
+
+    def __init__(self, concurrency: int, bulk_slots: int, poll_interval: float, lease_seconds: float,
+                 rate_per_minute: int):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.concurrency = concurrency
+        self.bulk_slots = min(bulk_slots, concurrency)
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        # Toplam AI bütçesinin (ai_rate_per_minute) iş kuyruğuna ayrılan alt bütçesi
+        self.budget = RateBudget("jobs", rate_per_minute)
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._bulk: set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+
+    async def run(self, once: bool = False) -> None:
+        """
+        once=True ise kuyruk boşalıp çalışan işler bitince döner (betikler ve denemeler için).
+        """
+        print(f"AI iş worker'ı başladı: {self.worker_id}")
+        try:
+            while not self._stopping:
+                if len(self._tasks) < self.concurrency:
+                    allow_bulk = len(self._bulk) < self.bulk_slots
+                    job = await run_in_threadpool(claim, self.worker_id, allow_bulk, self.lease_seconds)
+                    if job is not None:
+                        self._start(job)
+                        continue
+                if once and not self._tasks:
+                    return
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self._release_all()
+
+    def _start(self, job: ClaimedJob) -> None:
+        task = asyncio.create_task(self._execute(job))
+        self._tasks[job.id] = task
+        if job.priority >= PRIORITY_BULK:
+            self._bulk.add(job.id)
+
+        def _done(_):
+            self._tasks.pop(job.id, None)
+            self._bulk.discard(job.id)
+            self._wakeup.set()
+
+        task.add_done_callback(_done)
+
+    async def _execute(self, job: ClaimedJob) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job.id, asyncio.current_task()))
+        token = ai_service.call_budget.set(self.budget)
+        try:
+            kind = JOB_KINDS.get(job.kind)
+            if kind is None:
+                raise JobError(f"Bilinmeyen iş türü: {job.kind}")
+
+            async def _progress(done: int, total: int) -> None:
+                await run_in_threadpool(_update_owned, job.id, self.worker_id, progress_done=done, progress_total=total)
+
+            result = await kind.run(job, kind.payload_schema.model_validate(job.payload), _progress)
+        except asyncio.CancelledError:
+            # Kira kaybedildi, iş iptal edildi ya da worker kapanıyor; sonuç yazılmaz
+            raise
+        except Exception as e:
+            await run_in_threadpool(self._fail_or_retry, job, e)
+        else:
+            if await run_in_threadpool(
+                _update_owned, job.id, self.worker_id,
+                status="succeeded", result=result, finished_at=time.time(), lease_owner=None,
+            ):
+                self.succeeded += 1
+        finally:
+            ai_service.call_budget.reset(token)
+            heartbeat.cancel()
+
+    def _fail_or_retry(self, job: ClaimedJob, error: Exception) -> None:
+        message = error.detail if isinstance(error, HTTPException) else str(error) or error.__class__.__name__
+        now = time.time()
+        if isinstance(error, JobError) or job.attempts >= job.max_attempts:
+            print(f"AI işi başarısız (iş {job.id}, deneme {job.attempts}): {message}")
+            self.failed += 1
+            _update_owned(job.id, self.worker_id, status="failed", error=message, finished_at=now, lease_owner=None)
+            return
+        delay = settings.ai_jobs_retry_base_seconds * 2 ** (job.attempts - 1)
+        print(f"AI işi yeniden denenecek (iş {job.id}, deneme {job.attempts}, {delay:.0f} sn sonra): {message}")
+        self.retried += 1
+        _update_owned(
+            job.id, self.worker_id,
+            status="queued", error=message, run_after=now + delay, lease_owner=None, lease_expires_at=None,
+        )
+
+    async def _heartbeat(self, job_id: int, task: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            alive = await run_in_threadpool(
+                _update_owned, job_id, self.worker_id, lease_expires_at=time.time() + self.lease_seconds
+            )
+            if not alive:
+                print(f"AI işi durduruldu (iş {job_id}): iptal edildi ya da kira kaybedildi.")
+                task.cancel()
+                return
+
+    async def _release_all(self) -> None:
+        """
+        Kapanırken yarıda kalan işleri, bu deneme sayılmadan kuyruğa geri bırakır.
+        """
+        tasks = list(self._tasks.items())
+        for _, task in tasks:
+            task.cancel()
+        await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+        for job_id, _ in tasks:
+            await run_in_threadpool(
+                _update_owned, job_id, self.worker_id,
+                status="queued", lease_owner=None, lease_expires_at=None, attempts=models.AIJob.attempts - 1,
+            )
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "running": len(self._tasks),
+            "running_bulk": len(self._bulk),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
@@ -1,17 +1,318 @@
-import google.generativeai as genai
+import asyncio
+import json
+import time
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable
+
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 import re
+import models
 import schemas
 from config import settings
+from services.ai_backends import create_backend, KIND_QUESTION, KIND_QUESTION_BATCH, KIND_EXPLANATION
+from services.ai_cache import cache, make_generate_key, make_explain_key
+from services.resilience import (
+    CircuitBreaker, CircuitOpenError, LatencyTracker, deadline_left, hedged, remaining, without_deadline,
+)
+from services.rate_limit import BudgetExhaustedError, RateBudget
+from services.singleflight import SingleFlight
+from services import metrics
+
+# Gemini ya da yük testi için yerel stub; settings.ai_backend ile seçilir.
+backend = create_backend()
+
+# Aynı anda Gemini'ye gidebilecek istek sayısını sınırlar; böylece AI patlamaları
+# diğer endpoint'lerin kullandığı kaynakları tüketmez.
+_ai_semaphore = asyncio.Semaphore(settings.ai_max_concurrency)
+
+# Aynı normalize edilmiş istek için eşzamanlı çağrıları tek upstream çağrısında birleştirir.
+flight = SingleFlight()
+
+# Upstream gecikme yüzdelikleri (hedge kararı için) ve hata oranına göre devre kesici
+latency = LatencyTracker(window=settings.ai_latency_window)
+breaker = CircuitBreaker(
+    window=settings.ai_breaker_window,
+    error_threshold=settings.ai_breaker_error_threshold,
+    min_requests=settings.ai_breaker_min_requests,
+    open_seconds=settings.ai_breaker_open_seconds,
+)
+hedge_count = 0
+
+# Tüm süreçlerin her upstream çağrısının (hedge denemeleri dahil) harcadığı ortak bütçe
+total_budget = RateBudget("total", settings.ai_rate_per_minute)
+
+# Arka plan çağıranlarının (iş kuyruğu, soru havuzu) toplam bütçe içindeki alt bütçesi.
+# Ayarlıysa çağrı önce bu bütçeyi, sonra toplam bütçeyi bekler. HTTP isteklerinde
+# ayarlanmaz; toplam bütçe doluysa beklenmez, istek 429 ile döner.
+call_budget: ContextVar[RateBudget | None] = ContextVar("ai_call_budget", default=None)
+
+
+def _hedge_delay() -> float | None:
+    if not settings.ai_hedge_enabled or len(latency) < settings.ai_hedge_min_samples:
+        return None
+    return max(settings.ai_hedge_min_delay_seconds, latency.percentile(settings.ai_hedge_percentile))
 
-model = genai.GenerativeModel(settings.ai_model)
 
+def _count_hedge() -> None:
+    global hedge_count
+    hedge_count += 1
 
-def generate_question_with_ai(original_question: str) -> schemas.GeminiQuestionResponse:
+
+async def _take_budget(hedge: bool = False) -> None:
+    """
+    Bir upstream çağrısı için alt bütçeden (varsa) ve toplam bütçeden hak alır.
+    Yalnızca arka plan çağıranlarının ilk denemesi bekler; HTTP istekleri ve hedge
+    denemeleri bütçe doluysa BudgetExhaustedError alır.
+    """
+    sub_budget = call_budget.get()
+    wait = sub_budget is not None and not hedge
+    for budget in (sub_budget, total_budget):
+        if budget is None:
+            continue
+        if wait:
+            await budget.acquire()
+        else:
+            await budget.take()
+
+
+async def _generate_content(prompt: str, kind: str, items: int = 1) -> str:
+    """
+    Modeli asenkron olarak çağırır. Sıra bekleme ve üretim süresi birlikte
+    ai_timeout_seconds ve isteğin kalan süre bütçesiyle sınırlandırılır; süre aşılırsa
+    çağrı iptal edilir. Hedge açıksa p95 gecikmesi aşıldığında ikinci bir istek gönderilir.
+    Devre açıksa upstream'e hiç gidilmez. İstemcinin son zamanı dolduğu için kesilen
+    çağrılar devre kesicide hata sayılmaz; yalnızca upstream hataları ve sunucunun
+    kendi zaman aşımı sayılır. Hedge denemesi de ayrı bir çağrı olarak bütçeden düşülür;
+    bütçe yoksa hedge yapılmaz, ilk deneme beklenir.
+    """
+    await _take_budget()
+    timeout = remaining(settings.ai_timeout_seconds)
+    client_bound = timeout < settings.ai_timeout_seconds
+    if timeout <= 0:
+        raise asyncio.TimeoutError()
+    if not breaker.allow():
+        metrics.record_ai_call(backend.name, kind, "circuit_open")
+        raise CircuitOpenError()
+
+    attempts = 0
+
+    async def _attempt() -> str:
+        nonlocal attempts
+        attempts += 1
+        if attempts > 1:
+            await _take_budget(hedge=True)
+        async with _ai_semaphore:
+            started = time.monotonic()
+            try:
+                text = await backend.generate(prompt, kind, items)
+            except asyncio.CancelledError:
+                # Zaman aşımı veya kazanan hedge denemesi nedeniyle iptal edildi
+                metrics.record_ai_call(backend.name, kind, "cancelled")
+                raise
+            except Exception:
+                metrics.record_ai_call(backend.name, kind, "error")
+                raise
+            elapsed = time.monotonic() - started
+            latency.record(elapsed)
+            metrics.record_ai_call(backend.name, kind, "success", elapsed)
+            return text
+
+    try:
+        text = await asyncio.wait_for(hedged(_attempt, _hedge_delay(), _count_hedge), timeout=timeout)
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
+    except asyncio.TimeoutError:
+        if client_bound:
+            breaker.release()
+        else:
+            breaker.record_failure()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return text
+
+
+async def _stream_content(prompt: str, kind: str) -> AsyncIterator[str]:
+    """
+    Modeli akış modunda çağırır ve metin parçalarını geldikçe döndürür.
+    İki parça arasındaki bekleme ai_timeout_seconds ile, toplam süre ise isteğin
+    kalan süre bütçesiyle sınırlandırılır.
+    """
+    await _take_budget()
+    if not breaker.allow():
+        metrics.record_ai_call(backend.name, kind, "circuit_open")
+        raise CircuitOpenError()
+    client_bound = False
+    try:
+        async with _ai_semaphore:
+            started = time.monotonic()
+            chunks = backend.stream(prompt, kind).__aiter__()
+            while True:
+                timeout = remaining(settings.ai_timeout_seconds)
+                client_bound = timeout < settings.ai_timeout_seconds
+                if timeout <= 0:
+                    raise asyncio.TimeoutError()
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                except StopAsyncIteration:
+                    break
+                yield chunk
+            elapsed = time.monotonic() - started
+            latency.record(elapsed)
+    except (asyncio.CancelledError, GeneratorExit):
+        metrics.record_ai_call(backend.name, kind, "cancelled")
+        breaker.release()
+        raise
+    except asyncio.TimeoutError:
+        metrics.record_ai_call(backend.name, kind, "error")
+        if client_bound:
+            breaker.release()
+        else:
+            breaker.record_failure()
+        raise
+    except Exception:
+        metrics.record_ai_call(backend.name, kind, "error")
+        breaker.record_failure()
+        raise
+    metrics.record_ai_call(backend.name, kind, "success", elapsed)
+    breaker.record_success()
+
+
+def upstream_stats() -> dict:
+    return {
+        "latency": latency.snapshot(),
+        "breaker": breaker.stats(),
+        "hedge_enabled": settings.ai_hedge_enabled,
+        "hedge_delay": _hedge_delay(),
+        "hedges": hedge_count,
+    }
+
+
+def _circuit_open_error() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Yapay zeka servisi geçici olarak kullanılamıyor.",
+        headers={"Retry-After": str(int(settings.ai_breaker_open_seconds))}
+    )
+
+
+def _budget_exhausted_error(error: BudgetExhaustedError) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Yapay zeka çağrı bütçesi doldu, lütfen biraz sonra tekrar deneyin.",
+        headers={"Retry-After": str(max(1, int(error.retry_after + 0.999)))}
+    )
+
+
+async def _coalesced(key: str, fn: Callable[[], Awaitable]):
+    """
+    Özdeş istekleri tek upstream çağrısında birleştirir. Paylaşılan çağrı yalnızca
+    sunucunun zaman aşımıyla çalışır; her çağıran sonucu kendi son zamanı kadar bekler.
+    Böylece sıkı süreli bir liderin zaman aşımı, süre göndermeyen takipçilere 504
+    olarak yansımaz. Süresi dolan çağıranın ardından çağrı sürer ve sonuç önbelleğe yazılır.
+    """
+    left = deadline_left()
+    if left is None:
+        return await flight.do(key, fn)
+    if left <= 0:
+        raise HTTPException(status_code=504, detail="Yapay zeka zamanında yanıt vermedi.")
+    call = asyncio.ensure_future(flight.do(key, lambda: without_deadline(fn)))
+    # Bekleyen kalmadığında da hatası okunmuş sayılsın
+    call.add_done_callback(lambda task: task.cancelled() or task.exception())
+    try:
+        return await asyncio.wait_for(asyncio.shield(call), timeout=left)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Yapay zeka zamanında yanıt vermedi.")
+
+
+async def _cache_get(key: str) -> str | None:
+    if not settings.ai_cache_enabled:
+        return None
+    cached = cache.get_memory(key)
+    if cached is None:
+        cached = await run_in_threadpool(cache.get_persistent, key)
+    return cached
+
+
+async def _cache_get_stale(key: str) -> str | None:
+    if not settings.ai_cache_enabled:
+        return None
+    return await run_in_threadpool(cache.get_stale, key)
+
+
+async def _cache_set(key: str, kind: str, payload: str) -> None:
+    if settings.ai_cache_enabled:
+        await run_in_threadpool(cache.set, key, kind, payload)
+
+
+async def generate_question_with_ai(original_question: str) -> schemas.GeminiQuestionResponse:
     """
     Verilen bir metne dayanarak AI kullanarak yeni bir soru üretir.
+    Aynı soru ve model için üretilen yanıt önbellekten döndürülür; aynı anda gelen
+    özdeş istekler tek bir model çağrısını paylaşır.
+    """
+    cache_key = make_generate_key(original_question)
+    cached = await _cache_get(cache_key)
+    if cached is not None:
+        return schemas.GeminiQuestionResponse.model_validate_json(cached)
+
+    async def _generate_and_cache() -> schemas.GeminiQuestionResponse:
+        result = await generate_question_uncached(original_question)
+        await _cache_set(cache_key, "generate", result.model_dump_json())
+        return result
+
+    try:
+        return await _coalesced(cache_key, _generate_and_cache)
+    except HTTPException as e:
+        # Devre açıkken süresi dolmuş da olsa önbellekteki yanıtı kullan
+        stale = await _cache_get_stale(cache_key) if e.status_code == 503 else None
+        if stale is None:
+            raise
+        return schemas.GeminiQuestionResponse.model_validate_json(stale)
+
+
+async def generate_question_uncached(original_question: str) -> schemas.GeminiQuestionResponse:
     """
-    prompt = f"""
+    Önbelleği ve istek birleştirmeyi atlayarak her çağrıda yeni bir soru üretir.
+    """
+    prompt = _build_generate_prompt(original_question)
+    try:
+        raw_text = await _generate_content(prompt, KIND_QUESTION)
+
+        cleaned_text = _strip_code_fence(raw_text)
+
+        return schemas.GeminiQuestionResponse.model_validate_json(cleaned_text)
+
+    except CircuitOpenError:
+        raise _circuit_open_error()
+    except BudgetExhaustedError as e:
+        raise _budget_exhausted_error(e)
+    except asyncio.TimeoutError:
+        print("AI Soru Üretme Hatası: zaman aşımı")
+        raise HTTPException(status_code=504, detail="Yapay zeka zamanında yanıt vermedi.")
+    except Exception as e:
+        print(f"AI Soru Üretme Hatası: {e}")
+        raise HTTPException(status_code=500, detail="Yapay zeka ile soru üretilirken bir hata oluştu.")
+
+
+def _strip_code_fence(raw_text: str) -> str:
+    return raw_text.strip().replace("```json", "").replace("```", "").strip()
+
+
+def format_question_for_prompt(question: models.Question) -> str:
+    """
+    Arşivdeki bir soruyu, ön yüzün gönderdiği "original_question" biçimine çevirir.
+    """
+    options_text = "\n".join(f"{chr(65 + index)}) {option}" for index, option in enumerate(question.options or []))
+    return f"Soru: {question.question_text}\nSeçenekler:\n{options_text}"
+
+
+def _build_generate_prompt(original_question: str) -> str:
+    return f"""
     GÖREV: Aşağıdaki örnek soruya konu, format ve zorluk seviyesi olarak çok benzeyen yeni bir çoktan seçmeli soru oluştur.
 
     ÖRNEK SORU:
@@ -32,19 +333,188 @@ def generate_question_with_ai(original_question: str) -> schemas.GeminiQuestionR
           "correct_ans": "Doğru şıkkın harfi (örn: 'B')"
         }}
     """
+
+
+async def generate_similar_questions_stream(questions: list[models.Question]) -> AsyncIterator[dict]:
+    """
+    Bir sınavın tüm soruları için benzer soru üretir. Önbellekte olmayan sorular
+    ai_batch_size'lık gruplar halinde tek bir model çağrısına paketlenir ve her grup
+    tamamlandıkça sonuçlar sırayla döndürülür. Grup içinde doğrulanamayan öğeler
+    tek tek yeniden denenir.
+    """
+    pending = []
+    for question in questions:
+        original_question = format_question_for_prompt(question)
+        cached = await _cache_get(make_generate_key(original_question))
+        if cached is not None:
+            yield {"question_id": question.id, "result": json.loads(cached)}
+        else:
+            pending.append((question.id, original_question))
+
+    batch_size = max(1, settings.ai_batch_size)
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    tasks = [asyncio.create_task(_run_similar_batch(batch)) for batch in batches]
     try:
-        response = model.generate_content(prompt)
+        for next_done in asyncio.as_completed(tasks):
+            for item in await next_done:
+                yield item
+    finally:
+        # İstemci bağlantıyı kapatırsa kalan grupları iptal et
+        for task in tasks:
+            task.cancel()
 
-        cleaned_text = response.text.strip().replace("```json", "").replace("```", "").strip()
 
-        return schemas.GeminiQuestionResponse.model_validate_json(cleaned_text)
+async def _run_similar_batch(batch: list[tuple[int, str]]) -> list[dict]:
+    results = await _generate_batch_uncached([original_question for _, original_question in batch])
+
+    async def _finalize(question_id: int, original_question: str, result: schemas.GeminiQuestionResponse | None) -> dict:
+        if result is None:
+            try:
+                result = await generate_question_with_ai(original_question)
+            except HTTPException as e:
+                return {"question_id": question_id, "error": e.detail}
+        else:
+            await _cache_set(make_generate_key(original_question), "generate", result.model_dump_json())
+        return {"question_id": question_id, "result": result.model_dump()}
+
+    return await asyncio.gather(*[
+        _finalize(question_id, original_question, result)
+        for (question_id, original_question), result in zip(batch, results)
+    ])
+
 
+async def _generate_batch_uncached(original_questions: list[str]) -> list[schemas.GeminiQuestionResponse | None]:
+    """
+    Birden fazla soruyu tek istekte üretir. Her öğe ayrı ayrı doğrulanır;
+    geçersiz olanların yerine None döner.
+    """
+    prompt = _build_batch_prompt(original_questions)
+    try:
+        raw_text = await _generate_content(prompt, KIND_QUESTION_BATCH, len(original_questions))
+        items = json.loads(_strip_code_fence(raw_text))
+        if not isinstance(items, list):
+            raise ValueError("Yanıt bir JSON dizisi değil.")
     except Exception as e:
-        print(f"AI Soru Üretme Hatası: {e}")
-        raise HTTPException(status_code=500, detail="Yapay zeka ile soru üretilirken bir hata oluştu.")
+        print(f"AI Toplu Soru Üretme Hatası: {e!r}")
+        return [None] * len(original_questions)
+
+    results = []
+    for index in range(len(original_questions)):
+        try:
+            results.append(schemas.GeminiQuestionResponse.model_validate(items[index]))
+        except Exception as e:
+            print(f"AI Toplu Soru Üretme Hatası (öğe {index}): {e}")
+            results.append(None)
+    return results
+
+
+def _build_batch_prompt(original_questions: list[str]) -> str:
+    numbered = "\n\n".join(f'{index + 1}. ÖRNEK SORU:\n"{question}"' for index, question in enumerate(original_questions))
+    return f"""
+    GÖREV: Aşağıdaki {len(original_questions)} örnek sorunun her biri için konu, format ve zorluk seviyesi olarak çok benzeyen yeni bir çoktan seçmeli soru oluştur.
+
+    {numbered}
+
+    KURALLAR:
+    1.  Cevabın SADECE ve SADECE bir JSON dizisi olmalı.
+    2.  JSON dışında kesinlikle hiçbir metin ekleme.
+    3.  Dizide örnek soru sayısı kadar öğe olmalı ve öğeler örnek sorularla aynı sırada olmalı.
+    4.  Dizinin her öğesi aşağıdaki yapıya birebir uymalıdır:
+        {{
+          "question": "Oluşturulan yeni sorunun metni buraya gelecek.",
+          "options": [
+            {{"options": "A", "text": "A şıkkının metni"}},
+            {{"options": "B", "text": "B şıkkının metni"}},
+            {{"options": "C", "text": "C şıkkının metni"}},
+            {{"options": "D", "text": "D şıkkının metni"}}
+          ],
+          "correct_ans": "Doğru şıkkın harfi (örn: 'B')"
+        }}
+    """
+
+
+async def explain_question_with_ai(request: schemas.ExplainQuestionRequest) -> schemas.QuestionExplanationResponse:
+    cache_key = make_explain_key(request)
+    cached = await _cache_get(cache_key)
+    if cached is not None:
+        return schemas.QuestionExplanationResponse.model_validate_json(cached)
+
+    async def _explain_and_cache() -> schemas.QuestionExplanationResponse:
+        result = await _explain_question_uncached(request)
+        await _cache_set(cache_key, "explain", result.model_dump_json())
+        return result
+
+    try:
+        return await _coalesced(cache_key, _explain_and_cache)
+    except HTTPException as e:
+        stale = await _cache_get_stale(cache_key) if e.status_code == 503 else None
+        if stale is None:
+            raise
+        return schemas.QuestionExplanationResponse.model_validate_json(stale)
+
+
+async def _explain_question_uncached(request: schemas.ExplainQuestionRequest) -> schemas.QuestionExplanationResponse:
+    prompt = _build_explain_prompt(request)
+    try:
+        raw_explanation = await _generate_content(prompt, KIND_EXPLANATION)
+        cleaned_explanation = re.sub(r'[\*]', '', raw_explanation).strip()
+        return schemas.QuestionExplanationResponse(explanation=cleaned_explanation)
+    except CircuitOpenError:
+        raise _circuit_open_error()
+    except BudgetExhaustedError as e:
+        raise _budget_exhausted_error(e)
+    except asyncio.TimeoutError:
+        print("AI Açıklama Üretme Hatası: zaman aşımı")
+        raise HTTPException(status_code=504, detail="Yapay zeka zamanında yanıt vermedi.")
+    except Exception as e:
+        print(f"AI Açıklama Üretme Hatası: {e}")
+        raise HTTPException(status_code=500, detail="Yapay zeka ile açıklama üretilirken bir hata oluştu.")
+
+
+async def explain_question_stream(request: schemas.ExplainQuestionRequest) -> AsyncIterator[str]:
+    """
+    Açıklamayı model ürettikçe temizlenmiş parçalar halinde döndürür.
+    Akış tamamlandığında tam metin açıklama önbelleğine yazılır.
+    """
+    cache_key = make_explain_key(request)
+    cached = await _cache_get(cache_key)
+    if cached is not None:
+        yield schemas.QuestionExplanationResponse.model_validate_json(cached).explanation
+        return
+
+    prompt = _build_explain_prompt(request)
+    parts = []
+    try:
+        async for chunk in _stream_content(prompt, KIND_EXPLANATION):
+            # '*' karakteri tek başına silindiği için parça sınırlarından etkilenmez
+            cleaned = chunk.replace("*", "")
+            if not parts:
+                cleaned = cleaned.lstrip()
+                if not cleaned:
+                    continue
+            parts.append(cleaned)
+            yield cleaned
+    except CircuitOpenError:
+        stale = await _cache_get_stale(cache_key)
+        if stale is None:
+            raise _circuit_open_error()
+        yield schemas.QuestionExplanationResponse.model_validate_json(stale).explanation
+        return
+    except BudgetExhaustedError as e:
+        raise _budget_exhausted_error(e)
+    except asyncio.TimeoutError:
+        print("AI Açıklama Akışı Hatası: zaman aşımı")
+        raise HTTPException(status_code=504, detail="Yapay zeka zamanında yanıt vermedi.")
+    except Exception as e:
+        print(f"AI Açıklama Akışı Hatası: {e}")
+        raise HTTPException(status_code=500, detail="Yapay zeka ile açıklama üretilirken bir hata oluştu.")
 
+    explanation = "".join(parts).strip()
+    if explanation:
+        await _cache_set(cache_key, "explain", schemas.QuestionExplanationResponse(explanation=explanation).model_dump_json())
 
-def explain_question_with_ai(request: schemas.ExplainQuestionRequest) -> schemas.QuestionExplanationResponse:
+
+def _build_explain_prompt(request: schemas.ExplainQuestionRequest) -> str:
     options_text = "\n".join([f"{opt.options}) {opt.text}" for opt in request.options])
     user_context_prompt = ""
     instruction_prompt = ""
@@ -59,7 +529,7 @@ def explain_question_with_ai(request: schemas.ExplainQuestionRequest) -> schemas
     else:
         instruction_prompt = f"Kullanıcı bu soruya cevap vermedi. Doğrudan konuya girerek doğru cevabın ({request.correct_answer}) neden doğru olduğunu ve diğer şıkların neden çeldirici veya yanlış olduğunu detaylıca anlat."
 
-    prompt = f"""
+    return f"""
     GÖREV: Sen yardımcı bir öğretmensin. Aşağıda verilen çoktan seçmeli soruyu, talimatlara uyarak açıkla.
 
     --- SORU BİLGİLERİ ---
@@ -76,11 +546,3 @@ def explain_question_with_ai(request: schemas.ExplainQuestionRequest) -> schemas
     1. Cevabın sadece ve sadece açıklama metni olsun.
     2. Açıklama dışında hiçbir ekleme yapma.
     """
-    try:
-        response = model.generate_content(prompt)
-        raw_explanation = response.text
-        cleaned_explanation = re.sub(r'[\*]', '', raw_explanation).strip()
-        return schemas.QuestionExplanationResponse(explanation=cleaned_explanation)
-    except Exception as e:
-        print(f"AI Açıklama Üretme Hatası: {e}")
-        raise HTTPException(status_code=500, detail="Yapay zeka ile açıklama üretilirken bir hata oluştu.")
\ No newline at end of file
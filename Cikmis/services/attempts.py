@@ -0,0 +1,469 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException
+from sqlalchemy import case, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from config import settings
+from database import SessionLocal
+from services.exam_cache import exam_cache
+from services.ttl_cache import TTLCache
+from services.turkish_text import turkish_lower
+
+# Cevap kâğıdı alımı. Kâğıt, sınavın cevap anahtarıyla tek geçişte sunucuda
+# puanlanır ve sonuç hemen döner; deneme ve cevap satırları ise bellekte biriktirilip
+# attempts_flush_interval_seconds aralıklarla (ya da attempts_flush_batch_size kâğıt
+# birikince) tek transaction'da yazılır. Aynı transaction'da kullanıcı/sınav/ders ve
+# soru bazındaki özet tablolar artımlı olarak güncellenir; raporlar ham cevapları
+# taramaz. Raporlar en fazla bir flush aralığı kadar geriden gelir.
+
+# Sürümle anahtarlanan cevap anahtarları bayatlamaz; soru eklenince sürüm değişir.
+_ANSWER_KEY_TTL_SECONDS = 24 * 3600
+_answer_keys = TTLCache(max_entries=1024, ttl_seconds=_ANSWER_KEY_TTL_SECONDS)
+
+
+def _normalize_answer(answer: str | None) -> str:
+    return " ".join(turkish_lower(answer).split()) if answer else ""
+
+
+def _answer_key(db: Session, exam_id: int) -> tuple[str | None, dict[int, tuple[str, str]]]:
+    """
+    (ders adı, {soru id: (normalize cevap, cevap)}) döndürür; sınav yoksa 404.
+    """
+    version = exam_cache.version(db, exam_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Exam not found.")
+    key = (exam_id, version)
+    cached = _answer_keys.get(key)
+    if cached is None:
+        course_name = db.query(models.Exam.course_name).filter(models.Exam.id == exam_id).scalar()
+        rows = db.query(models.Question.id, models.Question.answer).filter(models.Question.exam_id == exam_id)
+        cached = (course_name, {qid: (_normalize_answer(answer), answer or "") for qid, answer in rows})
+        _answer_keys.set(key, cached)
+    return cached
+
+
+@dataclass
+class PendingAttempt:
+    id: str
+    # İstemcinin verdiği kimlik; yalnızca aynı kullanıcının kâğıtları arasında tekildir
+    client_id: str | None
+    user_id: int
+    exam_id: int
+    course_name: str | None
+    correct: int
+    answered: int
+    total: int
+    duration_seconds: float | None
+    submitted_at: float
+    # (soru id, verilen cevap, doğru mu)
+    answers: list[tuple[int, str | None, bool]] = field(default_factory=list)
+    result: dict = field(default_factory=dict)
+
+    @property
+    def key(self) -> tuple[int, str]:
+        return self.user_id, self.client_id or self.id
+
+
+def grade(db: Session, exam_id: int, user_id: int, submission: schemas.AttemptSubmit) -> PendingAttempt:
+    course_name, key = _answer_key(db, exam_id)
+
+    answers: list[tuple[int, str | None, bool]] = []
+    results: list[dict] = []
+    seen: set[int] = set()
+    correct = answered = 0
+    for item in submission.answers:
+        expected = key.get(item.question_id)
+        if expected is None:
+            raise HTTPException(status_code=400, detail=f"Soru {item.question_id} bu sınava ait değil.")
+        if item.question_id in seen:
+            raise HTTPException(status_code=400, detail=f"Soru {item.question_id} birden fazla kez cevaplanmış.")
+        seen.add(item.question_id)
+
+        given = _normalize_answer(item.answer)
+        if not given:
+            # Boş bırakılan soru yanlış sayılır ama cevap satırı oluşturmaz
+            results.append({"question_id": item.question_id, "correct": False, "correct_answer": expected[1]})
+            continue
+        is_correct = given == expected[0]
+        answered += 1
+        correct += is_correct
+        answers.append((item.question_id, item.answer, is_correct))
+        results.append({"question_id": item.question_id, "correct": is_correct, "correct_answer": expected[1]})
+
+    attempt = PendingAttempt(
+        id=uuid.uuid4().hex, client_id=submission.attempt_id, user_id=user_id, exam_id=exam_id, course_name=course_name,
+        correct=correct, answered=answered, total=len(key),
+        duration_seconds=submission.duration_seconds, submitted_at=time.time(), answers=answers,
+    )
+    attempt.result = {
+        "attempt_id": submission.attempt_id or attempt.id, "exam_id": exam_id, "correct": correct,
+        "answered": answered, "total": len(key), "results": results,
+    }
+    return attempt
+
+
+def _insert_for(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return pg_insert
+    if dialect == "sqlite":
+        return sqlite_insert
+    raise RuntimeError(f"Deneme yazımı {dialect} veritabanını desteklemiyor.")
+
+
+def _write_batch(db: Session, batch: list[PendingAttempt]) -> int:
+    """
+    Kâğıtları, cevapları ve özet tablolardaki artışları tek transaction'da yazar.
+    Kullanıcının aynı istemci kimliğiyle daha önce yazılmış kâğıtları özetlere ikinci
+    kez eklenmez.
+    """
+    insert = _insert_for(db)
+    inserted = set(db.execute(
+        insert(models.ExamAttempt)
+        .values([{
+            "id": a.id, "client_attempt_id": a.client_id, "user_id": a.user_id, "exam_id": a.exam_id, "correct": a.correct,
+            "answered": a.answered, "total": a.total, "duration_seconds": a.duration_seconds,
+            "submitted_at": a.submitted_at,
+        } for a in batch])
+        .on_conflict_do_nothing()
+        .returning(models.ExamAttempt.id)
+    ).scalars())
+    batch = [a for a in batch if a.id in inserted]
+    if not batch:
+        db.commit()
+        return 0
+
+    answer_rows = [
+        {"attempt_id": a.id, "user_id": a.user_id, "question_id": question_id,
+         "given_answer": given, "is_correct": is_correct, "answered_at": a.submitted_at}
+        for a in batch for question_id, given, is_correct in a.answers
+    ]
+    if answer_rows:
+        db.execute(insert(models.AttemptAnswer), answer_rows)
+
+    # Artışlar önce bellekte toplanır; her özet tablo için tek bir toplu upsert çalışır
+    user_exam: dict[tuple, dict] = {}
+    user_course: dict[tuple, dict] = {}
+    exam: dict[int, dict] = defaultdict(lambda: {"attempts": 0, "correct": 0, "answered": 0, "questions": 0})
+    question: dict[int, dict] = defaultdict(lambda: {"answered": 0, "correct": 0})
+    for a in sorted(batch, key=lambda a: a.submitted_at):
+        row = user_exam.setdefault((a.user_id, a.exam_id), {
+            "user_id": a.user_id, "exam_id": a.exam_id, "attempts": 0, "correct": 0,
+            "answered": 0, "questions": 0, "best_correct": 0,
+        })
+        row["attempts"] += 1
+        row["correct"] += a.correct
+        row["answered"] += a.answered
+        row["questions"] += a.total
+        row["best_correct"] = max(row["best_correct"], a.correct)
+        row["last_correct"] = a.correct
+        row["last_attempt_at"] = a.submitted_at
+
+        if a.course_name is not None:
+            row = user_course.setdefault((a.user_id, a.course_name), {
+                "user_id": a.user_id, "course_name": a.course_name,
+                "attempts": 0, "correct": 0, "answered": 0, "questions": 0,
+            })
+            row["attempts"] += 1
+            row["correct"] += a.correct
+            row["answered"] += a.answered
+            row["questions"] += a.total
+            row["last_attempt_at"] = a.submitted_at
+
+        row = exam[a.exam_id]
+        row["attempts"] += 1
+        row["correct"] += a.correct
+        row["answered"] += a.answered
+        row["questions"] += a.total
+
+        for question_id, _, is_correct in a.answers:
+            question[question_id]["answered"] += 1
+            question[question_id]["correct"] += is_correct
+
+    def _upsert(model, keys: list[str], rows: list[dict], additive: list[str], extra=None) -> None:
+        if not rows:
+            return
+        stmt = insert(model)
+        table = model.__table__.c
+        values = {name: table[name] + stmt.excluded[name] for name in additive}
+        values.update(extra(stmt, table) if extra else {})
+        db.execute(stmt.on_conflict_do_update(index_elements=keys, set_=values), rows)
+
+    _upsert(
+        models.UserExamStats, ["user_id", "exam_id"], list(user_exam.values()),
+        ["attempts", "correct", "answered", "questions"],
+        lambda stmt, table: {
+            "best_correct": case(
+                (stmt.excluded.best_correct > table.best_correct, stmt.excluded.best_correct),
+                else_=table.best_correct,
+            ),
+            "last_correct": case(
+                (stmt.excluded.last_attempt_at >= table.last_attempt_at, stmt.excluded.last_correct),
+                else_=table.last_correct,
+            ),
+            "last_attempt_at": case(
+                (stmt.excluded.last_attempt_at >= table.last_attempt_at, stmt.excluded.last_attempt_at),
+                else_=table.last_attempt_at,
+            ),
+        },
+    )
+    _upsert(
+        models.UserCourseStats, ["user_id", "course_name"], list(user_course.values()),
+        ["attempts", "correct", "answered", "questions"],
+        lambda stmt, table: {
+            "last_attempt_at": case(
+                (stmt.excluded.last_attempt_at >= table.last_attempt_at, stmt.excluded.last_attempt_at),
+                else_=table.last_attempt_at,
+            ),
+        },
+    )
+    _upsert(
+        models.ExamStats, ["exam_id"],
+        [{"exam_id": exam_id, **row} for exam_id, row in exam.items()],
+        ["attempts", "correct", "answered", "questions"],
+    )
+    _upsert(
+        models.QuestionStats, ["question_id"],
+        [{"question_id": question_id, **row} for question_id, row in question.items()],
+        ["answered", "correct"],
+    )
+    db.commit()
+    return len(batch)
+
+
+class AttemptBuffer:
+    """
+    Puanlanmış kâğıtları bellekte tutar ve toplu yazar. Sync endpoint'ler (threadpool)
+    ve arka plandaki flush döngüsü aynı anda kullanabildiği için kilitle korunur.
+    Yazımı başarısız olan kâğıtlar kaybolmaz, bir sonraki flush'ta tekrar denenir.
+    """
+
+    def __init__(self, flush_interval: float, batch_size: int, max_pending: int):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._pending: dict[tuple[int, str], PendingAttempt] = {}
+        # Şu anda yazılmakta olan kâğıtlar; tekrar gönderimler bunlara da bakar
+        self._inflight: dict[tuple[int, str], PendingAttempt] = {}
+        self._lock = threading.Lock()
+        # Aynı anda tek flush çalışır; satır kilitleri için yarışan transaction'lar olmasın
+        self._flush_lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self.accepted = 0
+        self.replayed = 0
+        self.written = 0
+        self.flushes = 0
+        self.failures = 0
+        self.last_flush_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self._loop = None
+            self._wakeup = None
+        # Kapanırken bekleyen kâğıtlar yazılır
+        await asyncio.to_thread(self.flush_all)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending) + len(self._inflight)
+
+    def submit(self, attempt: PendingAttempt) -> dict:
+        """
+        Kâğıdı kuyruğa ekler ve puanlama sonucunu döndürür. Aynı kimlikle bekleyen bir
+        kâğıt varsa ilk gönderimin sonucu döner. Bekleyen kâğıt sayısı sınırdaysa
+        yazım isteğin kendisinde yapılır; o da başarısız olursa 503 döner.
+        """
+        for _ in range(2):
+            with self._lock:
+                existing = self._pending.get(attempt.key) or self._inflight.get(attempt.key)
+                if existing is not None:
+                    self.replayed += 1
+                    return existing.result
+                if len(self._pending) + len(self._inflight) < self.max_pending:
+                    self._pending[attempt.key] = attempt
+                    self.accepted += 1
+                    full = len(self._pending) >= self.batch_size
+                    break
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Deneme kuyruğu boşaltılamadı. Hata: {e}")
+                raise HTTPException(status_code=503, detail="Sınav sonuçları şu anda kaydedilemiyor, lütfen tekrar deneyin.")
+        else:
+            raise HTTPException(status_code=503, detail="Sınav sonuçları şu anda kaydedilemiyor, lütfen tekrar deneyin.")
+
+        if full and self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return attempt.result
+
+    def flush(self) -> int:
+        """
+        En fazla batch_size kâğıdı yazar; yazılan yeni kâğıt sayısını döndürür.
+        """
+        with self._flush_lock:
+            with self._lock:
+                keys = list(self._pending)[:self.batch_size]
+                batch = [self._pending.pop(key) for key in keys]
+                self._inflight.update((a.key, a) for a in batch)
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            db = SessionLocal()
+            try:
+                written = _write_batch(db, batch)
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    self.failures += 1
+                    for a in batch:
+                        self._inflight.pop(a.key, None)
+                        self._pending[a.key] = a
+                raise
+            finally:
+                db.close()
+
+            with self._lock:
+                for a in batch:
+                    self._inflight.pop(a.key, None)
+                self.written += written
+                self.flushes += 1
+                self.last_flush_seconds = time.perf_counter() - started
+            return written
+
+    def flush_all(self) -> int:
+        written = 0
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return written
+            try:
+                written += self.flush()
+            except Exception as e:
+                print(f"Bekleyen denemeler yazılamadı. Hata: {e}")
+                return written
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while True:
+                    await asyncio.to_thread(self.flush)
+                    with self._lock:
+                        if len(self._pending) < self.batch_size:
+                            break
+            except Exception as e:
+                print(f"Deneme kuyruğu boşaltılamadı. Hata: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "pending": len(self._pending) + len(self._inflight),
+                "accepted": self.accepted,
+                "replayed": self.replayed,
+                "written": self.written,
+                "flushes": self.flushes,
+                "failures": self.failures,
+                "last_flush_ms": round(self.last_flush_seconds * 1000, 1),
+                "answer_keys": _answer_keys.stats(),
+            }
+
+
+buffer = AttemptBuffer(
+    flush_interval=settings.attempts_flush_interval_seconds,
+    batch_size=settings.attempts_flush_batch_size,
+    max_pending=settings.attempts_max_pending,
+)
+
+
+def submit(db: Session, exam_id: int, user_id: int, submission: schemas.AttemptSubmit) -> dict:
+    return buffer.submit(grade(db, exam_id, user_id, submission))
+
+
+# --- Raporlar (yalnızca özet tablolar okunur) ---
+
+def _rate(correct: int, total: int) -> float | None:
+    return round(correct / total, 4) if total else None
+
+
+def user_course_stats(db: Session, user_id: int) -> list[dict]:
+    rows = db.execute(
+        select(models.UserCourseStats)
+        .where(models.UserCourseStats.user_id == user_id)
+        .order_by(models.UserCourseStats.last_attempt_at.desc())
+    ).scalars()
+    return [{
+        "course_name": row.course_name, "attempts": row.attempts, "correct": row.correct,
+        "answered": row.answered, "questions": row.questions, "last_attempt_at": row.last_attempt_at,
+        "success_rate": _rate(row.correct, row.questions),
+    } for row in rows]
+
+
+def user_exam_stats(db: Session, user_id: int) -> list[dict]:
+    rows = db.execute(
+        select(models.UserExamStats)
+        .where(models.UserExamStats.user_id == user_id)
+        .order_by(models.UserExamStats.last_attempt_at.desc())
+    ).scalars()
+    return [{
+        "exam_id": row.exam_id, "attempts": row.attempts, "correct": row.correct,
+        "answered": row.answered, "questions": row.questions, "best_correct": row.best_correct,
+        "last_correct": row.last_correct, "last_attempt_at": row.last_attempt_at,
+        "success_rate": _rate(row.correct, row.questions),
+    } for row in rows]
+
+
+def exam_stats(db: Session, exam_id: int) -> dict:
+    row = db.get(models.ExamStats, exam_id)
+    if row is None:
+        if exam_cache.version(db, exam_id) is None:
+            raise HTTPException(status_code=404, detail="Exam not found.")
+        attempts = correct = answered = questions = 0
+    else:
+        attempts, correct, answered, questions = row.attempts, row.correct, row.answered, row.questions
+
+    question_rows = db.execute(
+        select(models.QuestionStats)
+        .join(models.Question, models.Question.id == models.QuestionStats.question_id)
+        .where(models.Question.exam_id == exam_id)
+        .order_by(models.QuestionStats.question_id)
+    ).scalars()
+    return {
+        "exam_id": exam_id, "attempts": attempts, "correct": correct, "answered": answered,
+        "questions": questions, "success_rate": _rate(correct, questions),
+        "question_stats": [{
+            "question_id": q.question_id, "answered": q.answered, "correct": q.correct,
+            "success_rate": _rate(q.correct, q.answered),
+        } for q in question_rows],
+    }
@@ -0,0 +1,45 @@
+import time
+
+import schemas
+from config import settings
+from services.ttl_cache import TTLCache
+
+# Doğrulanmış JWT içerikleri (token -> claims). İmza doğrulaması tekrar yapılmaz;
+# kayıt en geç token'ın exp zamanında düşer.
+claims_cache = TTLCache(max_entries=settings.auth_cache_max_entries, ttl_seconds=settings.auth_cache_ttl_seconds)
+
+# Token konusu (email) -> kullanıcı. Her istekte veritabanına gitmemek için.
+principal_cache = TTLCache(max_entries=settings.auth_cache_max_entries, ttl_seconds=settings.auth_cache_ttl_seconds)
+
+
+def get_claims(token: str) -> dict | None:
+    return claims_cache.get(token)
+
+
+def set_claims(token: str, payload: dict) -> None:
+    exp = payload.get("exp")
+    ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+    claims_cache.set(token, payload, ttl)
+
+
+def get_principal(email: str) -> schemas.User | None:
+    return principal_cache.get(email)
+
+
+def set_principal(email: str, user: schemas.User) -> None:
+    principal_cache.set(email, user)
+
+
+def invalidate_user(user_id: int) -> None:
+    """
+    Kullanıcı güncellendiğinde ya da silindiğinde çağrılır. Diğer worker'lardaki
+    kopyalar en geç auth_cache_ttl_seconds sonra düşer.
+    """
+    principal_cache.delete_where(lambda _, user: user.id == user_id)
+
+
+def stats() -> dict:
+    return {
+        "claims": claims_cache.stats(),
+        "principals": principal_cache.stats(),
+    }
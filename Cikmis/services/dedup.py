@@ -0,0 +1,244 @@
+import hashlib
+import random
+import threading
+import time
+from array import array
+from collections import defaultdict
+from dataclasses import dataclass
+
+from sqlalchemy.orm import Session
+
+import models
+from config import settings
+from services.turkish_text import tokenize
+
+# Mersenne asalı; MinHash permütasyonları (a * x + b) mod P biçimindedir.
+_PRIME = (1 << 61) - 1
+
+
+@dataclass
+class ScreenResult:
+    signature: array
+    # Pozitif değer: arşivdeki soru kimliği. Negatif değer: aynı yüklemedeki -(sıra + 1). Yoksa None.
+    duplicate_of: int | None = None
+    similarity: float = 0.0
+
+
+def shingles(text: str | None) -> set[int]:
+    """
+    Normalize edilmiş metnin ardışık kelime ikililerini 32 bitlik sayılara çevirir.
+    Küçük ifade farkları yalnızca birkaç ikiliyi değiştirir.
+    """
+    tokens = tokenize(text)
+    if len(tokens) < 2:
+        grams = tokens
+    else:
+        grams = [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return {int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=4).digest(), "little") for gram in grams}
+
+
+class LSHIndex:
+    """
+    MinHash imzaları için bant tabanlı LSH. İmza bands parçaya bölünür; en az bir
+    bandı aynı olan sorular aday sayılır ve benzerlik imzalardan tahmin edilir.
+    """
+
+    def __init__(self, num_perm: int, bands: int):
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: list[defaultdict[tuple, set[int]]] = [defaultdict(set) for _ in range(bands)]
+        self._signatures: dict[int, array] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_keys(self, signature: array):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, tuple(signature[start:start + self.rows])
+
+    def add(self, question_id: int, signature: array) -> None:
+        if question_id in self._signatures:
+            self.remove(question_id)
+        self._signatures[question_id] = signature
+        for band, key in self._band_keys(signature):
+            self._buckets[band][key].add(question_id)
+
+    def remove(self, question_id: int) -> None:
+        signature = self._signatures.pop(question_id, None)
+        if signature is None:
+            return
+        for band, key in self._band_keys(signature):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(question_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def query(self, signature: array, threshold: float) -> tuple[int, float] | None:
+        candidates = set()
+        for band, key in self._band_keys(signature):
+            bucket = self._buckets[band].get(key)
+            if bucket:
+                candidates |= bucket
+        best = None
+        for candidate in candidates:
+            similarity = estimate_similarity(signature, self._signatures[candidate])
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (candidate, similarity)
+        return best
+
+
+def estimate_similarity(a: array, b: array) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class NearDuplicateDetector:
+    """
+    Soru metinleri için MinHash/LSH tabanlı yakın kopya dedektörü.
+    İmzalar question_signatures tablosunda saklanır; her worker bu tabloyu
+    question_id sırasıyla artımlı olarak belleğe yükler ve belirli aralıklarla
+    baştan yükleyerek kaçırılan eklemeleri ve silmeleri uzlaştırır.
+    """
+
+    def __init__(self, num_perm: int, bands: int, threshold: float, seed: int = 1,
+                 full_reload_interval: float = 0):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self.index = LSHIndex(num_perm, bands)
+        self.full_reload_interval = full_reload_interval
+        self._loaded_up_to = 0
+        self._full_loaded_at = float("-inf")
+        # Tam yükleme sürerken yapılan (question_id, imza | None) değişiklikleri
+        self._pending: list[tuple[int, array | None]] | None = None
+        self._lock = threading.Lock()
+
+    def signature(self, text: str | None) -> array:
+        values = shingles(text)
+        if not values:
+            return array("Q", [_PRIME] * self.num_perm)
+        return array("Q", [min((a * x + b) % _PRIME for x in values) for a, b in self._perms])
+
+    def refresh(self, db: Session, chunk_size: int = 5000) -> None:
+        """
+        Son yüklemeden sonra (başka worker'lar dahil) eklenen imzaları belleğe alır.
+        question_id sırası commit sırası değildir: eşzamanlı transaction'lar ve
+        dedup_archive.py ile eski sorulara sonradan yazılan imzalar filigranın altında
+        kalır, başka worker'daki silmeler de buraya yansımaz. Bunları yakalamak için
+        full_reload_interval saniyede bir tablo baştan yüklenir.
+        """
+        if self.full_reload_interval and time.monotonic() - self._full_loaded_at >= self.full_reload_interval:
+            self.reload(db, chunk_size)
+            return
+        with self._lock:
+            self._load_rows(db, self.index, self._loaded_up_to, chunk_size)
+
+    def reload(self, db: Session, chunk_size: int = 5000) -> None:
+        """
+        İmza tablosunu yeni bir indekse baştan yükleyip eskisinin yerine koyar.
+        Yükleme kilit dışında yapılır; bu sırada gelen add/remove çağrıları
+        kaydedilip yeni indekse de uygulanır.
+        """
+        with self._lock:
+            if self._pending is not None:
+                return  # Başka bir thread zaten yüklüyor
+            self._pending = []
+            self._full_loaded_at = time.monotonic()
+        index = LSHIndex(self.num_perm, self.index.bands)
+        try:
+            loaded_up_to = self._load_rows(db, index, 0, chunk_size)
+        except BaseException:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            for question_id, signature in self._pending:
+                if signature is None:
+                    index.remove(question_id)
+                else:
+                    index.add(question_id, signature)
+                    loaded_up_to = max(loaded_up_to, question_id)
+            self._pending = None
+            self.index = index
+            self._loaded_up_to = max(loaded_up_to, self._loaded_up_to)
+
+    def _load_rows(self, db: Session, index: LSHIndex, after: int, chunk_size: int) -> int:
+        while True:
+            rows = (
+                db.query(models.QuestionSignature.question_id, models.QuestionSignature.signature)
+                .filter(models.QuestionSignature.question_id > after)
+                .order_by(models.QuestionSignature.question_id)
+                .limit(chunk_size)
+                .all()
+            )
+            for row in rows:
+                signature = array("Q", row.signature)
+                index.add(row.question_id, signature)
+                if index is self.index and self._pending is not None:
+                    self._pending.append((row.question_id, signature))
+                after = row.question_id
+            if index is self.index:
+                self._loaded_up_to = after
+            if len(rows) < chunk_size:
+                return after
+
+    def screen(self, db: Session, texts: list[str]) -> list[ScreenResult]:
+        """
+        Yüklenen soruları arşive ve birbirlerine karşı kontrol eder.
+        """
+        self.refresh(db)
+        batch_index = LSHIndex(self.num_perm, self.index.bands)
+        results = []
+        for position, text in enumerate(texts):
+            signature = self.signature(text)
+            with self._lock:
+                match = self.index.query(signature, self.threshold)
+            batch_match = batch_index.query(signature, self.threshold)
+            if batch_match is not None and (match is None or batch_match[1] > match[1]):
+                match = batch_match
+            result = ScreenResult(signature=signature)
+            if match is not None:
+                result.duplicate_of, result.similarity = match
+            results.append(result)
+            batch_index.add(-(position + 1), signature)
+        return results
+
+    def store(self, db: Session, question_id: int, signature: array, duplicate_of: int | None = None) -> None:
+        """
+        İmzayı çağıranın transaction'ına ekler. Belleğe alma commit'ten sonra add ile yapılır.
+        """
+        db.add(models.QuestionSignature(
+            question_id=question_id,
+            signature=signature.tobytes(),
+            duplicate_of=duplicate_of,
+        ))
+
+    def add(self, question_id: int, signature: array) -> None:
+        with self._lock:
+            self.index.add(question_id, signature)
+            if self._pending is not None:
+                self._pending.append((question_id, signature))
+
+    def remove(self, question_id: int) -> None:
+        with self._lock:
+            self.index.remove(question_id)
+            if self._pending is not None:
+                self._pending.append((question_id, None))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "indexed": len(self.index),
+                "loaded_up_to": self._loaded_up_to,
+                "full_reload_age_seconds": round(time.monotonic() - self._full_loaded_at, 1),
+            }
+
+
+detector = NearDuplicateDetector(
+    num_perm=settings.dedup_num_perm,
+    bands=settings.dedup_bands,
+    threshold=settings.dedup_threshold,
+    full_reload_interval=settings.dedup_full_reload_seconds,
+)
@@ -0,0 +1,14 @@
+from typing import Optional
+
+
+def matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match başlığındaki ETag listesinden biri (veya "*") eşleşiyor mu.
+    GET için zayıf karşılaştırma yapılır, W/ öneki yok sayılır.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
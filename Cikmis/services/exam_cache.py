@@ -0,0 +1,93 @@
+from typing import Awaitable, Callable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import models
+from config import settings
+from services.ttl_cache import TTLCache
+
+# Sürümle anahtarlanan yanıtlar hiç bayatlamaz; eski sürümler LRU ile düşer.
+_PAYLOAD_TTL_SECONDS = 24 * 3600
+
+
+class ExamPayloadCache:
+    """
+    Sınav ve soru listesi yanıtlarının serileştirilmiş halini (exam_id, sürüm, tür)
+    anahtarıyla tutar. Exam.version her soru yazımında artırıldığı için eski sürümün
+    kayıtları bir daha okunmaz; invalidate sadece sürüm bilgisini unutturur.
+
+    Sürüm bilgisi de kısa süreliğine bellekte tutulur; böylece If-None-Match ile gelen
+    tekrar ziyaretler DB'ye hiç gitmeden 304 alır.
+    """
+
+    def __init__(self, max_entries: int, version_ttl_seconds: float):
+        self._versions = TTLCache(max_entries=max_entries, ttl_seconds=version_ttl_seconds)
+        self._payloads = TTLCache(max_entries=max_entries, ttl_seconds=_PAYLOAD_TTL_SECONDS)
+
+    @staticmethod
+    def etag(exam_id: int, version: int, kind: str) -> str:
+        return f'"{kind}-{exam_id}-v{version}"'
+
+    def known_version(self, exam_id: int) -> int | None:
+        return self._versions.get(exam_id)
+
+    def version(self, db: Session, exam_id: int) -> int | None:
+        """
+        Sınavın güncel sürümünü döndürür; sınav yoksa None.
+        """
+        version = self._versions.get(exam_id)
+        if version is None:
+            version = db.query(models.Exam.version).filter(models.Exam.id == exam_id).scalar()
+            if version is not None:
+                self._versions.set(exam_id, version)
+        return version
+
+    async def version_async(self, db: AsyncSession, exam_id: int) -> int | None:
+        version = self._versions.get(exam_id)
+        if version is None:
+            version = await db.scalar(select(models.Exam.version).where(models.Exam.id == exam_id))
+            if version is not None:
+                self._versions.set(exam_id, version)
+        return version
+
+    def get_or_build(self, exam_id: int, version: int, kind: str, build: Callable[[], bytes | None]) -> bytes | None:
+        """
+        Yanıt gövdesini önbellekten döndürür, yoksa build ile üretip saklar.
+        build None döndürürse (ör. sınavın sorusu yok) sonuç önbelleğe alınmaz.
+        """
+        key = (exam_id, version, kind)
+        body = self._payloads.get(key)
+        if body is None:
+            body = build()
+            if body is not None:
+                self._payloads.set(key, body)
+        return body
+
+    async def get_or_build_async(
+        self, exam_id: int, version: int, kind: str, build: Callable[[], Awaitable[bytes | None]]
+    ) -> bytes | None:
+        key = (exam_id, version, kind)
+        body = self._payloads.get(key)
+        if body is None:
+            body = await build()
+            if body is not None:
+                self._payloads.set(key, body)
+        return body
+
+    def invalidate(self, exam_id: int) -> None:
+        self._versions.delete(exam_id)
+
+    def clear(self) -> None:
+        self._versions.clear()
+        self._payloads.clear()
+
+    def stats(self) -> dict:
+        return {"versions": self._versions.stats(), "payloads": self._payloads.stats()}
+
+
+exam_cache = ExamPayloadCache(
+    max_entries=settings.exam_cache_max_entries,
+    version_ttl_seconds=settings.exam_cache_version_ttl_seconds,
+)
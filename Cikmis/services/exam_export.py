@@ -0,0 +1,86 @@
+import csv
+import io
+from itertools import chain, groupby
+from operator import attrgetter
+from typing import Iterable, Iterator
+
+import crud
+from database import SessionLocal
+from services import fast_json
+
+# Sınav arşivinin akışla dışa aktarımı. Satırlar sunucu tarafı imleçten okundukça
+# serileştirilip yazılır; bellek kullanımı sonuç kümesinin boyutundan bağımsızdır.
+# Satırlar sınav kimliği sırasıyla gelir, yarıda kalan bir aktarım son tam alınan
+# sınavın kimliği after_id olarak gönderilerek sürdürülür.
+
+MEDIA_TYPES = {"jsonl": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+_EXAM_COLUMNS = (
+    "id", "title", "description", "course_name", "year", "semester",
+    "university_id", "department_id", "class_level_id", "user_id",
+)
+_CSV_HEADER = ("exam_id",) + _EXAM_COLUMNS[1:] + ("question_id", "question_text", "answer", "options")
+# Her satır için ayrı bir parça göndermek yerine yaklaşık bu boyutta parçalar yazılır
+_CHUNK_BYTES = 64 * 1024
+
+
+def jsonl_chunks(rows: Iterable) -> Iterator[bytes]:
+    """
+    Her sınav, soruları içinde olacak şekilde tek bir JSON satırıdır (GET /exams/{id} biçimi).
+    Satır soru soru yazılır; binlerce sorulu bir sınav da belleğe toplanmaz.
+    """
+    buffer = bytearray()
+    for _, group in groupby(rows, key=attrgetter("id")):
+        first = next(group)
+        exam = fast_json.dumps({column: getattr(first, column) for column in _EXAM_COLUMNS})
+        buffer += exam[:-1] + b',"questions":['
+        separator = b""
+        for row in chain((first,), group):
+            if row.question_id is None:
+                continue
+            buffer += separator
+            buffer += fast_json.dumps({
+                "question_text": row.question_text,
+                "answer": row.answer,
+                "options": row.options,
+                "id": row.question_id,
+                "exam_id": row.id,
+            })
+            separator = b","
+            if len(buffer) >= _CHUNK_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+        buffer += b"]}\n"
+    if buffer:
+        yield bytes(buffer)
+
+
+def csv_chunks(rows: Iterable) -> Iterator[bytes]:
+    """
+    Soru başına bir satır; sınav sütunları her satırda tekrarlanır, sorusu olmayan
+    sınavlar soru sütunları boş tek bir satırla yazılır. options JSON dizisidir.
+    """
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(_CSV_HEADER)
+    for row in rows:
+        options = fast_json.dumps(row.options).decode() if row.options is not None else ""
+        writer.writerow([getattr(row, column) for column in _EXAM_COLUMNS] + [
+            row.question_id, row.question_text, row.answer, options,
+        ])
+        if text.tell() >= _CHUNK_BYTES:
+            yield text.getvalue().encode("utf-8")
+            text.seek(0)
+            text.truncate()
+    if text.tell():
+        yield text.getvalue().encode("utf-8")
+
+
+def export_exams(fmt: str, after_id: int | None = None, **filters) -> Iterator[bytes]:
+    """
+    StreamingResponse için üretici. İstek bağımlılığındaki oturum yanıt gönderilmeden
+    kapanabileceği için akış kendi oturumunu açar ve bitince kapatır.
+    """
+    with SessionLocal() as db:
+        rows = crud.stream_exam_export_rows(db, after_id=after_id, **filters)
+        yield from jsonl_chunks(rows) if fmt == "jsonl" else csv_chunks(rows)
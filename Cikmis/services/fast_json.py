@@ -0,0 +1,134 @@
+import gzip
+from typing import Any, Iterable, Optional
+
+import orjson
+from fastapi import Request, Response
+from starlette import status
+
+import models
+from config import settings
+from services import etag as etag_utils
+from services.ttl_cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # brotli kurulu değilse yalnızca gzip sunulur
+    brotli = None
+
+# Okuma endpoint'leri için hızlı yanıt yolu. Kendi veritabanımızdan yeni okunan satırlar
+# Pydantic ile yeniden doğrulanmaz; doğrudan şemalarla aynı alanlara sahip dict'lere
+# çevrilip orjson ile kodlanır. response_model'ler dokümantasyon için yerinde kalır.
+# Bu dönüştürücüler schemas.py ile birlikte güncellenmelidir.
+
+_EXAM_FIELDS = (
+    "id", "title", "description", "course_name", "year", "semester",
+    "university_id", "department_id", "class_level_id", "user_id",
+)
+
+
+def question_dict(question: models.Question, duplicate_of: Optional[int] = None) -> dict:
+    return {
+        "question_text": question.question_text,
+        "answer": question.answer,
+        "options": question.options,
+        "id": question.id,
+        "exam_id": question.exam_id,
+        "duplicate_of": duplicate_of,
+    }
+
+
+def exam_dict(exam: models.Exam, questions: Optional[Iterable[models.Question]] = None) -> dict:
+    data = {field: getattr(exam, field) for field in _EXAM_FIELDS}
+    data["questions"] = [question_dict(q) for q in (exam.questions if questions is None else questions)]
+    return data
+
+
+def university_dict(university: models.University) -> dict:
+    return {"name": university.name, "id": university.id}
+
+
+def department_dict(department: models.Department) -> dict:
+    return {"name": department.name, "university_id": department.university_id, "id": department.id}
+
+
+def class_level_dict(class_level: models.ClassLevel) -> dict:
+    return {"level": class_level.level, "department_id": class_level.department_id, "id": class_level.id}
+
+
+def row_dict(row) -> dict:
+    # select(...) sonucu Row; etiketler şema alan adlarıyla aynıdır (bkz. crud._exam_summary_columns)
+    return row._asdict()
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+# Sıkıştırılmış gövdeler ETag'e göre saklanır; aynı sürümü isteyen herkes için bir kez sıkıştırılır
+_compressed = TTLCache(max_entries=256, ttl_seconds=3600)
+
+
+def _accepted_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.response_brotli_quality)
+    return gzip.compress(body, compresslevel=settings.response_gzip_level, mtime=0)
+
+
+def json_response(
+    request: Request,
+    content: Any = None,
+    *,
+    body: Optional[bytes] = None,
+    etag: Optional[str] = None,
+    status_code: int = status.HTTP_200_OK,
+) -> Response:
+    """
+    content'i (veya önceden kodlanmış body'yi) JSON olarak döndürür. etag verilirse
+    If-None-Match eşleşmesinde 304 döner. Gövde response_compress_min_bytes'tan büyükse
+    Accept-Encoding'e göre brotli veya gzip ile sıkıştırılır.
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    if etag is not None:
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "no-cache"
+        if etag_utils.matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if body is None:
+        body = dumps(content)
+    encoding = None
+    if len(body) >= settings.response_compress_min_bytes:
+        encoding = _accepted_encoding(request.headers.get("accept-encoding"))
+    if encoding is not None:
+        compressed = _compressed.get((etag, encoding)) if etag is not None else None
+        if compressed is None:
+            compressed = _compress(body, encoding)
+            if etag is not None:
+                _compressed.set((etag, encoding), compressed)
+        body = compressed
+        headers["Content-Encoding"] = encoding
+        if etag is not None:
+            # Sıkıştırılmış gösterim bayt bayt aynı olmadığından ETag zayıf işaretlenir
+            headers["ETag"] = f"W/{etag}"
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
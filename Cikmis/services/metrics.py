@@ -0,0 +1,290 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+from config import settings
+
+# Prometheus metin formatında (text exposition 0.0.4) metrikler. Harici bağımlılık yoktur.
+# metrics_enabled kapalıyken middleware ve veritabanı olayları hiç kurulmaz; servis
+# kodundaki kayıt çağrıları tek bir bool kontrolüyle döner.
+
+enabled = settings.metrics_enabled
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+_AI_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        lines = self._header()
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: tuple = _LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # [bucket sayaçları..., +Inf sayacı], toplam
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(labels, (list(state[0]), state[1])) for labels, state in self._values.items()]
+        lines = self._header()
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_number(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        # Scrape anında çalışan toplayıcılar (ör. havuz durumu); kayıt maliyeti yoktur
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Metrik toplanamadı. Hata: {e}")
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# --- HTTP ---
+http_requests = registry.register(Counter(
+    "http_requests_total", "İşlenen HTTP istekleri.", ("method", "route", "status")))
+http_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP istek süresi (yanıtın tamamı gönderilene kadar).", ("method", "route")))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Şu anda işlenmekte olan HTTP istekleri.", ("method",)))
+
+# --- Veritabanı ---
+db_pool_size = registry.register(Gauge(
+    "db_pool_size", "Bağlantı havuzunun sabit boyutu.", ("engine",)))
+db_pool_checked_out = registry.register(Gauge(
+    "db_pool_checked_out", "Havuzdan alınmış (kullanımda) bağlantılar.", ("engine",)))
+db_pool_overflow = registry.register(Gauge(
+    "db_pool_overflow", "Havuz boyutunun üzerinde açılmış bağlantılar.", ("engine",)))
+db_pool_checkouts = registry.register(Counter(
+    "db_pool_checkouts_total", "Havuzdan alınan bağlantılar.", ("engine",)))
+db_pool_exhausted = registry.register(Counter(
+    "db_pool_exhausted_seconds_total",
+    "Havuzdaki bütün bağlantıların kullanımda olduğu toplam süre; bu sürede gelen istekler bağlantı bekler.",
+    ("engine",)))
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL ifadesi çalıştırma süresi.", ("engine", "statement"), buckets=_QUERY_BUCKETS))
+
+# --- AI upstream ---
+ai_requests = registry.register(Counter(
+    "ai_upstream_requests_total", "Model çağrıları (hedge denemeleri dahil).", ("backend", "kind", "outcome")))
+ai_duration = registry.register(Histogram(
+    "ai_upstream_duration_seconds", "Başarılı model çağrılarının süresi.", ("backend", "kind"), buckets=_AI_BUCKETS))
+ai_tokens = registry.register(Counter(
+    "ai_tokens_total", "Modelin bildirdiği (stub için tahmini) token sayısı.", ("backend", "kind", "direction")))
+
+
+class MetricsMiddleware:
+    """
+    Saf ASGI middleware'i: istekleri route şablonuna göre ("/exams/{exam_id}") etiketler,
+    böylece etiket sayısı URL'lerle büyümez. Akış yanıtlarını tamponlamaz.
+    Route, yönlendirme sırasında scope'a yazılan değerden okunur; bu yüzden süre ve
+    sayaçlar route bazında, eşzamanlı istek sayısı ise method bazında tutulur.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def _send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_in_flight.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            http_in_flight.dec(method)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_duration.observe(time.perf_counter() - started, method, route)
+            http_requests.inc(method, route, str(status_code))
+
+
+def _statement_type(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return verb if verb in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def instrument_engine(engine, name: str, pool_size: int | None = None, max_overflow: int | None = None) -> None:
+    """
+    Sync bir Engine'e (async engine için engine.sync_engine) sorgu süresi ve havuz
+    ölçümü ekler; havuz doluluğu scrape anında okunur.
+
+    SQLAlchemy'de bağlantı beklemeye başlarken tetiklenen public bir olay yoktur; bu
+    yüzden bekleme, checkout/checkin olaylarından havuzun tükendiği süre olarak ölçülür.
+    Havuz doluyken gelen her istek bir bağlantı geri verilene kadar bekler. Havuz
+    sınırı bilinmiyorsa (pool_size verilmemişse) yalnızca checkout sayılır.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["_query_started"].pop()
+        db_query_duration.observe(time.perf_counter() - started, name, _statement_type(statement))
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("_query_started"):
+            conn.info["_query_started"].pop()
+
+    capacity = pool_size + (max_overflow or 0) if pool_size is not None else None
+    lock = threading.Lock()
+    exhausted_since: list[float] = []
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        db_pool_checkouts.inc(name)
+        if capacity is not None and engine.pool.checkedout() >= capacity:
+            with lock:
+                if not exhausted_since:
+                    exhausted_since.append(time.perf_counter())
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        with lock:
+            started = exhausted_since.pop() if exhausted_since else None
+        if started is not None:
+            db_pool_exhausted.inc(name, amount=time.perf_counter() - started)
+
+    def _collect():
+        current = engine.pool
+        if hasattr(current, "checkedout"):
+            db_pool_checked_out.set(current.checkedout(), name)
+        if hasattr(current, "overflow"):
+            db_pool_overflow.set(max(current.overflow(), 0), name)
+        if hasattr(current, "size"):
+            db_pool_size.set(current.size(), name)
+
+    registry.add_collector(_collect)
+
+
+def record_ai_call(backend: str, kind: str, outcome: str, duration: float | None = None) -> None:
+    if not enabled:
+        return
+    ai_requests.inc(backend, kind, outcome)
+    if duration is not None:
+        ai_duration.observe(duration, backend, kind)
+
+
+def record_ai_tokens(backend: str, kind: str, prompt_tokens: int, completion_tokens: int) -> None:
+    if not enabled:
+        return
+    if prompt_tokens:
+        ai_tokens.inc(backend, kind, "prompt", amount=prompt_tokens)
+    if completion_tokens:
+        ai_tokens.inc(backend, kind, "completion", amount=completion_tokens)
@@ -0,0 +1,218 @@
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from config import settings
+
+# İstek başına SQL profili. query_profiling_enabled açıkken her istek kendi profilini
+# contextvar'da taşır; engine olayları çalışan her ifadeyi bu profile yazar. Aynı
+# biçimdeki bir ifade query_repeat_threshold kez tekrarlanırsa N+1 şüphesi raporlanır.
+
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Parametre değerleri ve IN listelerinin uzunluğu farklı olan aynı sorguları eşitler.
+    """
+    shape = _STRING.sub("?", statement)
+    shape = _PARAM_LIST.sub("(?)", shape)
+    shape = _NUMBER.sub("?", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+@dataclass
+class QueryProfile:
+    count: int = 0
+    total_seconds: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    budget: int | None = None
+    # unbudgeted() içinde çalışan, sayılan ama bütçeye dahil edilmeyen sorgular
+    exempt: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, statement: str, seconds: float, exempt: bool = False) -> None:
+        shape = statement_shape(statement)
+        with self._lock:
+            self.count += 1
+            self.exempt += exempt
+            self.total_seconds += seconds
+            self.shapes[shape] += 1
+
+    def repeated(self, threshold: int | None = None) -> list[tuple[str, int]]:
+        threshold = threshold or settings.query_repeat_threshold
+        with self._lock:
+            return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count - self.exempt > self.budget
+
+    def report(self) -> str:
+        lines = [f"{self.count} sorgu, {self.total_seconds * 1000:.1f} ms"]
+        if self.budget is not None:
+            lines[0] += f" (bütçe {self.budget}"
+            lines[0] += f", {self.exempt} bütçe dışı)" if self.exempt else ")"
+        for shape, n in self.repeated():
+            lines.append(f"  {n}x {shape[:200]}")
+        return "\n".join(lines)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+_current: ContextVar[QueryProfile | None] = ContextVar("query_profile", default=None)
+# Açık query_budget blokları. Bloğun içinde yapılan TestClient istekleri ve
+# run_in_threadpool çağrıları contextvar'ı devralır; bloktan önce başlamış arka plan
+# döngüleri (cevap kâğıdı yazımı, analiz yenileme, soru havuzu) ise görmez ve sayılmaz.
+_budgets: ContextVar[tuple[QueryProfile, ...]] = ContextVar("query_budgets", default=())
+_unbudgeted: ContextVar[bool] = ContextVar("query_unbudgeted", default=False)
+_instrumented: set[int] = set()
+_instrument_lock = threading.Lock()
+
+
+def current() -> QueryProfile | None:
+    return _current.get()
+
+
+@contextmanager
+def unbudgeted():
+    """
+    Blok içindeki sorgular profilde sayılır ama endpoint bütçesine dahil edilmez.
+    Önbelleğin sıcak ya da soğuk olmasına göre her route'ta değişen ortak işler
+    (ör. kimlik doğrulamadaki kullanıcı sorgusu) için kullanılır.
+    """
+    token = _unbudgeted.set(True)
+    try:
+        yield
+    finally:
+        _unbudgeted.reset(token)
+
+
+def instrument_engine(engine) -> None:
+    """
+    Sync Engine'e (async engine için engine.sync_engine) profil olaylarını bir kez ekler.
+    """
+    from sqlalchemy import event
+
+    with _instrument_lock:
+        if id(engine) in _instrumented:
+            return
+        _instrumented.add(id(engine))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None or _budgets.get():
+            conn.info.setdefault("_profile_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("_profile_started")
+        if not stack:
+            return
+        seconds = time.perf_counter() - stack.pop()
+        exempt = _unbudgeted.get()
+        profile = _current.get()
+        if profile is not None:
+            profile.record(statement, seconds, exempt)
+        for profile in _budgets.get():
+            profile.record(statement, seconds, exempt)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("_profile_started"):
+            conn.info["_profile_started"].pop()
+
+
+def _default_engines() -> list:
+    from database import async_engine, engine
+
+    return [engine, async_engine.sync_engine]
+
+
+@contextmanager
+def query_budget(max_queries: int, engines: list | None = None):
+    """
+    Blok içinde, bu bağlamdan çalışan SQL ifadelerini sayar; max_queries aşılırsa
+    QueryBudgetExceeded (AssertionError) fırlatır. Aynı süreçteki arka plan döngüleri ve
+    başka isteklerin sorguları sayılmaz. Testlerde ve betiklerde endpoint bütçesi doğrulamak için:
+
+        with query_budget(3) as profile:
+            client.get("/exams/1")
+    """
+    for engine in engines or _default_engines():
+        instrument_engine(engine)
+    profile = QueryProfile(budget=max_queries)
+    token = _budgets.set(_budgets.get() + (profile,))
+    try:
+        yield profile
+    finally:
+        _budgets.reset(token)
+    if profile.over_budget:
+        raise QueryBudgetExceeded(profile.report())
+
+
+class QueryBudget:
+    """
+    Route bağımlılığı olarak endpoint'in sorgu bütçesini bildirir:
+    dependencies=[Depends(QueryBudget(2))]. Profil modu kapalıyken hiçbir şey yapmaz;
+    açıkken bütçe aşımı yanıt başlığında ve log satırında raporlanır. Kimlik doğrulamanın
+    kullanıcı sorgusu bütçeye dahil değildir (bkz. unbudgeted). Akışlı
+    (StreamingResponse) route'larda kullanılmaz: başlıklar gövdeyi üreten sorgulardan
+    önce gönderildiği için sayım başlıklara yansımaz.
+    """
+
+    def __init__(self, max_queries: int):
+        self.max_queries = max_queries
+
+    async def __call__(self) -> None:
+        profile = _current.get()
+        if profile is not None:
+            profile.budget = self.max_queries
+
+
+class QueryProfilerMiddleware:
+    """
+    Her isteğe bir QueryProfile açar ve yanıt başlıklarına sorgu sayısını, süresini,
+    tekrar eden ifade sayısını ve bütçe aşımını ekler. Şüpheli istekler loglanır.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = _current.set(profile)
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(profile.count).encode()))
+                headers.append((b"x-query-time-ms", f"{profile.total_seconds * 1000:.1f}".encode()))
+                repeated = profile.repeated()
+                if repeated:
+                    headers.append((b"x-query-repeated", str(sum(n for _, n in repeated)).encode()))
+                if profile.over_budget:
+                    headers.append((b"x-query-budget-exceeded", f"{profile.count - profile.exempt}/{profile.budget}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _current.reset(token)
+            if profile.over_budget or profile.repeated():
+                print(f"[sorgu profili] {scope['method']} {scope['path']}: {profile.report()}")
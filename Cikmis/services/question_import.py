@@ -0,0 +1,221 @@
+import csv
+import io
+import json
+import time
+from typing import BinaryIO, Iterator
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import crud
+import models
+import schemas
+from config import settings
+from services import dedup, search_index
+from services.exam_cache import exam_cache
+
+# CSV/JSONL dosyalarından akışla soru içe aktarma. Dosya satır satır okunur ve
+# doğrulanır; geçerli satırlar question_import_chunk_size'lık parçalar halinde tek
+# INSERT ... RETURNING ile eklenir. Her parça, question_imports kaydındaki ilerlemeyle
+# aynı transaction'da commit edilir; aynı upload_id ile tekrar gönderilen dosya kaldığı
+# satırdan devam eder, tamamlanmış bir yükleme ise yeniden eklenmeden raporunu döndürür.
+
+_CSV_REQUIRED_COLUMNS = {"question_text", "answer"}
+
+
+def detect_format(filename: str | None, content_type: str | None, requested: str | None) -> str:
+    if requested:
+        return requested
+    name = (filename or "").lower()
+    if name.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "jsonl"
+    raise HTTPException(status_code=400, detail="Dosya biçimi belirlenemedi; format=csv ya da format=jsonl gönderin.")
+
+
+def _parse_options(value: str | None) -> list[str] | None:
+    # Seçenekler JSON dizisi ya da "|" ile ayrılmış metin olabilir
+    value = (value or "").strip()
+    if not value:
+        return None
+    if value.startswith("["):
+        return json.loads(value)
+    return [option.strip() for option in value.split("|") if option.strip()]
+
+
+def _csv_records(text: io.TextIOBase) -> Iterator[tuple[int, dict | None, str | None]]:
+    reader = csv.DictReader(text)
+    columns = set(reader.fieldnames or ())
+    missing = _CSV_REQUIRED_COLUMNS - columns
+    if missing:
+        raise HTTPException(status_code=400, detail=f"CSV başlığında eksik sütunlar: {', '.join(sorted(missing))}")
+
+    row = 0
+    while True:
+        row += 1
+        try:
+            record = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield row, None, f"CSV okunamadı: {e}"
+            continue
+        try:
+            yield row, {
+                # Boş hücreler eksik alan olarak raporlansın
+                "question_text": record.get("question_text") or None,
+                "answer": record.get("answer") or None,
+                "options": _parse_options(record.get("options")),
+            }, None
+        except ValueError as e:
+            yield row, None, f"options okunamadı: {e}"
+
+
+def _jsonl_records(text: io.TextIOBase) -> Iterator[tuple[int, dict | None, str | None]]:
+    for row, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row, None, f"Geçersiz JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield row, None, "Her satır bir JSON nesnesi olmalıdır."
+            continue
+        yield row, record, None
+
+
+def iter_rows(stream: BinaryIO, fmt: str) -> Iterator[tuple[int, schemas.QuestionUpload | None, str | None]]:
+    """
+    Dosyayı satır satır okuyup (satır no, soru, hata) üçlüleri üretir; dosyanın
+    tamamı hiçbir zaman belleğe alınmaz. Hatalı satırlar akışı durdurmaz.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="" if fmt == "csv" else None)
+    records = _csv_records(text) if fmt == "csv" else _jsonl_records(text)
+    for row, record, error in records:
+        if error is not None:
+            yield row, None, error
+            continue
+        try:
+            yield row, schemas.QuestionUpload.model_validate(record), None
+        except ValidationError as e:
+            first = e.errors()[0]
+            field = ".".join(str(part) for part in first["loc"]) or "satır"
+            yield row, None, f"{field}: {first['msg']}"
+
+
+def _report(record: models.QuestionImport, replayed: bool) -> dict:
+    return {
+        "upload_id": record.upload_id,
+        "exam_id": record.exam_id,
+        "status": record.status,
+        "rows": record.rows_done,
+        "inserted": record.inserted,
+        "duplicates": record.duplicates,
+        "rejected_duplicates": record.rejected,
+        "failed": record.failed,
+        "errors": record.errors,
+        "errors_truncated": record.failed > len(record.errors),
+        "replayed": replayed,
+    }
+
+
+def _start(db: Session, exam_id: int, upload_id: str, fmt: str) -> models.QuestionImport:
+    record = db.get(models.QuestionImport, upload_id)
+    if record is None:
+        now = time.time()
+        db.add(models.QuestionImport(
+            upload_id=upload_id, exam_id=exam_id, format=fmt, status="running",
+            rows_done=0, inserted=0, duplicates=0, rejected=0, failed=0, errors=[],
+            created_at=now, updated_at=now,
+        ))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Aynı upload_id ile eşzamanlı gelen diğer istek kaydı önce oluşturdu
+            db.rollback()
+        record = db.get(models.QuestionImport, upload_id)
+    if record.exam_id != exam_id:
+        raise HTTPException(status_code=409, detail="Bu upload_id başka bir sınav için kullanılmış.")
+    return record
+
+
+def import_questions(db: Session, exam_id: int, upload_id: str, stream: BinaryIO, fmt: str) -> dict:
+    if crud.get_exam_by_id(db, exam_id) is None:
+        raise HTTPException(status_code=404, detail="Exam not found.")
+
+    record = _start(db, exam_id, upload_id, fmt)
+    if record.status == "completed":
+        return _report(record, replayed=True)
+
+    progress = {
+        "rows_done": record.rows_done,
+        "inserted": record.inserted,
+        "duplicates": record.duplicates,
+        "rejected": record.rejected,
+        "failed": record.failed,
+        "errors": list(record.errors),
+    }
+    chunk_size = settings.question_import_chunk_size
+    max_errors = settings.question_import_max_errors
+
+    def _commit_chunk(chunk: list[schemas.QuestionUpload], chunk_errors: list[dict], last_row: int, status: str) -> None:
+        added, rejected = crud.insert_questions_chunk(db, exam_id, chunk) if chunk else ([], 0)
+        # Arama belgesi parçayla aynı transaction'da yenilenir; yükleme yarıda kalsa da
+        # commit edilen sorular aramada görünür
+        if added or status == "completed":
+            search_index.index_exam(db, exam_id)
+
+        expected_rows_done = progress["rows_done"]
+        progress["rows_done"] = last_row
+        progress["inserted"] += len(added)
+        progress["duplicates"] += sum(1 for _, result in added if result is not None and result.duplicate_of is not None)
+        progress["rejected"] += rejected
+        progress["failed"] += len(chunk_errors)
+        progress["errors"].extend(chunk_errors[:max(max_errors - len(progress["errors"]), 0)])
+
+        # İlerleme yalnızca beklenen noktadaysa yazılır; aynı upload_id ile paralel
+        # çalışan ikinci istek satırları iki kez ekleyemez
+        saved = db.execute(
+            update(models.QuestionImport)
+            .where(
+                models.QuestionImport.upload_id == upload_id,
+                models.QuestionImport.rows_done == expected_rows_done,
+                models.QuestionImport.status == "running",
+            )
+            .values(status=status, updated_at=time.time(), **progress)
+            .execution_options(synchronize_session=False)
+        )
+        if saved.rowcount != 1:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Bu yükleme başka bir istek tarafından işleniyor.")
+        db.commit()
+        if added:
+            exam_cache.invalidate(exam_id)
+        for question_id, result in added:
+            if result is not None:
+                dedup.detector.add(question_id, result.signature)
+
+    chunk: list[schemas.QuestionUpload] = []
+    chunk_errors: list[dict] = []
+    last_row = progress["rows_done"]
+    for row, question, error in iter_rows(stream, fmt):
+        if row <= progress["rows_done"]:
+            # Önceki denemede commit edilmiş satır
+            continue
+        last_row = row
+        if error is not None:
+            chunk_errors.append({"row": row, "error": error})
+        else:
+            chunk.append(question)
+        if len(chunk) + len(chunk_errors) >= chunk_size:
+            _commit_chunk(chunk, chunk_errors, last_row, "running")
+            chunk, chunk_errors = [], []
+
+    _commit_chunk(chunk, chunk_errors, last_row, "completed")
+    return _report(record, replayed=False)
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+from collections import Counter
+
+from fastapi.concurrency import run_in_threadpool
+
+import crud
+import models
+import schemas
+from config import settings
+from database import SessionLocal
+from services import ai_service
+from services.rate_limit import RateBudget
+
+
+class SimilarQuestionPool:
+    """
+    Her soru için önceden üretilmiş ve doğrulanmış birkaç "benzer soru"yu
+    similar_question_pool tablosunda tutar. Arka plandaki worker'lar en çok
+    görüntülenen sınavlardan başlayarak havuzu doldurur; endpoint havuzdan
+    bir kayıt aldığında ilgili soru yeniden doldurma kuyruğuna eklenir.
+    Her gunicorn worker'ı kendi döngüsünü çalıştırır; çağrı bütçesi ve havuz derinliği
+    veritabanında tutulduğu için süreç sayısı arttıkça harcama artmaz.
+    """
+
+    def __init__(self, depth: int, concurrency: int, rate_per_minute: int, top_exams: int, scan_interval_seconds: int):
+        self.depth = depth
+        self.concurrency = concurrency
+        self.top_exams = top_exams
+        self.scan_interval_seconds = scan_interval_seconds
+        # Toplam AI bütçesinin (ai_rate_per_minute) havuza ayrılan, tüm süreçlerce paylaşılan alt bütçesi
+        self.budget = RateBudget("pool", rate_per_minute)
+        self._queue: asyncio.Queue | None = None
+        self._pending: set[int] = set()
+        self._tasks: list[asyncio.Task] = []
+        self._views: Counter = Counter()
+        self._views_lock = threading.Lock()
+        self.served = 0
+        self.empty = 0
+        self.generated = 0
+        self.rejected = 0
+        self.discarded = 0
+        self.failures = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._scan_loop())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._pending.clear()
+
+    def record_view(self, exam_id: int) -> None:
+        """
+        Görüntülenme sayıları bellekte toplanır ve tarama döngüsünde toplu yazılır.
+        """
+        if not self.running:
+            return
+        with self._views_lock:
+            self._views[exam_id] += 1
+
+    def request_refill(self, question_id: int) -> None:
+        if self._queue is None or question_id in self._pending:
+            return
+        self._pending.add(question_id)
+        self._queue.put_nowait(question_id)
+
+    async def pop(self, question_id: int) -> schemas.GeminiQuestionResponse | None:
+        payload = await run_in_threadpool(self._pop_sync, question_id)
+        self.request_refill(question_id)
+        if payload is None:
+            self.empty += 1
+            return None
+        self.served += 1
+        return schemas.GeminiQuestionResponse.model_validate_json(payload)
+
+    def _pop_sync(self, question_id: int) -> str | None:
+        with SessionLocal() as db:
+            return crud.pop_similar_question(db, question_id)
+
+    async def _scan_loop(self) -> None:
+        while True:
+            try:
+                for question_id in await run_in_threadpool(self._scan_sync):
+                    self.request_refill(question_id)
+            except Exception as e:
+                print(f"Benzer soru havuzu tarama hatası: {e}")
+            await asyncio.sleep(self.scan_interval_seconds)
+
+    def _scan_sync(self) -> list[int]:
+        with self._views_lock:
+            views = dict(self._views)
+            self._views.clear()
+        with SessionLocal() as db:
+            if views:
+                crud.increment_exam_views(db, views)
+            question_ids = []
+            for exam_id in crud.get_most_viewed_exam_ids(db, self.top_exams):
+                question_ids += crud.get_question_ids_below_pool_depth(db, exam_id, self.depth)
+            return question_ids
+
+    async def _worker(self) -> None:
+        ai_service.call_budget.set(self.budget)
+        while True:
+            question_id = await self._queue.get()
+            try:
+                await self._refill(question_id)
+            except Exception as e:
+                self.failures += 1
+                print(f"Benzer soru havuzu doldurma hatası (soru {question_id}): {e}")
+            finally:
+                self._pending.discard(question_id)
+                self._queue.task_done()
+
+    async def _refill(self, question_id: int) -> None:
+        original_question, missing = await run_in_threadpool(self._load_sync, question_id)
+        for _ in range(missing):
+            # Havuzdaki her öğe farklı olmalı; bu yüzden önbellek atlanır.
+            item = await ai_service.generate_question_uncached(original_question)
+            if not is_valid_question(item):
+                self.rejected += 1
+                continue
+            if not await run_in_threadpool(self._store_sync, question_id, item.model_dump_json()):
+                # Havuzu başka bir süreç doldurdu
+                self.discarded += 1
+                return
+            self.generated += 1
+
+    def _load_sync(self, question_id: int) -> tuple[str, int]:
+        with SessionLocal() as db:
+            question = db.get(models.Question, question_id)
+            if question is None:
+                return "", 0
+            missing = self.depth - crud.count_similar_questions(db, question_id)
+            return ai_service.format_question_for_prompt(question), max(0, missing)
+
+    def _store_sync(self, question_id: int, payload: str) -> bool:
+        with SessionLocal() as db:
+            return crud.add_similar_question(db, question_id, payload, self.depth)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": len(self._pending),
+            "served": self.served,
+            "empty": self.empty,
+            "generated": self.generated,
+            "rejected": self.rejected,
+            "discarded": self.discarded,
+            "failures": self.failures,
+        }
+
+
+def is_valid_question(item: schemas.GeminiQuestionResponse) -> bool:
+    letters = {option.options.strip() for option in item.options}
+    return bool(item.question.strip()) and len(letters) >= 2 and item.correct_ans.strip() in letters
+
+
+question_pool = SimilarQuestionPool(
+    depth=settings.ai_pool_depth,
+    concurrency=settings.ai_pool_worker_concurrency,
+    rate_per_minute=settings.ai_pool_rate_per_minute,
+    top_exams=settings.ai_pool_top_exams,
+    scan_interval_seconds=settings.ai_pool_scan_interval_seconds,
+)
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+import models
+from database import SessionLocal
+
+
+class BudgetExhaustedError(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Çağrı bütçesi doldu; {retry_after:.0f} sn sonra yeniden denenebilir.")
+        self.retry_after = retry_after
+
+
+class RateBudget:
+    """
+    Tüm worker süreçleri için ortak, dakikalık sabit pencereli çağrı bütçesi.
+    Sayaç ai_rate_windows tablosunda scope adıyla tutulur; böylece toplam bütçe ve
+    onun alt bütçeleri (iş kuyruğu, soru havuzu) aynı tabloyu paylaşır.
+    calls_per_minute <= 0 ise bütçe sınırsızdır ve veritabanına gidilmez.
+    """
+
+    def __init__(self, scope: str, calls_per_minute: int):
+        self.scope = scope
+        self.calls_per_minute = calls_per_minute
+
+    def try_acquire(self) -> float:
+        """
+        Çağrı hakkı alındıysa 0, alınamadıysa bir sonraki pencereye kalan süreyi döndürür.
+        """
+        if self.calls_per_minute <= 0:
+            return 0.0
+        now = time.time()
+        window = int(now // 60) * 60
+        with SessionLocal() as db:
+            taken = db.execute(
+                update(models.AIRateWindow)
+                .where(
+                    models.AIRateWindow.scope == self.scope,
+                    models.AIRateWindow.window_start == window,
+                    models.AIRateWindow.calls < self.calls_per_minute,
+                )
+                .values(calls=models.AIRateWindow.calls + 1)
+            ).rowcount == 1
+            if not taken and db.get(models.AIRateWindow, (self.scope, window)) is None:
+                db.add(models.AIRateWindow(scope=self.scope, window_start=window, calls=1))
+                db.execute(
+                    models.AIRateWindow.__table__.delete().where(models.AIRateWindow.window_start < window - 3600)
+                )
+                try:
+                    db.commit()
+                    return 0.0
+                except IntegrityError:
+                    # Pencereyi başka bir worker aynı anda açtı
+                    db.rollback()
+                    return 0.05
+            db.commit()
+        return 0.0 if taken else window + 60 - now
+
+    async def acquire(self) -> None:
+        while True:
+            wait = await run_in_threadpool(self.try_acquire)
+            if wait == 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def take(self) -> None:
+        """
+        Beklemeden hak almayı dener; pencere doluysa BudgetExhaustedError fırlatır.
+        """
+        for _ in range(3):
+            wait = await run_in_threadpool(self.try_acquire)
+            if wait == 0:
+                return
+            if wait > 0.05:
+                break
+            await asyncio.sleep(wait)
+        raise BudgetExhaustedError(wait)
@@ -0,0 +1,206 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+# İsteğin mutlak son zamanı (time.monotonic cinsinden); upstream çağrıları bunu aşamaz.
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("ai_deadline", default=None)
+
+
+def set_deadline(seconds: float) -> None:
+    """
+    Geçerli istek için süre bütçesi belirler. Daha önce daha sıkı bir son zaman
+    belirlenmişse o korunur.
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is None or deadline < current:
+        _deadline.set(deadline)
+
+
+def remaining(default: float) -> float:
+    """
+    Varsayılan zaman aşımı ile isteğin kalan süresinden küçük olanı döndürür.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    return min(default, deadline - time.monotonic())
+
+
+def deadline_left() -> float | None:
+    """
+    İsteğin kalan süresi; istemci bir süre bütçesi göndermediyse None.
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+async def without_deadline(fn: Callable[[], Awaitable[T]]) -> T:
+    """
+    fn'i isteğin süre bütçesi olmadan (yalnızca sunucunun kendi zaman aşımıyla) çalıştırır.
+    Birden çok çağıranın paylaştığı işler tek bir çağıranın son zamanına bağlanmasın diye.
+    """
+    token = _deadline.set(None)
+    try:
+        return await fn()
+    finally:
+        _deadline.reset(token)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class LatencyTracker:
+    """
+    Son window adet başarılı çağrının gecikmesini tutar ve yüzdelik değerleri hesaplar.
+    """
+
+    def __init__(self, window: int):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, round(p / 100 * len(samples)) - 1))
+        return samples[index]
+
+    def snapshot(self) -> dict:
+        return {
+            "samples": len(self._samples),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class CircuitBreaker:
+    """
+    Son window çağrıdaki hata oranı eşiği aşınca devreyi açar ve open_seconds boyunca
+    çağrıları hemen reddeder. Süre dolunca tek bir deneme çağrısına izin verilir
+    (half-open); başarılı olursa devre kapanır, başarısız olursa yeniden açılır.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window: int, error_threshold: float, min_requests: int, open_seconds: float):
+        self.error_threshold = error_threshold
+        self.min_requests = min_requests
+        self.open_seconds = open_seconds
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_requests and failures / len(self._outcomes) >= self.error_threshold:
+                self._open()
+
+    def release(self) -> None:
+        """
+        Sonucu bilinmeden iptal edilen çağrılar için; half-open deneme hakkını geri verir.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self.times_opened += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = len(self._outcomes)
+            return {
+                "state": self._current_state(),
+                "error_rate": self._outcomes.count(False) / total if total else 0.0,
+                "window_calls": total,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+            }
+
+
+async def hedged(attempt: Callable[[], Awaitable[T]], hedge_delay: float | None,
+                 on_hedge: Callable[[], None] | None = None) -> T:
+    """
+    attempt'i çalıştırır; hedge_delay içinde yanıt gelmezse ikinci bir deneme başlatır
+    ve ilk başarılı olan sonucu döndürür. Geride kalan deneme iptal edilir.
+    """
+    tasks = [asyncio.ensure_future(attempt())]
+    try:
+        if hedge_delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                tasks.append(asyncio.ensure_future(attempt()))
+                if on_hedge is not None:
+                    on_hedge()
+
+        pending = set(tasks)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,161 @@
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+import models
+from services.turkish_text import tokenize
+
+# Sınav başına tek bir arama belgesi tutulur. Tüm alanlar services.turkish_text ile
+# normalize edilerek yazılır; sorgular da aynı normalizasyondan geçtiği için
+# "İşletim", "ISLETIM" ve "işletim" aynı belgeyi bulur.
+#
+# PostgreSQL: ağırlıklı tsvector (STORED generated column) + GIN index, ts_rank ile sıralama.
+# SQLite:     FTS5 sanal tablosu, alan ağırlıklı bm25 ile sıralama.
+
+_POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS exam_search (
+        exam_id INTEGER PRIMARY KEY REFERENCES exams(id) ON DELETE CASCADE,
+        title TEXT NOT NULL DEFAULT '',
+        course_name TEXT NOT NULL DEFAULT '',
+        description TEXT NOT NULL DEFAULT '',
+        questions TEXT NOT NULL DEFAULT '',
+        tsv tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', title), 'A') ||
+            setweight(to_tsvector('simple', course_name), 'A') ||
+            setweight(to_tsvector('simple', description), 'C') ||
+            setweight(to_tsvector('simple', questions), 'D')
+        ) STORED
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_exam_search_tsv ON exam_search USING GIN (tsv)",
+]
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS exam_search USING fts5(
+        title, course_name, description, questions,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+]
+
+# bm25 ağırlıkları: title, course_name, description, questions
+_SQLITE_WEIGHTS = "10.0, 8.0, 2.0, 1.0"
+
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+
+def is_supported(bind) -> bool:
+    return _dialect(bind) in ("postgresql", "sqlite")
+
+
+def ensure_search_index(conn: Connection) -> None:
+    """
+    Arama tablosunu ve index'ini oluşturur; tablo boşsa mevcut arşivi dizinler.
+    Arşiv boyutunda çalıştığı için uygulama açılışında değil, şema geçişi olarak
+    (migrations.py, advisory lock altında) bir kez çalışır. Commit çağırana aittir.
+    """
+    dialect = _dialect(conn)
+    if dialect == "postgresql":
+        statements = _POSTGRES_DDL
+    elif dialect == "sqlite":
+        statements = _SQLITE_DDL
+    else:
+        print(f"Tam metin arama bu veritabanında desteklenmiyor: {dialect}")
+        return
+
+    for statement in statements:
+        conn.execute(text(statement))
+
+    indexed = conn.execute(text("SELECT COUNT(*) FROM exam_search")).scalar()
+    if not indexed and conn.execute(select(models.Exam.id).limit(1)).first() is not None:
+        # Oturum bağlantının transaction'ına katılır; commit etmez
+        with Session(bind=conn) as db:
+            rebuild(db)
+            db.flush()
+
+
+def index_exam(db: Session, exam_id: int) -> None:
+    """
+    Bir sınavın arama belgesini yeniden yazar. Çağıranın transaction'ı içinde
+    çalışır; commit çağırana aittir.
+    """
+    if not is_supported(db.get_bind()):
+        return
+    db.flush()
+    exam = db.get(models.Exam, exam_id)
+    remove_exam(db, exam_id)
+    if exam is None:
+        return
+    question_texts = [
+        row.question_text
+        for row in db.query(models.Question.question_text).filter(models.Question.exam_id == exam_id)
+    ]
+    db.execute(
+        text(
+            "INSERT INTO exam_search (%s, title, course_name, description, questions) "
+            "VALUES (:exam_id, :title, :course_name, :description, :questions)" % _id_column(db)
+        ),
+        {
+            "exam_id": exam_id,
+            "title": _normalize(exam.title),
+            "course_name": _normalize(exam.course_name),
+            "description": _normalize(exam.description),
+            "questions": " ".join(_normalize(question_text) for question_text in question_texts),
+        },
+    )
+
+
+def remove_exam(db: Session, exam_id: int) -> None:
+    if not is_supported(db.get_bind()):
+        return
+    db.execute(text("DELETE FROM exam_search WHERE %s = :exam_id" % _id_column(db)), {"exam_id": exam_id})
+
+
+def rebuild(db: Session) -> int:
+    exam_ids = [row.id for row in db.query(models.Exam.id)]
+    for exam_id in exam_ids:
+        index_exam(db, exam_id)
+    return len(exam_ids)
+
+
+def search(db: Session, query: str, limit: int = 20, offset: int = 0) -> list[tuple[int, float]]:
+    """
+    Sorguyla eşleşen sınavları alaka sırasına göre (exam_id, skor) olarak döndürür.
+    Her kelime önek olarak eşleşir ve tüm kelimeler geçmelidir. Skor büyük olan daha alakalıdır.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    params = {"limit": limit, "offset": offset}
+    dialect = _dialect(db.get_bind())
+    if dialect == "postgresql":
+        # Token'lar normalize edildiği için sadece [0-9a-z] içerir; tsquery sözdizimine güvenle eklenir.
+        params["query"] = " & ".join(f"{token}:*" for token in tokens)
+        rows = db.execute(text(
+            "SELECT exam_id, ts_rank(tsv, q) AS score "
+            "FROM exam_search, to_tsquery('simple', :query) AS q "
+            "WHERE tsv @@ q ORDER BY score DESC, exam_id DESC LIMIT :limit OFFSET :offset"
+        ), params)
+    elif dialect == "sqlite":
+        params["query"] = " ".join(f'"{token}"*' for token in tokens)
+        rows = db.execute(text(
+            f"SELECT rowid AS exam_id, -bm25(exam_search, {_SQLITE_WEIGHTS}) AS score "
+            "FROM exam_search WHERE exam_search MATCH :query "
+            "ORDER BY score DESC, rowid DESC LIMIT :limit OFFSET :offset"
+        ), params)
+    else:
+        raise NotImplementedError(f"Tam metin arama bu veritabanında desteklenmiyor: {dialect}")
+    return [(row.exam_id, float(row.score)) for row in rows]
+
+
+def _id_column(db: Session) -> str:
+    # FTS5 tablolarında sınav kimliği rowid olarak saklanır
+    return "rowid" if _dialect(db.get_bind()) == "sqlite" else "exam_id"
+
+
+def _normalize(value: str | None) -> str:
+    return " ".join(tokenize(value))
@@ -0,0 +1,107 @@
+import asyncio
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    pass
+
+
+class SingleFlight:
+    """
+    Aynı anahtar için eşzamanlı gelen çağrıları tek bir çağrıda birleştirir.
+    İlk gelen çağıran (lider) işi çalıştırır; diğerleri aynı sonucu bekler ve
+    sonucun ya da hatanın bir kopyasını alır. Paylaşılan durum thread-safe bir
+    concurrent.futures.Future olduğu için hem sync hem async çağıranlarla çalışır.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join(self, key: str) -> tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def _finish(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        future, is_leader = self._join(key)
+        if not is_leader:
+            try:
+                # shield: bekleyen bir takipçinin iptali liderin işini iptal etmemeli
+                return _copy_result(await asyncio.shield(asyncio.wrap_future(future)))
+            except _LeaderCancelled:
+                return await self.do(key, fn)
+            except Exception as e:
+                raise _copy_error(e)
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key, future)
+
+    def do_sync(self, key: str, fn: Callable[[], T]) -> T:
+        future, is_leader = self._join(key)
+        if not is_leader:
+            try:
+                return _copy_result(future.result())
+            except _LeaderCancelled:
+                return self.do_sync(key, fn)
+            except Exception as e:
+                raise _copy_error(e)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key, future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+            }
+
+
+def _copy_result(result: T) -> T:
+    return copy.deepcopy(result)
+
+
+def _copy_error(error: Exception) -> Exception:
+    try:
+        return copy.copy(error)
+    except Exception:
+        return error
@@ -0,0 +1,687 @@
+import asyncio
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass, replace
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import case, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from config import settings
+from database import SessionLocal
+
+# Kişisel çalışma önerileri için kullanıcı × soru sonuç matrisi. Matris CSR düzeninde
+# tutulur: kullanıcı satırının (soru indeksi, deneme, doğru) girdileri indptr[u]:indptr[u+1]
+# aralığındadır. Zorluk, zayıflık ve öneriler Python döngüsü olmadan NumPy işlemleriyle
+# hesaplanır. Yeni cevaplar attempt_answers.id imleciyle artımlı okunup küçük bir ek
+# (delta) listesine eklenir; delta analytics_compact_threshold'u aşınca CSR ile birleştirilir
+# ve anlık görüntü diske yazılır. Diğer süreçler açılışta görüntüyü memory-map ile yükler.
+# Görüntü, üretildiği veritabanının kimliğini taşır; başka bir veritabanına aitse ya da
+# imleci veritabanının gerisinde kalmışsa kullanılmaz. İmleçle okumada atlanabilen
+# satırlar (id sırasıyla commit edilmeyen eşzamanlı yazımlar) analytics_rebuild_interval_seconds
+# aralıklarla yapılan tam kurulumla telafi edilir.
+
+_FORMAT_VERSION = 1
+_ARRAYS = (
+    "user_ids", "question_ids", "question_exam", "question_course",
+    "indptr", "indices", "tries", "correct",
+)
+_CURRENT = "CURRENT"
+_REFRESH_BATCH = 50_000
+# Daha önce yanlış cevaplanan sorular önerilerde öne çıkar
+_RETRY_BOOST = 1.5
+
+
+class _IdIndex:
+    """
+    Veritabanı id'lerini matris indekslerine eşler. id'ler indeks sırasında tutulur;
+    arama, sıralı kopya üzerinde searchsorted ile topluca yapılır.
+    """
+
+    def __init__(self, ids: np.ndarray):
+        self.ids = ids
+        self._order = np.argsort(ids, kind="stable")
+        self._sorted = ids[self._order]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def lookup(self, values: np.ndarray) -> np.ndarray:
+        """
+        Her id'nin indeksini döndürür; bilinmeyenler için -1.
+        """
+        values = np.asarray(values, dtype=np.int64)
+        if not len(self._sorted):
+            return np.full(len(values), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self._sorted, values), len(self._sorted) - 1)
+        return np.where(self._sorted[pos] == values, self._order[pos], -1)
+
+    def extended(self, values: np.ndarray) -> "_IdIndex":
+        """
+        Bilinmeyen id'ler sona eklenmiş yeni bir indeks döndürür (mevcut indeksler değişmez).
+        """
+        values = np.asarray(values, dtype=np.int64)
+        missing = np.unique(values[self.lookup(values) < 0])
+        if not len(missing):
+            return self
+        return _IdIndex(np.concatenate([self.ids, missing]))
+
+
+def _merge_coo(n_rows: int, n_cols: int, rows, cols, tries, correct, presorted: bool = False):
+    """
+    (satır, sütun) girdilerini sıralayıp tekrarlananları toplar ve CSR dizilerini döndürür.
+    presorted: girdilerin büyük kısmı zaten sıralı (CSR + delta); kararlı sıralama
+    (timsort) sıralı parçaları birleştirerek çalıştığı için çok daha hızlıdır.
+    """
+    key = rows * max(n_cols, 1) + cols
+    order = np.argsort(key, kind="stable" if presorted else "quicksort")
+    key, rows, cols, tries, correct = key[order], rows[order], cols[order], tries[order], correct[order]
+    if len(key):
+        boundary = np.empty(len(key), dtype=bool)
+        boundary[0] = True
+        np.not_equal(key[1:], key[:-1], out=boundary[1:])
+        starts = np.flatnonzero(boundary)
+        rows, cols = rows[starts], cols[starts]
+        tries = np.add.reduceat(tries, starts)
+        correct = np.add.reduceat(correct, starts)
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, cols.astype(np.int32), tries.astype(np.int32), correct.astype(np.int32)
+
+
+@dataclass
+class _State:
+    """
+    Matrisin bir sürümü. Okuyucular referansı alıp kilitsiz kullanır; güncellemeler
+    değiştirilmiş yeni bir _State kurar (diziler yerinde değiştirilmez).
+    """
+    users: _IdIndex
+    questions: _IdIndex
+    question_exam: np.ndarray
+    question_course: np.ndarray
+    courses: list
+    # Birleştirilmiş CSR (memory-map olabilir)
+    indptr: np.ndarray
+    indices: np.ndarray
+    tries: np.ndarray
+    correct: np.ndarray
+    # Henüz CSR'ye katılmamış yeni cevaplar (COO)
+    delta_rows: np.ndarray
+    delta_cols: np.ndarray
+    delta_tries: np.ndarray
+    delta_correct: np.ndarray
+    # Soru bazında toplamlar (CSR + delta)
+    question_tries: np.ndarray
+    question_correct: np.ndarray
+    cursor: int
+    max_question_id: int
+    # Matrisin türediği son tam kurulumun zamanı
+    rebuilt_at: float = 0.0
+    rates: tuple | None = None
+
+
+def _empty(dtype) -> np.ndarray:
+    return np.zeros(0, dtype=dtype)
+
+
+def database_identity(db: Session) -> str:
+    """
+    Veritabanının kalıcı kimliğini döndürür; yoksa oluşturur.
+    """
+    row = db.get(models.DatabaseIdentity, "instance")
+    if row is None:
+        db.add(models.DatabaseIdentity(key="instance", value=uuid.uuid4().hex))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Başka bir süreç aynı anda oluşturdu
+            db.rollback()
+        row = db.get(models.DatabaseIdentity, "instance")
+    return row.value
+
+
+class StudyAnalytics:
+    def __init__(self, snapshot_dir: str, smoothing: float, compact_threshold: int, refresh_interval: float,
+                 rebuild_interval: float = float("inf")):
+        self.snapshot_dir = snapshot_dir
+        self.smoothing = smoothing
+        self.compact_threshold = compact_threshold
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        # Görüntülere yazılan veritabanı kimliği (bkz. database_identity)
+        self.identity: str | None = None
+        self._state: _State | None = None
+        # Yalnızca yazanlar (refresh, compact, save) sıraya girer; okuyucular kilit almaz
+        self._write_lock = threading.RLock()
+        self._task: asyncio.Task | None = None
+        self.loaded_from: str | None = None
+        self.refreshes = 0
+        self.compactions = 0
+        self.failures = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._state is not None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    # --- Kurulum ---
+
+    def build(self, user_ids, question_ids, question_exam, question_course, courses: list,
+              rows, cols, tries, correct, cursor: int = 0, rebuilt_at: float | None = None) -> None:
+        """
+        COO girdilerinden (satır = user_ids indeksi, sütun = question_ids indeksi) matrisi kurar.
+        """
+        users = _IdIndex(np.asarray(user_ids, dtype=np.int64))
+        questions = _IdIndex(np.asarray(question_ids, dtype=np.int64))
+        indptr, indices, tries, correct = _merge_coo(
+            len(users), len(questions), np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64),
+            np.asarray(tries, dtype=np.int32), np.asarray(correct, dtype=np.int32),
+        )
+        self._install(users, questions, np.asarray(question_exam, dtype=np.int64),
+                      np.asarray(question_course, dtype=np.int32), list(courses),
+                      indptr, indices, tries, correct, cursor,
+                      time.time() if rebuilt_at is None else rebuilt_at)
+
+    def _install(self, users, questions, question_exam, question_course, courses,
+                 indptr, indices, tries, correct, cursor, rebuilt_at) -> None:
+        n_questions = len(questions)
+        self._state = _State(
+            users=users, questions=questions, question_exam=question_exam,
+            question_course=question_course, courses=courses,
+            indptr=indptr, indices=indices, tries=tries, correct=correct,
+            delta_rows=_empty(np.int64), delta_cols=_empty(np.int64),
+            delta_tries=_empty(np.int32), delta_correct=_empty(np.int32),
+            question_tries=np.bincount(indices, weights=tries, minlength=n_questions),
+            question_correct=np.bincount(indices, weights=correct, minlength=n_questions),
+            cursor=cursor,
+            max_question_id=int(questions.ids.max()) if n_questions else 0,
+            rebuilt_at=rebuilt_at,
+        )
+
+    def rebuild(self, db: Session) -> None:
+        """
+        Matrisi veritabanından baştan kurar; cevaplar SQL'de (kullanıcı, soru) bazında toplanır.
+        """
+        started = time.time()
+        cursor = db.scalar(select(func.max(models.AttemptAnswer.id))) or 0
+        question_rows = db.execute(
+            select(models.Question.id, models.Question.exam_id, models.Exam.course_name)
+            .join(models.Exam, models.Exam.id == models.Question.exam_id)
+            .order_by(models.Question.id)
+        ).all()
+        course_index: dict = {}
+        question_course = np.fromiter(
+            (course_index.setdefault(name, len(course_index)) for _, _, name in question_rows),
+            dtype=np.int32, count=len(question_rows),
+        )
+        courses = list(course_index)
+        question_ids = np.fromiter((row[0] for row in question_rows), dtype=np.int64, count=len(question_rows))
+        question_exam = np.fromiter((row[1] for row in question_rows), dtype=np.int64, count=len(question_rows))
+
+        # Kullanıcı bazında gruplanmış toplamlar; bellekte yalnızca NumPy parçaları tutulur
+        result = db.execute(
+            select(
+                models.AttemptAnswer.user_id,
+                models.AttemptAnswer.question_id,
+                func.count(),
+                func.sum(case((models.AttemptAnswer.is_correct, 1), else_=0)),
+            )
+            .where(models.AttemptAnswer.id <= cursor)
+            .group_by(models.AttemptAnswer.user_id, models.AttemptAnswer.question_id)
+            .execution_options(yield_per=_REFRESH_BATCH)
+        )
+        parts = [np.array(part, dtype=np.int64).reshape(-1, 4) for part in result.partitions()]
+        data = np.concatenate(parts) if parts else np.zeros((0, 4), dtype=np.int64)
+
+        users = np.unique(data[:, 0])
+        questions = _IdIndex(question_ids)
+        cols = questions.lookup(data[:, 1])
+        known = cols >= 0
+        rows = np.searchsorted(users, data[known, 0])
+        self.build(users, question_ids, question_exam, question_course, courses,
+                   rows, cols[known], data[known, 2], data[known, 3], cursor=cursor, rebuilt_at=started)
+
+    # --- Artımlı güncelleme ---
+
+    def add_questions(self, question_ids, exam_ids, course_names) -> None:
+        with self._write_lock:
+            state = self._state
+            question_ids = np.asarray(question_ids, dtype=np.int64)
+            new = state.questions.lookup(question_ids) < 0
+            if not new.any():
+                return
+            courses = list(state.courses)
+            course_index = {name: i for i, name in enumerate(courses)}
+            new_courses = np.fromiter(
+                (course_index.setdefault(name, len(course_index))
+                 for name, is_new in zip(course_names, new) if is_new),
+                dtype=np.int32,
+            )
+            courses = list(course_index)
+            added = int(new.sum())
+            self._state = replace(
+                state,
+                questions=_IdIndex(np.concatenate([state.questions.ids, question_ids[new]])),
+                question_exam=np.concatenate([state.question_exam, np.asarray(exam_ids, dtype=np.int64)[new]]),
+                question_course=np.concatenate([state.question_course, new_courses]),
+                courses=courses,
+                question_tries=np.concatenate([state.question_tries, np.zeros(added)]),
+                question_correct=np.concatenate([state.question_correct, np.zeros(added)]),
+                max_question_id=max(state.max_question_id, int(question_ids.max())),
+                rates=None,
+            )
+
+    def apply_answers(self, user_ids, question_ids, is_correct, cursor: int | None = None) -> int:
+        """
+        Yeni cevapları deltaya ekler; bilinmeyen sorulara ait cevaplar atlanır.
+        Eklenen cevap sayısını döndürür.
+        """
+        with self._write_lock:
+            state = self._state
+            user_ids = np.asarray(user_ids, dtype=np.int64)
+            cols = state.questions.lookup(question_ids)
+            known = cols >= 0
+            user_ids, cols = user_ids[known], cols[known]
+            correct = np.asarray(is_correct, dtype=np.int32)[known]
+
+            users = state.users.extended(user_ids)
+            rows = users.lookup(user_ids)
+            n_questions = len(state.questions)
+            # Delta satıra göre sıralı tutulur; kullanıcı girdileri searchsorted ile bulunur
+            delta_rows = np.concatenate([state.delta_rows, rows])
+            order = np.argsort(delta_rows, kind="stable")
+            self._state = replace(
+                state,
+                users=users,
+                delta_rows=delta_rows[order],
+                delta_cols=np.concatenate([state.delta_cols, cols])[order],
+                delta_tries=np.concatenate([state.delta_tries, np.ones(len(cols), dtype=np.int32)])[order],
+                delta_correct=np.concatenate([state.delta_correct, correct])[order],
+                question_tries=state.question_tries + np.bincount(cols, minlength=n_questions),
+                question_correct=state.question_correct + np.bincount(cols, weights=correct, minlength=n_questions),
+                cursor=state.cursor if cursor is None else max(state.cursor, cursor),
+                rates=None,
+            )
+            return len(cols)
+
+    def compact(self) -> None:
+        """
+        Deltayı CSR ile birleştirir. Okuyucular bu sırada eski sürümü kullanmaya devam eder.
+        """
+        with self._write_lock:
+            state = self._state
+            if not len(state.delta_rows):
+                return
+            base_rows = np.repeat(np.arange(len(state.indptr) - 1, dtype=np.int64), np.diff(state.indptr))
+            indptr, indices, tries, correct = _merge_coo(
+                len(state.users), len(state.questions),
+                np.concatenate([base_rows, state.delta_rows]),
+                np.concatenate([np.asarray(state.indices, dtype=np.int64), state.delta_cols]),
+                np.concatenate([state.tries, state.delta_tries]),
+                np.concatenate([state.correct, state.delta_correct]),
+                presorted=True,
+            )
+            self._state = replace(
+                state, indptr=indptr, indices=indices, tries=tries, correct=correct,
+                delta_rows=_empty(np.int64), delta_cols=_empty(np.int64),
+                delta_tries=_empty(np.int32), delta_correct=_empty(np.int32),
+            )
+            self.compactions += 1
+
+    def refresh(self, db: Session) -> int:
+        """
+        Son imleçten sonra eklenen soruları ve cevapları okur; okunan cevap sayısını döndürür.
+        Not: id'ler commit sırasıyla verilmediği için eşzamanlı yazımlarda imlecin
+        gerisinde commit edilen cevaplar atlanabilir; bunlar periyodik tam kurulumda
+        (bkz. reconcile) sayılır.
+        """
+        with self._write_lock:
+            self._add_questions_where(db, models.Question.id > self._state.max_question_id)
+
+            total = 0
+            while True:
+                rows = db.execute(
+                    select(
+                        models.AttemptAnswer.id,
+                        models.AttemptAnswer.user_id,
+                        models.AttemptAnswer.question_id,
+                        models.AttemptAnswer.is_correct,
+                    )
+                    .where(models.AttemptAnswer.id > self._state.cursor)
+                    .order_by(models.AttemptAnswer.id)
+                    .limit(_REFRESH_BATCH)
+                ).all()
+                if not rows:
+                    break
+                data = np.array(rows, dtype=np.int64)
+                # Son okumadan sonra, daha küçük id ile commit edilmiş sorular
+                unknown = np.unique(data[self._state.questions.lookup(data[:, 2]) < 0, 2])
+                if len(unknown):
+                    self._add_questions_where(db, models.Question.id.in_(unknown.tolist()))
+                self.apply_answers(data[:, 1], data[:, 2], data[:, 3], cursor=int(data[-1, 0]))
+                total += len(rows)
+                if len(rows) < _REFRESH_BATCH:
+                    break
+
+            if len(self._state.delta_rows) >= self.compact_threshold:
+                self.save()
+            self.refreshes += 1
+            return total
+
+    def _add_questions_where(self, db: Session, condition) -> None:
+        rows = db.execute(
+            select(models.Question.id, models.Question.exam_id, models.Exam.course_name)
+            .join(models.Exam, models.Exam.id == models.Question.exam_id)
+            .where(condition)
+            .order_by(models.Question.id)
+        ).all()
+        if rows:
+            self.add_questions(*zip(*rows))
+
+    def reconcile(self, db: Session) -> None:
+        """
+        Matris rebuild_interval'den eskiyse yeniler: başka bir sürecin daha yeni bir tam
+        kurulumdan yazdığı görüntü varsa onu yükler, yoksa baştan kurup kaydeder.
+        """
+        with self._write_lock:
+            state = self._state
+            if state is not None and time.time() - state.rebuilt_at < self.rebuild_interval:
+                return
+            self.identity = database_identity(db)
+            max_answer_id = db.scalar(select(func.max(models.AttemptAnswer.id))) or 0
+            newer_than = state.rebuilt_at if state is not None else None
+            if not self.load(self.identity, max_answer_id, newer_than=newer_than) \
+                    or time.time() - self._state.rebuilt_at >= self.rebuild_interval:
+                self.rebuild(db)
+                self.save()
+
+    # --- Disk ---
+
+    def save(self) -> str:
+        """
+        Deltayı birleştirip görüntüyü yeni bir klasöre yazar ve CURRENT'i atomik olarak
+        ona çevirir; ardından kendisi de görüntüyü memory-map ile kullanır.
+        """
+        with self._write_lock:
+            self.compact()
+            state = self._state
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            name = f"snapshot-{state.cursor}-{os.getpid()}-{time.time_ns()}"
+            tmp = os.path.join(self.snapshot_dir, f".{name}.tmp")
+            os.makedirs(tmp)
+            arrays = {
+                "user_ids": state.users.ids, "question_ids": state.questions.ids,
+                "question_exam": state.question_exam, "question_course": state.question_course,
+                "indptr": state.indptr, "indices": state.indices,
+                "tries": state.tries, "correct": state.correct,
+            }
+            for key, array in arrays.items():
+                np.save(os.path.join(tmp, f"{key}.npy"), np.ascontiguousarray(array))
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"format": _FORMAT_VERSION, "identity": self.identity, "cursor": state.cursor,
+                           "courses": state.courses, "rebuilt_at": state.rebuilt_at,
+                           "created_at": time.time()}, f, ensure_ascii=False)
+            path = os.path.join(self.snapshot_dir, name)
+            os.replace(tmp, path)
+
+            pointer = os.path.join(self.snapshot_dir, _CURRENT)
+            with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+                f.write(name)
+            os.replace(pointer + ".tmp", pointer)
+            self._prune(keep={name})
+            self.load(self.identity)
+            return path
+
+    def _prune(self, keep: set[str]) -> None:
+        # Bir önceki görüntü, onu henüz map etmiş süreçler için bırakılır
+        snapshots = sorted(
+            (entry for entry in os.scandir(self.snapshot_dir)
+             if entry.is_dir() and entry.name.startswith("snapshot-") and entry.name not in keep),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in snapshots[:-1]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    def load(self, identity: str | None = None, max_answer_id: int | None = None,
+             newer_than: float | None = None) -> bool:
+        """
+        CURRENT'in gösterdiği görüntüyü memory-map ile yükler. Görüntü yoksa, başka bir
+        veritabanına aitse (identity), imleci veritabanındaki son cevabın ilerisindeyse
+        (max_answer_id) ya da newer_than'dan yeni bir tam kurulumdan gelmiyorsa False.
+        """
+        pointer = os.path.join(self.snapshot_dir, _CURRENT)
+        try:
+            with open(pointer, encoding="utf-8") as f:
+                path = os.path.join(self.snapshot_dir, f.read().strip())
+            with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if meta.get("format") != _FORMAT_VERSION:
+            return False
+        if identity is not None and meta.get("identity") != identity:
+            return False
+        if max_answer_id is not None and meta["cursor"] > max_answer_id:
+            return False
+        if newer_than is not None and meta.get("rebuilt_at", 0.0) <= newer_than:
+            return False
+        arrays = {key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r") for key in _ARRAYS}
+        with self._write_lock:
+            self._install(
+                _IdIndex(arrays["user_ids"]), _IdIndex(arrays["question_ids"]),
+                arrays["question_exam"], arrays["question_course"], meta["courses"],
+                arrays["indptr"], arrays["indices"], arrays["tries"], arrays["correct"], meta["cursor"],
+                meta.get("rebuilt_at", 0.0),
+            )
+            self.identity = meta.get("identity")
+        self.loaded_from = path
+        return True
+
+    # --- Hesaplamalar ---
+
+    def _require(self) -> _State:
+        state = self._state
+        if state is None:
+            raise HTTPException(status_code=503, detail="Analiz verisi henüz hazır değil.")
+        return state
+
+    def _rates(self, state: _State) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (soru başarı oranı, ders başarı oranı, ders deneme, ders doğru). Az denenmiş
+        sorular dersin, az denenmiş dersler genelin oranına doğru çekilir.
+        """
+        if state.rates is None:
+            k = self.smoothing
+            n_courses = len(state.courses)
+            course_tries = np.bincount(state.question_course, weights=state.question_tries, minlength=n_courses)
+            course_correct = np.bincount(state.question_course, weights=state.question_correct, minlength=n_courses)
+            overall = (state.question_correct.sum() + 1) / (state.question_tries.sum() + 2)
+            course_rate = (course_correct + k * overall) / (course_tries + k)
+            success = (state.question_correct + k * course_rate[state.question_course]) / (state.question_tries + k)
+            # Aynı sürüm için eşzamanlı hesaplanırsa sonuç aynıdır
+            state.rates = (success, course_rate, course_tries, course_correct)
+        return state.rates
+
+    @staticmethod
+    def _ranges(starts: np.ndarray, ends: np.ndarray, owners: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        [start, end) aralıklarının tüm konumlarını ve her konumun sahibini döndürür.
+        """
+        lengths = ends - starts
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return np.repeat(owners, lengths), np.repeat(starts, lengths) + offsets
+
+    @classmethod
+    def _entries(cls, state: _State, rows: np.ndarray):
+        """
+        rows'daki (tekrarsız) kullanıcıların tüm girdileri: (rows içindeki konum, soru, deneme, doğru).
+        """
+        n_base = len(state.indptr) - 1
+        in_base = np.flatnonzero((rows >= 0) & (rows < n_base))
+        owner, positions = cls._ranges(
+            np.asarray(state.indptr[rows[in_base]]), np.asarray(state.indptr[rows[in_base] + 1]), in_base)
+        delta_owner, delta_positions = cls._ranges(
+            np.searchsorted(state.delta_rows, rows, side="left"),
+            np.searchsorted(state.delta_rows, rows, side="right"),
+            np.arange(len(rows)),
+        )
+        return (
+            np.concatenate([owner, delta_owner]),
+            np.concatenate([np.asarray(state.indices[positions], dtype=np.int64), state.delta_cols[delta_positions]]),
+            np.concatenate([np.asarray(state.tries[positions]), state.delta_tries[delta_positions]]),
+            np.concatenate([np.asarray(state.correct[positions]), state.delta_correct[delta_positions]]),
+        )
+
+    def weaknesses(self, user_ids) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Kullanıcı × ders matrisleri: (zayıflık, deneme, doğru, beklenen doğru).
+        Zayıflık, kullanıcının derste sorularının zorluğuna göre beklenenden ne kadar az
+        doğru yaptığıdır (deneme başına, az denemede sıfıra çekilir); pozitif = zayıf.
+        """
+        state = self._require()
+        success, _, _, _ = self._rates(state)
+        rows = state.users.lookup(np.atleast_1d(user_ids))
+        owner, cols, tries, correct = self._entries(state, rows)
+        n_courses = len(state.courses)
+        flat = owner * n_courses + state.question_course[cols]
+        size = len(rows) * n_courses
+        attempted = np.bincount(flat, weights=tries, minlength=size).reshape(len(rows), n_courses)
+        got = np.bincount(flat, weights=correct, minlength=size).reshape(len(rows), n_courses)
+        expected = np.bincount(flat, weights=tries * success[cols], minlength=size).reshape(len(rows), n_courses)
+        weakness = (expected - got) / (attempted + self.smoothing)
+        return weakness, attempted, got, expected
+
+    def user_report(self, user_id: int, limit: int = 10) -> dict:
+        state = self._require()
+        success, _, _, _ = self._rates(state)
+        weakness, attempted, got, expected = (m[0] for m in self.weaknesses([user_id]))
+
+        seen = np.flatnonzero(attempted)
+        seen = seen[np.argsort(-weakness[seen], kind="stable")]
+        courses = [{
+            "course_name": state.courses[c],
+            "weakness": round(float(weakness[c]), 4),
+            "attempted": int(attempted[c]),
+            "correct": int(got[c]),
+            "expected_correct": round(float(expected[c]), 2),
+        } for c in seen]
+        return {"user_id": user_id, "courses": courses,
+                "recommendations": self._recommend(state, user_id, success, weakness, attempted, got, limit)}
+
+    def _recommend(self, state: _State, user_id: int, success, weakness, attempted, got, limit: int) -> list[dict]:
+        """
+        Zayıf derslerden, kullanıcının seviyesine yakın zorluktaki henüz doğru
+        yapılmamış soruları önerir; daha önce yanlış yapılanlar öne çıkar.
+        """
+        weak = np.where(attempted > 0, np.maximum(weakness, 0), 0)
+        if limit <= 0 or not weak.any():
+            return []
+        rows = state.users.lookup([user_id])
+        _, cols, tries, correct = self._entries(state, rows)
+        difficulty = 1 - success
+        target = 1 - got.sum() / attempted.sum()
+
+        score = weak[state.question_course] * (1 - np.abs(difficulty - target))
+        score[cols[correct == 0]] *= _RETRY_BOOST
+        score[cols[correct > 0]] = 0
+        candidates = np.flatnonzero(score > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-score[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-score[candidates], kind="stable")]
+        retried = set(cols[correct == 0].tolist())
+        return [{
+            "question_id": int(state.questions.ids[q]),
+            "exam_id": int(state.question_exam[q]),
+            "course_name": state.courses[state.question_course[q]],
+            "difficulty": round(float(difficulty[q]), 4),
+            "retry": int(q) in retried,
+        } for q in candidates]
+
+    def course_difficulty(self) -> list[dict]:
+        state = self._require()
+        _, course_rate, course_tries, course_correct = self._rates(state)
+        order = np.argsort(course_rate, kind="stable")
+        return [{
+            "course_name": state.courses[c],
+            "difficulty": round(float(1 - course_rate[c]), 4),
+            "attempted": int(course_tries[c]),
+            "correct": int(course_correct[c]),
+        } for c in order]
+
+    def exam_difficulty(self, exam_id: int) -> list[dict]:
+        state = self._require()
+        success, _, _, _ = self._rates(state)
+        questions = np.flatnonzero(np.asarray(state.question_exam) == exam_id)
+        return [{
+            "question_id": int(state.questions.ids[q]),
+            "difficulty": round(float(1 - success[q]), 4),
+            "attempted": int(state.question_tries[q]),
+            "correct": int(state.question_correct[q]),
+        } for q in questions]
+
+    # --- Yaşam döngüsü ---
+
+    def _refresh_once(self) -> None:
+        with SessionLocal() as db:
+            self.reconcile(db)
+            self.refresh(db)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self._refresh_once)
+            except Exception as e:
+                self.failures += 1
+                print(f"Analiz verisi güncellenemedi. Hata: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def stats(self) -> dict:
+        state = self._state
+        if state is None:
+            return {"ready": False, "running": self.running, "failures": self.failures}
+        return {
+            "ready": True,
+            "running": self.running,
+            "users": len(state.users),
+            "questions": len(state.questions),
+            "courses": len(state.courses),
+            "entries": len(state.indices),
+            "pending_entries": len(state.delta_rows),
+            "cursor": state.cursor,
+            "rebuilt_at": state.rebuilt_at,
+            "memory_mapped": isinstance(state.indices, np.memmap),
+            "loaded_from": self.loaded_from,
+            "refreshes": self.refreshes,
+            "compactions": self.compactions,
+            "failures": self.failures,
+        }
+
+
+analytics = StudyAnalytics(
+    snapshot_dir=settings.analytics_snapshot_dir,
+    smoothing=settings.analytics_smoothing,
+    compact_threshold=settings.analytics_compact_threshold,
+    refresh_interval=settings.analytics_refresh_interval_seconds,
+    rebuild_interval=settings.analytics_rebuild_interval_seconds,
+)
@@ -0,0 +1,35 @@
+import re
+import unicodedata
+
+# Türkçe büyük/küçük harf dönüşümü: str.lower() 'I' -> 'i' ve 'İ' -> 'i̇' üretir, ikisi de yanlış.
+_TURKISH_LOWER = str.maketrans({"I": "ı", "İ": "i"})
+
+# Aksan duyarsız eşleşme için Türkçe harfleri ASCII karşılıklarına indirger.
+_ASCII_FOLD = str.maketrans({
+    "ç": "c", "ğ": "g", "ı": "i", "ö": "o", "ş": "s", "ü": "u",
+    "â": "a", "î": "i", "û": "u",
+})
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def turkish_lower(text: str) -> str:
+    return text.translate(_TURKISH_LOWER).lower()
+
+
+def normalize(text: str | None) -> str:
+    """
+    Hem dizinlenen belgeler hem arama sorguları için ortak normalizasyon:
+    Türkçe kurallarıyla küçük harfe çevirir, aksanları kaldırır, harf/rakam dışı
+    karakterleri boşluğa dönüştürür. "İŞLETİM Sistemleri" -> "isletim sistemleri"
+    """
+    if not text:
+        return ""
+    folded = turkish_lower(text).translate(_ASCII_FOLD)
+    decomposed = unicodedata.normalize("NFKD", folded)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", stripped).strip()
+
+
+def tokenize(text: str | None) -> list[str]:
+    return normalize(text).split()
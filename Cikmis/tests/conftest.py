@@ -0,0 +1,170 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# Uygulama modülleri (config, database, main ...) import edilirken ayarları ortamdan
+# okur; testler geçici bir SQLite veritabanı ve yerel AI stub'ı ile çalışır.
+_tmp_dir = tempfile.mkdtemp(prefix="cikmis-tests-")
+for _name, _value in {
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "DATABASE_URL": f"sqlite:///{os.path.join(_tmp_dir, 'test.db')}",
+    "API_KEY": "test",
+    "AI_MODEL": "gemini-test",
+    "AI_BACKEND": "stub",
+    "AI_STUB_LATENCY_MS": "1",
+    "AI_POOL_ENABLED": "false",
+    "BCRYPT_ROUNDS": "4",
+    "ANALYTICS_SNAPSHOT_DIR": os.path.join(_tmp_dir, "analytics_snapshot"),
+}.items():
+    os.environ.setdefault(_name, _value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+
+    return main.app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as client:
+        yield client
+
+
+def clear_caches() -> None:
+    """
+    Süreç içi önbellekleri boşaltır; ardından gelen istek soğuk önbellekle çalışır.
+    """
+    from services import auth_cache
+    from services.academic_tree import academic_tree
+    from services.ai_cache import cache as ai_cache
+    from services.exam_cache import exam_cache
+
+    auth_cache.claims_cache.clear()
+    auth_cache.principal_cache.clear()
+    exam_cache.clear()
+    academic_tree.invalidate()
+    ai_cache.clear_memory()
+
+
+@pytest.fixture
+def query_budget():
+    """
+    services.query_profiler.query_budget'i sarar: with query_budget(n): ... blok içinde
+    n'den fazla sorgu çalışırsa QueryBudgetExceeded fırlatır.
+    """
+    from services.query_profiler import query_budget
+
+    return query_budget
+
+
+def _api_routes(app) -> list:
+    # include_router ile eklenen router'ların route'ları original_router altında durur
+    routes = []
+    for route in app.routes:
+        router = getattr(route, "original_router", None)
+        routes += router.routes if router is not None else [route]
+    return routes
+
+
+class RouteBudgets:
+    """
+    QueryBudget(n) ile işaretlenmiş route'ları soğuk önbellekle çağırır ve işaretteki
+    bütçeyi query_budget ile zorunlu kılar. Çağrılan route'lar kaydedilir; uncovered()
+    bir router'ın henüz çağrılmamış bütçeli route'larını döndürür.
+    """
+
+    def __init__(self, app, client, query_budget):
+        from services.query_profiler import QueryBudget
+
+        self.client = client
+        self.query_budget = query_budget
+        self.budgets = {}
+        for route in _api_routes(app):
+            for dependency in getattr(route, "dependencies", []):
+                if isinstance(dependency.dependency, QueryBudget):
+                    for method in route.methods:
+                        self.budgets[(method, route.path)] = dependency.dependency.max_queries
+        self.covered = set()
+
+    def request(self, method: str, path: str, path_params: dict | None = None, **kwargs):
+        budget = self.budgets[(method, path)]
+        clear_caches()
+        with self.query_budget(budget):
+            response = self.client.request(method, path.format(**(path_params or {})), **kwargs)
+        assert response.status_code < 400, response.text
+        self.covered.add((method, path))
+        return response
+
+    def uncovered(self, prefix: str) -> set:
+        return {key for key in self.budgets if key[1].startswith(prefix)} - self.covered
+
+
+@pytest.fixture
+def route_budgets(app, client, query_budget):
+    return RouteBudgets(app, client, query_budget)
+
+
+def unique(prefix: str = "t") -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:10]}"
+
+
+@pytest.fixture
+def make_user(client):
+    def _make_user() -> dict:
+        name = unique("user")
+        email = f"{name}@example.com"
+        response = client.post("/auth/register", json={"username": name, "email": email, "password": "parola123"})
+        assert response.status_code == 200, response.text
+        response = client.post("/auth/login", data={"username": email, "password": "parola123"})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return _make_user
+
+
+@pytest.fixture
+def auth_headers(make_user):
+    return make_user()
+
+
+@pytest.fixture
+def class_level(client):
+    university = client.post("/academics/universities/", json={"name": unique("Üniversite")}).json()
+    department = client.post("/academics/departments/", json={"name": unique("Bölüm"), "university_id": university["id"]}).json()
+    level = client.post("/academics/class-levels/", json={"level": 2, "department_id": department["id"]}).json()
+    return {"university_id": university["id"], "department_id": department["id"], "class_level_id": level["id"], "level": 2}
+
+
+@pytest.fixture
+def make_exam(client, auth_headers, class_level):
+    def _make_exam(questions: list[dict] | None = None, **fields) -> dict:
+        body = {
+            "title": unique("Vize"),
+            "course_name": "Fizik",
+            "year": 2023,
+            "semester": "Güz",
+            "university_id": class_level["university_id"],
+            "department_id": class_level["department_id"],
+            "class_level_id": class_level["class_level_id"],
+            "questions": questions if questions is not None else [
+                {"question_text": f"{unique('soru')} kuvvet ve ivme ilişkisi", "answer": "A", "options": ["a", "b", "c", "d"]}
+                for _ in range(3)
+            ],
+            **fields,
+        }
+        response = client.post("/exams/", headers=auth_headers, json=body)
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return _make_exam
@@ -0,0 +1,87 @@
+import pytest
+
+from conftest import unique
+from services import attempts
+
+
+@pytest.fixture
+def course(make_exam):
+    # Her test kendi dersini kullanır; ders özetleri başka testlerle karışmasın
+    name = unique("Ders")
+    return name, [make_exam(course_name=name), make_exam(course_name=name)]
+
+
+def _submit(client, headers, exam: dict, answers: list[str], attempt_id: str | None = None) -> dict:
+    body = {
+        "attempt_id": attempt_id,
+        "answers": [{"question_id": q["id"], "answer": answer} for q, answer in zip(exam["questions"], answers)],
+    }
+    response = client.post(f"/attempts/exams/{exam['id']}", headers=headers, json=body)
+    assert response.status_code == 202, response.text
+    return response.json()
+
+
+def _course_stats(client, headers, name: str) -> dict:
+    rows = [row for row in client.get("/attempts/me/courses", headers=headers).json() if row["course_name"] == name]
+    assert len(rows) == 1
+    return rows[0]
+
+
+def _exam_stats(client, headers, exam_id: int) -> dict:
+    rows = [row for row in client.get("/attempts/me/exams", headers=headers).json() if row["exam_id"] == exam_id]
+    assert len(rows) == 1
+    return rows[0]
+
+
+def test_resubmitted_attempt_counts_once(client, auth_headers, course):
+    name, (exam, _) = course
+    attempt_id = unique("kagit")
+
+    first = _submit(client, auth_headers, exam, ["A", "A", "B"], attempt_id)
+    # Bekleyen kâğıdın tekrarı ilk sonucu döndürür
+    assert _submit(client, auth_headers, exam, ["A", "A", "A"], attempt_id) == first
+    attempts.buffer.flush_all()
+    # Yazılmış kâğıdın tekrarı da özetlere ikinci kez eklenmez
+    _submit(client, auth_headers, exam, ["A", "A", "A"], attempt_id)
+    attempts.buffer.flush_all()
+
+    stats = _exam_stats(client, auth_headers, exam["id"])
+    assert (stats["attempts"], stats["correct"], stats["questions"]) == (1, 2, 3)
+    assert _course_stats(client, auth_headers, name)["attempts"] == 1
+
+
+def test_attempt_id_is_scoped_per_user(client, make_user, course):
+    name, (exam, _) = course
+    attempt_id = unique("kagit")
+    users = [make_user(), make_user()]
+
+    for headers in users:
+        _submit(client, headers, exam, ["A", "B", "B"], attempt_id)
+    attempts.buffer.flush_all()
+
+    for headers in users:
+        assert _exam_stats(client, headers, exam["id"])["attempts"] == 1
+        assert _course_stats(client, headers, name)["correct"] == 1
+    exam_stats = client.get(f"/attempts/exams/{exam['id']}/stats", headers=users[0]).json()
+    assert (exam_stats["attempts"], exam_stats["correct"]) == (2, 2)
+
+
+def test_course_rollups_match_submissions(client, auth_headers, course):
+    name, (first_exam, second_exam) = course
+    results = [
+        _submit(client, auth_headers, first_exam, ["A", "A", "A"]),
+        _submit(client, auth_headers, first_exam, ["B", "", "A"]),
+        _submit(client, auth_headers, second_exam, ["A", "B"], unique("kagit")),
+    ]
+    attempts.buffer.flush_all()
+
+    stats = _course_stats(client, auth_headers, name)
+    assert stats["attempts"] == len(results)
+    assert stats["correct"] == sum(result["correct"] for result in results)
+    assert stats["answered"] == sum(result["answered"] for result in results)
+    assert stats["questions"] == sum(result["total"] for result in results)
+    assert stats["success_rate"] == round(stats["correct"] / stats["questions"], 4)
+
+    first = _exam_stats(client, auth_headers, first_exam["id"])
+    assert (first["attempts"], first["correct"], first["best_correct"], first["last_correct"]) == (2, 4, 3, 1)
+    assert _exam_stats(client, auth_headers, second_exam["id"])["correct"] == results[2]["correct"]
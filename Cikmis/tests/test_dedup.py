@@ -0,0 +1,83 @@
+import uuid
+
+import pytest
+
+import crud
+import schemas
+from config import settings
+from database import SessionLocal
+
+
+def _text() -> str:
+    # Başka testlerin sorularıyla ortak ikili üretmeyen rastgele bir soru metni
+    return " ".join(uuid.uuid4().hex[:6] for _ in range(10)) + " hangisidir"
+
+
+def _near(text: str) -> str:
+    return text + " açıklayınız"
+
+
+def _question(text: str) -> dict:
+    return {"question_text": text, "answer": "A", "options": ["a", "b", "c", "d"]}
+
+
+def _upload(client, exam_id: int, texts: list[str]):
+    response = client.post(f"/exams/{exam_id}/upload-questions", json=[_question(text) for text in texts])
+    assert response.status_code == 201, response.text
+    return response
+
+
+@pytest.fixture
+def archived(make_exam):
+    text = _text()
+    exam = make_exam(questions=[_question(text)])
+    return text, exam["questions"][0]["id"], exam["id"]
+
+
+def test_archive_near_duplicate_is_flagged(client, archived, make_exam):
+    text, question_id, _ = archived
+    response = _upload(client, make_exam(questions=[_question(_text())])["id"], [_near(text)])
+    assert response.json()[0]["duplicate_of"] == question_id
+    assert response.headers["X-Duplicates-Rejected"] == "0"
+
+
+def test_batch_near_duplicate_is_flagged(client, make_exam):
+    exam = make_exam(questions=[_question(_text())])
+    text = _text()
+    first, second = _upload(client, exam["id"], [text, _near(text)]).json()
+    assert first["duplicate_of"] is None
+    assert second["duplicate_of"] == first["id"]
+
+
+def test_unrelated_text_is_not_flagged(client, archived):
+    _, _, exam_id = archived
+    assert _upload(client, exam_id, [_text()]).json()[0]["duplicate_of"] is None
+
+
+def test_deleted_question_stops_matching(client, archived):
+    text, question_id, exam_id = archived
+    with SessionLocal() as db:
+        crud.delete_question(db, question_id)
+    assert _upload(client, exam_id, [_near(text)]).json()[0]["duplicate_of"] is None
+
+
+def test_reject_mode_drops_duplicates(client, archived, monkeypatch):
+    monkeypatch.setattr(settings, "dedup_mode", "reject")
+    text, _, exam_id = archived
+    fresh = _text()
+    response = _upload(client, exam_id, [_near(text), fresh])
+    assert [question["question_text"] for question in response.json()] == [fresh]
+    assert response.headers["X-Duplicates-Rejected"] == "1"
+
+
+def test_create_questions_bulk_returns_duplicate_ids(archived):
+    text, question_id, exam_id = archived
+    fresh = _text()
+    with SessionLocal() as db:
+        created = crud.create_questions_bulk(db, exam_id, [
+            schemas.QuestionCreate(**_question(body)) for body in (_near(text), fresh, _near(fresh))
+        ])
+        (near, near_of), (first, first_of), (second, second_of) = created
+        assert near.question_text == _near(text) and near_of == question_id
+        assert first.question_text == fresh and first_of is None
+        assert second_of == first.id
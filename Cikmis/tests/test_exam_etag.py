@@ -0,0 +1,94 @@
+import io
+import json
+import re
+
+import pytest
+
+from conftest import unique
+
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+def _version(etag: str, kind: str, exam_id: int) -> int:
+    match = re.fullmatch(rf'(W/)?"{kind}-{exam_id}-v(\d+)"', etag)
+    assert match, etag
+    return int(match.group(2))
+
+
+@pytest.mark.parametrize("path, kind", [("/exams/{id}", "exam"), ("/exams/{id}/questions", "questions")])
+def test_if_none_match_returns_304(client, make_exam, path, kind):
+    exam = make_exam()
+    url = path.format(id=exam["id"])
+
+    first = client.get(url, headers=IDENTITY)
+    assert first.status_code == 200
+    _version(first.headers["ETag"], kind, exam["id"])
+
+    again = client.get(url, headers={**IDENTITY, "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+    # Liste halinde ya da W/ önekiyle gelen ETag de eşleşir
+    listed = client.get(url, headers={**IDENTITY, "If-None-Match": f'"eski", W/{first.headers["ETag"]}'})
+    assert listed.status_code == 304
+
+
+def test_upload_bumps_version(client, make_exam):
+    exam = make_exam()
+    first = client.get(f"/exams/{exam['id']}", headers=IDENTITY)
+    version = _version(first.headers["ETag"], "exam", exam["id"])
+
+    text = f"{unique('yeni')} enerjinin korunumu"
+    response = client.post(
+        f"/exams/{exam['id']}/upload-questions",
+        json=[{"question_text": text, "answer": "B", "options": ["a", "b"]}],
+    )
+    assert response.status_code == 201
+
+    after = client.get(f"/exams/{exam['id']}", headers={**IDENTITY, "If-None-Match": first.headers["ETag"]})
+    assert after.status_code == 200
+    assert _version(after.headers["ETag"], "exam", exam["id"]) == version + 1
+    assert text in [question["question_text"] for question in after.json()["questions"]]
+
+
+def test_import_bumps_version(client, make_exam, auth_headers):
+    exam = make_exam()
+    first = client.get(f"/exams/{exam['id']}/questions", headers=IDENTITY)
+    version = _version(first.headers["ETag"], "questions", exam["id"])
+
+    text = f"{unique('ice-aktarilan')} momentum ve çarpışma"
+    body = json.dumps({"question_text": text, "answer": "C"}) + "\n"
+    response = client.post(
+        f"/exams/{exam['id']}/import",
+        headers={**auth_headers, "X-Upload-Id": unique("upload")},
+        files={"file": ("sorular.jsonl", io.BytesIO(body.encode()), "application/x-ndjson")},
+    )
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 1
+
+    after = client.get(f"/exams/{exam['id']}/questions", headers={**IDENTITY, "If-None-Match": first.headers["ETag"]})
+    assert after.status_code == 200
+    assert _version(after.headers["ETag"], "questions", exam["id"]) == version + 1
+    assert text in [question["question_text"] for question in after.json()]
+
+
+def test_gzip_response_has_weak_etag(client, make_exam):
+    exam = make_exam(questions=[
+        {"question_text": f"{unique('uzun')} " + "sürtünme katsayısı " * 20, "answer": "A", "options": ["a", "b", "c", "d"]}
+        for _ in range(10)
+    ])
+    url = f"/exams/{exam['id']}"
+
+    plain = client.get(url, headers=IDENTITY)
+    assert "Content-Encoding" not in plain.headers
+    assert not plain.headers["ETag"].startswith("W/")
+
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.status_code == 200
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["ETag"] == f"W/{plain.headers['ETag']}"
+    assert compressed.json() == plain.json()
+
+    revalidated = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["ETag"]})
+    assert revalidated.status_code == 304
@@ -0,0 +1,14 @@
+import json
+
+
+def test_export_requires_auth(client):
+    assert client.get("/exams/export").status_code == 401
+
+
+def test_export_streams_filtered_exams(client, auth_headers, make_exam, class_level):
+    exams = [make_exam(), make_exam()]
+    response = client.get("/exams/export", headers=auth_headers, params={"department_id": class_level["department_id"]})
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == [exam["id"] for exam in exams]
+    assert [len(row["questions"]) for row in rows] == [3, 3]
@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+import migrations
+import models
+
+_DROPPED_INDEXES = ("ix_questions_question_text", "ix_questions_answer")
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    models.Base.metadata.create_all(engine)
+    # Eski şemadaki, filtrelerde kullanılmayan index'ler; geçiş bunları kaldırmalı
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX ix_questions_question_text ON questions (question_text)"))
+        conn.execute(text("CREATE INDEX ix_questions_answer ON questions (answer)"))
+    migrations.run_migrations(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("filters", migrations.filter_combinations(), ids=lambda filters: "+".join(filters))
+def test_exam_filter_uses_index(engine, filters):
+    with Session(engine) as db:
+        assert migrations.check_filter_plan(db, filters) == []
+
+
+def test_check_exam_filter_plans_passes(engine):
+    assert migrations.check_exam_filter_plans(engine) == []
+
+
+def test_missing_index_is_reported(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    models.Base.metadata.create_all(engine)
+    migrations.run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_exams_level_year"))
+    problems = migrations.check_exam_filter_plans(engine)
+    assert any("{'class_level': 2}" in problem for problem in problems)
+    engine.dispose()
+
+
+def test_unused_question_indexes_are_dropped(engine):
+    names = {index["name"] for index in inspect(engine).get_indexes("questions")}
+    assert not names & set(_DROPPED_INDEXES)
+    assert "ix_questions_exam_id" in names
@@ -0,0 +1,61 @@
+import pytest
+
+import crud
+
+
+@pytest.fixture
+def department_exams(make_exam, class_level):
+    # Aynı yıla düşen sınavlar: sıralama (year desc, id desc) id ile kararlı olmalı
+    exams = [make_exam(year=2022) for _ in range(4)] + [make_exam(year=2023) for _ in range(3)]
+    return sorted(exams, key=lambda exam: (exam["year"], exam["id"]), reverse=True)
+
+
+def _pages(client, department_id: int, limit: int) -> list[dict]:
+    pages = []
+    params = {"department_id": department_id, "limit": limit}
+    while True:
+        response = client.get("/exams/", params=params)
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        if pages[-1]["next_cursor"] is None:
+            return pages
+        params["cursor"] = pages[-1]["next_cursor"]
+
+
+def test_pages_cover_equal_years_once_in_order(client, department_exams, class_level):
+    pages = _pages(client, class_level["department_id"], limit=2)
+    ids = [item["id"] for page in pages for item in page["items"]]
+    assert ids == [exam["id"] for exam in department_exams]
+    assert [len(page["items"]) for page in pages] == [2, 2, 2, 1]
+
+
+def test_last_page_has_no_cursor(client, department_exams, class_level):
+    response = client.get("/exams/", params={"department_id": class_level["department_id"], "limit": 50})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == len(department_exams)
+    assert response.json()["next_cursor"] is None
+
+    # Sayfa boyutu toplamın tam katıyken de son sayfada cursor olmamalı
+    pages = _pages(client, class_level["department_id"], limit=len(department_exams))
+    assert len(pages) == 1
+
+
+@pytest.mark.parametrize("cursor", ["bozuk!", "YWJj", "eDp5", "MjAyMzo"])
+def test_malformed_cursor_is_rejected(client, cursor):
+    response = client.get("/exams/", params={"cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_empty_first_page_is_404(client):
+    response = client.get("/exams/", params={"department_id": 10 ** 9})
+    assert response.status_code == 404
+
+
+def test_empty_later_page_is_200(client, department_exams, class_level):
+    oldest = department_exams[-1]
+    response = client.get("/exams/", params={
+        "department_id": class_level["department_id"],
+        "cursor": crud.encode_exam_cursor(oldest["year"], oldest["id"]),
+    })
+    assert response.status_code == 200
+    assert response.json() == {"items": [], "next_cursor": None}
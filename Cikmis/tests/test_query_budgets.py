@@ -0,0 +1,53 @@
+# Her router'ın QueryBudget(n) ile işaretlenmiş route'ları soğuk önbellekle çağrılır;
+# işaretteki bütçe aşılırsa QueryBudgetExceeded ile test başarısız olur.
+from conftest import unique
+
+
+def test_academics_routes(route_budgets):
+    university = route_budgets.request("POST", "/academics/universities/", json={"name": unique("Üniversite")}).json()
+    department = route_budgets.request(
+        "POST", "/academics/departments/", json={"name": unique("Bölüm"), "university_id": university["id"]}
+    ).json()
+    route_budgets.request("POST", "/academics/class-levels/", json={"level": 1, "department_id": department["id"]})
+
+    route_budgets.request("GET", "/academics/universities/")
+    route_budgets.request("GET", "/academics/universities/{university_id}/departments/",
+                          {"university_id": university["id"]})
+    route_budgets.request("GET", "/academics/departments/{department_id}/classes/",
+                          {"department_id": department["id"]})
+    route_budgets.request("GET", "/academics/tree")
+    route_budgets.request("GET", "/academics/tree/universities/{university_id}", {"university_id": university["id"]})
+    route_budgets.request("GET", "/academics/tree/departments/{department_id}", {"department_id": department["id"]})
+
+    assert route_budgets.uncovered("/academics") == set()
+
+
+def test_auth_routes(route_budgets):
+    name = unique("user")
+    email = f"{name}@example.com"
+    route_budgets.request("POST", "/auth/register", json={"username": name, "email": email, "password": "parola123"})
+    route_budgets.request("POST", "/auth/login", data={"username": email, "password": "parola123"})
+
+    assert route_budgets.uncovered("/auth") == set()
+
+
+def test_exams_routes(route_budgets, make_exam, class_level):
+    exam = make_exam()
+    route_budgets.request("GET", "/exams/", params={"department_id": class_level["department_id"]})
+    route_budgets.request("GET", "/exams/search", params={"q": "kuvvet"})
+    route_budgets.request("GET", "/exams/{exam_id}", {"exam_id": exam["id"]})
+    route_budgets.request("GET", "/exams/{exam_id}/questions", {"exam_id": exam["id"]})
+
+    assert route_budgets.uncovered("/exams") == set()
+
+
+def test_attempts_routes(route_budgets, make_exam, auth_headers):
+    exam = make_exam()
+    answers = [{"question_id": question["id"], "answer": "A"} for question in exam["questions"]]
+    route_budgets.request("POST", "/attempts/exams/{exam_id}", {"exam_id": exam["id"]},
+                          headers=auth_headers, json={"answers": answers})
+    route_budgets.request("GET", "/attempts/me/courses", headers=auth_headers)
+    route_budgets.request("GET", "/attempts/me/exams", headers=auth_headers)
+    route_budgets.request("GET", "/attempts/exams/{exam_id}/stats", {"exam_id": exam["id"]}, headers=auth_headers)
+
+    assert route_budgets.uncovered("/attempts") == set()
@@ -0,0 +1,103 @@
+import io
+import json
+import uuid
+
+import pytest
+
+import crud
+from config import settings
+from conftest import unique
+
+
+def _text() -> str:
+    return " ".join(uuid.uuid4().hex[:6] for _ in range(10)) + " hangisidir"
+
+
+def _csv(texts: list[str], bad_rows: int = 0) -> bytes:
+    lines = ["question_text,answer,options"]
+    lines += [f'"{text}",A,a|b|c' for text in texts]
+    lines += [f'"{_text()}",,a|b'] * bad_rows
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _jsonl(texts: list[str], bad_rows: int = 0) -> bytes:
+    lines = [json.dumps({"question_text": text, "answer": "B", "options": ["a", "b"]}) for text in texts]
+    lines += ["{bozuk"] * bad_rows
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _import(client, headers, exam_id: int, upload_id: str, filename: str, body: bytes):
+    return client.post(
+        f"/exams/{exam_id}/import",
+        headers={**headers, "X-Upload-Id": upload_id},
+        files={"file": (filename, io.BytesIO(body), "application/octet-stream")},
+    )
+
+
+def _question_texts(client, exam_id: int) -> list[str]:
+    return [question["question_text"] for question in client.get(f"/exams/{exam_id}/questions").json()]
+
+
+@pytest.mark.parametrize("filename, build", [("sorular.csv", _csv), ("sorular.jsonl", _jsonl)])
+def test_reposted_upload_is_replayed(client, auth_headers, make_exam, filename, build):
+    exam = make_exam()
+    texts = [_text() for _ in range(4)]
+    body = build(texts, bad_rows=1)
+    upload_id = unique("upload")
+
+    first = _import(client, auth_headers, exam["id"], upload_id, filename, body)
+    assert first.status_code == 200, first.text
+    report = first.json()
+    assert report["status"] == "completed"
+    assert (report["rows"], report["inserted"], report["failed"]) == (5, 4, 1)
+    assert report["errors"][0]["row"] == 5
+    assert report["replayed"] is False
+
+    again = _import(client, auth_headers, exam["id"], upload_id, filename, body)
+    assert again.status_code == 200
+    assert again.json() == {**report, "replayed": True}
+
+    stored = _question_texts(client, exam["id"])
+    assert sorted(text for text in stored if text in texts) == sorted(texts)
+    assert len(stored) == len(exam["questions"]) + len(texts)
+
+
+def test_upload_id_is_bound_to_exam(client, auth_headers, make_exam):
+    upload_id = unique("upload")
+    body = _jsonl([_text()])
+    assert _import(client, auth_headers, make_exam()["id"], upload_id, "a.jsonl", body).status_code == 200
+    assert _import(client, auth_headers, make_exam()["id"], upload_id, "a.jsonl", body).status_code == 409
+
+
+def test_failed_import_resumes_without_duplicates(client, auth_headers, make_exam, monkeypatch):
+    monkeypatch.setattr(settings, "question_import_chunk_size", 2)
+    exam = make_exam()
+    texts = [_text() for _ in range(7)]
+    body = _csv(texts)
+    upload_id = unique("upload")
+
+    insert_chunk = crud.insert_questions_chunk
+    calls = []
+
+    def failing_insert(db, exam_id, questions):
+        calls.append(len(questions))
+        if len(calls) == 3:
+            raise RuntimeError("bağlantı koptu")
+        return insert_chunk(db, exam_id, questions)
+
+    monkeypatch.setattr(crud, "insert_questions_chunk", failing_insert)
+    with pytest.raises(RuntimeError):
+        _import(client, auth_headers, exam["id"], upload_id, "sorular.csv", body)
+
+    # İlk iki parça commit edildi, üçüncüsü geri alındı
+    assert [text for text in _question_texts(client, exam["id"]) if text in texts] == texts[:4]
+
+    monkeypatch.setattr(crud, "insert_questions_chunk", insert_chunk)
+    resumed = _import(client, auth_headers, exam["id"], upload_id, "sorular.csv", body)
+    assert resumed.status_code == 200, resumed.text
+    report = resumed.json()
+    assert (report["status"], report["rows"], report["inserted"], report["failed"]) == ("completed", 7, 7, 0)
+    assert report["replayed"] is False
+
+    stored = [text for text in _question_texts(client, exam["id"]) if text in texts]
+    assert stored == texts
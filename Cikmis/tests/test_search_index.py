@@ -0,0 +1,27 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+import migrations
+import models
+from services import search_index
+
+
+def test_archive_is_indexed_once_by_migration(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([
+            models.Exam(title="Vize", course_name="İşletim Sistemleri", year=2023, semester="Güz",
+                        questions=[models.Question(question_text="Süreç nedir?", answer="A")]),
+            models.Exam(title="Final", course_name="Fizik", year=2022, semester="Bahar"),
+        ])
+        db.commit()
+
+    assert "0004_exam_search_index" in migrations.run_migrations(engine)
+    with Session(engine) as db:
+        assert db.execute(text("SELECT COUNT(*) FROM exam_search")).scalar() == 2
+        assert [exam_id for exam_id, _ in search_index.search(db, "isletim surec")] == [1]
+
+    # Açılışta tekrar çalışmaz
+    assert migrations.run_migrations(engine) == []
+    engine.dispose()
@@ -0,0 +1,16 @@
+import pytest
+
+STATS_ROUTES = [
+    "/exams/ai/stats",
+    "/exams/cache/stats",
+    "/auth/cache/stats",
+    "/academics/tree/stats",
+]
+
+
+@pytest.mark.parametrize("path", STATS_ROUTES)
+def test_stats_require_auth(client, auth_headers, path):
+    assert client.get(path).status_code == 401
+    response = client.get(path, headers=auth_headers)
+    assert response.status_code == 200
+    assert isinstance(response.json(), dict)
@@ -0,0 +1,53 @@
+"""
+AI iş kuyruğu worker'ı (bkz. services/ai_jobs.py). API sürecinden bağımsız çalışır;
+yatayda ölçeklemek için birden fazla süreç başlatılabilir.
+
+Kullanım:
+    python worker.py
+    python worker.py --concurrency 8 --bulk-slots 4
+    python worker.py --once    # kuyruk boşalınca çık
+"""
+import argparse
+import asyncio
+import signal
+
+import models
+from config import settings
+from database import async_engine, engine
+from migrations import run_migrations
+from services.ai_jobs import JobWorker
+
+
+async def _run(worker: JobWorker, once: bool) -> None:
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, worker.stop)
+    try:
+        await worker.run(once=once)
+    finally:
+        await async_engine.dispose()
+    print(f"AI iş worker'ı durdu: {worker.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AI iş kuyruğunu işler.")
+    parser.add_argument("--concurrency", type=int, default=settings.ai_jobs_worker_concurrency)
+    parser.add_argument("--bulk-slots", type=int, default=settings.ai_jobs_bulk_slots)
+    parser.add_argument("--once", action="store_true", help="Kuyrukta iş kalmayınca çık.")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    worker = JobWorker(
+        concurrency=args.concurrency,
+        bulk_slots=args.bulk_slots,
+        poll_interval=settings.ai_jobs_poll_interval_seconds,
+        lease_seconds=settings.ai_jobs_lease_seconds,
+        rate_per_minute=settings.ai_jobs_rate_per_minute,
+    )
+    asyncio.run(_run(worker, args.once))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,41 +8,35 @@ function AcademicUnitStep({ academicData, setAcademicData }) {
     const [options, setOptions] = useState({ universities: [], departments: [], classLevels: [] });
     const [loading, setLoading] = useState({ uni: true, dep: false, cls: false });
 
-    // Başlangıçta tüm üniversiteleri yükle
+    // Başlangıçta tüm üniversite -> bölüm -> sınıf ağacını tek istekte yükle
     useEffect(() => {
-        axios.get(`${API_URL}/academics/universities`)
+        axios.get(`${API_URL}/academics/tree`)
             .then(res => setOptions(prev => ({ ...prev, universities: res.data })))
             .catch(err => console.error(err))
             .finally(() => setLoading(prev => ({ ...prev, uni: false })));
     }, []);
 
-    // Üniversite seçildiğinde veya temizlendiğinde bölümleri yükle/sıfırla
+    // Üniversite seçildiğinde veya temizlendiğinde bölümleri ağaçtan al/sıfırla
     useEffect(() => {
         const selectedUni = academicData.selected.university;
         if (selectedUni && selectedUni.id) {
-            setLoading(prev => ({ ...prev, dep: true }));
-            axios.get(`${API_URL}/academics/universities/${selectedUni.id}/departments`)
-                .then(res => setOptions(prev => ({ ...prev, departments: res.data })))
-                .catch(err => { console.error(err); setOptions(prev => ({ ...prev, departments: [] })); })
-                .finally(() => setLoading(prev => ({ ...prev, dep: false })));
+            const uni = options.universities.find(u => u.id === selectedUni.id);
+            setOptions(prev => ({ ...prev, departments: uni?.departments || [] }));
         } else {
             setOptions(prev => ({ ...prev, departments: [], classLevels: [] }));
         }
-    }, [academicData.selected.university]);
+    }, [academicData.selected.university, options.universities]);
 
-    // Bölüm seçildiğinde veya temizlendiğinde sınıfları yükle/sıfırla
+    // Bölüm seçildiğinde veya temizlendiğinde sınıfları ağaçtan al/sıfırla
     useEffect(() => {
         const selectedDep = academicData.selected.department;
         if (selectedDep && selectedDep.id) {
-            setLoading(prev => ({ ...prev, cls: true }));
-            axios.get(`${API_URL}/academics/departments/${selectedDep.id}/classes`)
-                .then(res => setOptions(prev => ({ ...prev, classLevels: res.data })))
-                .catch(err => { console.error(err); setOptions(prev => ({ ...prev, classLevels: [] })); })
-                .finally(() => setLoading(prev => ({ ...prev, cls: false })));
+            const dep = options.departments.find(d => d.id === selectedDep.id);
+            setOptions(prev => ({ ...prev, classLevels: dep?.class_levels || [] }));
         } else {
             setOptions(prev => ({ ...prev, classLevels: [] }));
         }
-    }, [academicData.selected.department]);
+    }, [academicData.selected.department, options.departments]);
 
     const handleSelectionChange = (field, value) => {
         const newSelected = { ...academicData.selected, [field]: value };
@@ -97,7 +97,8 @@ function ExamPage() {
             const fullQuestionString = `Soru: ${question.question_text}\nSeçenekler:\n${optionsString}`;
 
             const requestBody = {
-                original_question: fullQuestionString
+                original_question: fullQuestionString,
+                question_id: question.id
             };
             const response = await axios.post(`${API_URL}/exams/generate-similar-question`, requestBody);
             setSimilarQuestionData(response.data);
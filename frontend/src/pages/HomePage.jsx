@@ -14,15 +14,17 @@ function HomePage() {
     const [selectedUniversity, setSelectedUniversity] = useState(null);
 
     const [departments, setDepartments] = useState([]);
-    const [depLoading, setDepLoading] = useState(false);
+    const depLoading = false;
     const [selectedDepartment, setSelectedDepartment] = useState(null);
 
     const [classLevels, setClassLevels] = useState([]);
-    const [classLevelLoading, setClassLevelLoading] = useState(false);
+    const classLevelLoading = false;
     const [selectedClassLevel, setSelectedClassLevel] = useState(null);
 
     const [exams, setExams] = useState([]);
     const [examLoading, setExamLoading] = useState(false);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     const [error, setError] = useState(null);
 
@@ -31,7 +33,8 @@ function HomePage() {
             setUniLoading(true);
             setError(null);
             try {
-                const response = await axios.get(`${API_URL}/academics/universities`);
+                // Tüm üniversite -> bölüm -> sınıf ağacı tek istekte gelir
+                const response = await axios.get(`${API_URL}/academics/tree`);
                 setUniversities(response.data);
             } catch (err) {
                 console.error("Üniversiteler getirilirken hata:", err);
@@ -43,51 +46,45 @@ function HomePage() {
         fetchUniversities();
     }, []);
 
-    const handleUniversitySelect = async (university) => {
+    const handleUniversitySelect = (university) => {
         setSelectedUniversity(university);
-        setDepLoading(true);
         setError(null);
-        try {
-            const response = await axios.get(`${API_URL}/academics/universities/${university.id}/departments`);
-            setDepartments(response.data);
-        } catch (err) {
-            console.error("Bölümler getirilirken hata:", err);
-            setError(err.response?.status === 404 ? "Bu üniversiteye ait bölüm bulunamadı." : "Bölümler yüklenemedi.");
-            setDepartments([]);
-        } finally {
-            setDepLoading(false);
+        const universityDepartments = university.departments || [];
+        setDepartments(universityDepartments);
+        if (universityDepartments.length === 0) {
+            setError("Bu üniversiteye ait bölüm bulunamadı.");
         }
     };
 
-    const handleDepartmentSelect = async (department) => {
+    const handleDepartmentSelect = (department) => {
         setSelectedDepartment(department);
-        setClassLevelLoading(true);
         setError(null);
-        try {
-            const response = await axios.get(`${API_URL}/academics/departments/${department.id}/classes`);
-            setClassLevels(response.data);
-        } catch (err) {
-            console.error("Sınıflar getirilirken hata:", err);
-            setError(err.response?.status === 404 ? "Bu bölüme ait sınıf seviyesi bulunamadı." : "Sınıf seviyeleri yüklenemedi.");
-            setClassLevels([]);
-        } finally {
-            setClassLevelLoading(false);
+        const departmentClassLevels = department.class_levels || [];
+        setClassLevels(departmentClassLevels);
+        if (departmentClassLevels.length === 0) {
+            setError("Bu bölüme ait sınıf seviyesi bulunamadı.");
         }
     };
 
+    // Sınav listesi sayfalıdır; sonraki sayfa yanıttaki next_cursor ile aynı filtrelerle istenir
+    const fetchExamPage = (classLevel, cursor) => axios.get(`${API_URL}/exams/`, {
+        params: {
+            university_id: selectedUniversity.id,
+            department_id: selectedDepartment.id,
+            class_level: classLevel.level,
+            ...(cursor ? { cursor } : {})
+        }
+    });
+
     const handleClassLevelSelect = async (classLevel) => {
         setSelectedClassLevel(classLevel);
         setExamLoading(true);
         setError(null);
+        setNextCursor(null);
         try {
-            const response = await axios.get(`${API_URL}/exams/`, {
-                params: {
-                    university_id: selectedUniversity.id,
-                    department_id: selectedDepartment.id,
-                    class_level: classLevel.level
-                }
-            });
-            setExams(response.data);
+            const response = await fetchExamPage(classLevel);
+            setExams(response.data.items);
+            setNextCursor(response.data.next_cursor);
         } catch (err) {
             console.error("Sınavlar getirilirken hata:", err);
             if (err.response && err.response.status === 404) {
@@ -101,9 +98,23 @@ function HomePage() {
         }
     };
 
+    const handleLoadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const response = await fetchExamPage(selectedClassLevel, nextCursor);
+            setExams((previous) => [...previous, ...response.data.items]);
+            setNextCursor(response.data.next_cursor);
+        } catch (err) {
+            console.error("Sınavlar getirilirken hata:", err);
+            setError("Sınavlar yüklenemedi.");
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleGoBack = () => {
         setError(null);
-        if (selectedClassLevel) { setSelectedClassLevel(null); setExams([]); }
+        if (selectedClassLevel) { setSelectedClassLevel(null); setExams([]); setNextCursor(null); }
         else if (selectedDepartment) { setSelectedDepartment(null); setClassLevels([]); }
         else if (selectedUniversity) { setSelectedUniversity(null); setDepartments([]); }
     };
@@ -113,7 +124,18 @@ function HomePage() {
         if (!selectedUniversity) return <UniversityList universities={universities} loading={uniLoading} onUniversitySelect={handleUniversitySelect} />;
         if (!selectedDepartment) return <DepartmentList departments={departments} loading={depLoading} onDepartmentSelect={handleDepartmentSelect} />;
         if (!selectedClassLevel) return <ClassLevelList classLevels={classLevels} loading={classLevelLoading} onClassLevelSelect={handleClassLevelSelect} />;
-        return <ExamList exams={exams} loading={examLoading} />;
+        return (
+            <>
+                <ExamList exams={exams} loading={examLoading} />
+                {!examLoading && nextCursor && (
+                    <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+                        <Button onClick={handleLoadMore} variant="outlined" disabled={loadingMore}>
+                            {loadingMore ? 'Yükleniyor...' : 'Daha fazla sınav yükle'}
+                        </Button>
+                    </Box>
+                )}
+            </>
+        );
     };
 
     return (